@@ -1,35 +1,48 @@
+import time
+_startup_t0 = time.perf_counter()
 import tkinter as tk
 from tkinter import messagebox
 import os
-from datetime import datetime
-from PIL import Image, ImageTk
-import random
 import sys
 import subprocess
-
-def get_streak(habit_name):
-    try:
-        with open("streaks.txt", "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
-    except FileNotFoundError:
-        return 0
-
-    for line in lines:
-        if ":" not in line:
-            continue
-
-        name, value = line.split(":", 1)
-        name = name.strip()
-        value = value.strip()
-
-        if name.lower() == habit_name.lower():
-            try:
-                return int(value)
-            except ValueError:
-                return 0
-
-    return 0
-
+from concurrent.futures import ThreadPoolExecutor
+_startup_tk = time.perf_counter()
+import habit_perf
+habit_perf.install_io_hooks()
+habit_perf.install_tk_hooks()
+import habit_clock
+import habit_rollover
+from habit_checklist import VirtualChecklist
+from habit_io import IOWorker
+from habit_instance import InstanceServer, claim, notify_running, raise_window
+from habit_lock import LockTimeout, folder_lock
+from habit_quotes import QuoteIndex
+from habit_storage import open_store
+
+# === STARTUP REPORT ===
+# run with --startup-report (or HABIT_STARTUP_REPORT=1) to see where the
+# time to an interactive window goes, in the spirit of `python -X importtime`
+STARTUP_REPORT = "--startup-report" in sys.argv or bool(os.environ.get("HABIT_STARTUP_REPORT"))
+_startup_marks = [("import tkinter", _startup_tk), ("import habit modules", time.perf_counter())]
+habit_perf.phase("startup: import tkinter", _startup_t0, _startup_tk)
+habit_perf.phase("startup: import habit modules", _startup_tk, _startup_marks[-1][1])
+
+
+def startup_mark(phase):
+    """Record that a startup phase just finished."""
+    now = time.perf_counter()
+    habit_perf.phase("startup: " + phase, _startup_marks[-1][1], now)
+    _startup_marks.append((phase, now))
+
+
+def startup_report():
+    """Per-phase and cumulative ms since the first import, as text."""
+    lines = ["startup phase                     |  self ms | cumulative ms"]
+    last = _startup_t0
+    for phase, t in _startup_marks:
+        lines.append(f"{phase:<33} | {(t - last) * 1000:8.1f} | {(t - _startup_t0) * 1000:8.1f}")
+        last = t
+    return "\n".join(lines)
 
 
 # === FLEXIBLE SAFE DATA DIRECTORY ===
@@ -69,15 +82,42 @@ def find_habit_folder():
 
 base_dir = find_habit_folder()
 os.makedirs(base_dir, exist_ok=True)
+startup_mark("find Habit folder")
 
 # === FILE PATHS ===
-TODAY_FILE = os.path.join(base_dir, "today.txt")
-PROGRESS_FILE = os.path.join(base_dir, "progress.txt")
 HABITS_FILE = os.path.join(base_dir, "habits.txt")
 CHART_ICON_FILE = os.path.join(base_dir, "chart_icon.png")
+CHART_ICON_CACHE = os.path.join(base_dir, "chart_icon_50.png")  # pre-scaled, no PIL needed
 CHART_ICON_ICO = os.path.join(base_dir, "chart_icon.ico")
 QUOTES_FILE = os.path.join(base_dir, "quotes.txt")
-STREAKS_FILE = os.path.join(base_dir, "streaks.txt")  # new
+
+# Show a new quote every N seconds (0 = one quote per launch).
+# Set with --rotate-quotes N or the HABIT_QUOTE_ROTATE environment variable.
+def _rotate_seconds():
+    value = os.environ.get("HABIT_QUOTE_ROTATE", "0")
+    if "--rotate-quotes" in sys.argv:
+        i = sys.argv.index("--rotate-quotes")
+        value = sys.argv[i + 1] if i + 1 < len(sys.argv) else value
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+
+QUOTE_ROTATE_SECONDS = _rotate_seconds()
+
+# Journal fsyncs are batched: at most one per this many ms of clicking
+SYNC_DELAY_MS = 1000
+
+# The checklist is filtered once typing in the search box pauses this long
+SEARCH_DELAY_MS = 60
+
+# Until the startup rollover is done, check for it this often (clicks wait)
+ROLLOVER_POLL_MS = 20
+
+# With --perf (or HABIT_PERF=1), F12 shows timings and file I/O counters,
+# refreshed this often; the trace is written to perf_trace.json on close
+PERF_OVERLAY_MS = 500
 
 # === HELPERS: OPEN FILES ===
 def open_file(filepath):
@@ -104,67 +144,60 @@ def open_quotes_file():
     open_file(QUOTES_FILE)
 
 
-# === STREAKS HANDLING ===
-def load_streaks():
-    """Return dict: {habit: streak_count}"""
-    streaks = {}
-    if os.path.exists(STREAKS_FILE):
-        try:
-            with open(STREAKS_FILE, "r", encoding="utf-8") as f:
-                for line in f:
-                    if ":" in line:
-                        habit, count = line.strip().split(":", 1)
-                        try:
-                            streaks[habit.strip()] = int(count.strip())
-                        except:
-                            pass
-        except Exception:
-            # if file read fails, return empty
-            return {}
-    return streaks
+# === CHART ICON ===
+CHART_ICON_SIZE = 50
 
 
-def save_streaks(streaks):
-    """Write the streak dict back to the file."""
+def _build_icon_cache():
+    """Scale chart_icon.png down once with PIL (only if PIL is around)."""
     try:
-        with open(STREAKS_FILE, "w", encoding="utf-8") as f:
-            for habit, count in streaks.items():
-                f.write(f"{habit}: {count}\n")
-    except Exception as e:
-        # fail silently but report if running interactive
-        try:
-            messagebox.showerror("Error", f"Failed to save streaks:\n{e}")
-        except:
-            pass
+        from PIL import Image
+    except ImportError:
+        return False
+    try:
+        img = Image.open(CHART_ICON_FILE)
+        img = img.resize((CHART_ICON_SIZE, CHART_ICON_SIZE), Image.LANCZOS)
+        img.save(CHART_ICON_CACHE)
+        return True
+    except Exception:
+        return False
 
 
-def update_streaks(completed_today, all_tasks):
+def load_chart_icon():
     """
-    Update streaks for end of day (Option A):
-    - Increment streak for tasks completed yesterday
-    - Reset/remove streaks for tasks not completed
+    Return a ~50x50 tk.PhotoImage of the chart icon, or None.
+    Normally this is the cached chart_icon_50.png loaded by Tk itself; the
+    cache is rebuilt with PIL when chart_icon.png is newer, and without PIL
+    the full icon is subsampled instead.
     """
-    streaks = load_streaks()
-    completed_set = set(completed_today)
-
-    new_streaks = {}
-    # For tasks in all_tasks: only keep those completed, increment their streak
-    for habit in all_tasks:
-        if habit in completed_set:
-            old = streaks.get(habit, 0)
-            new_streaks[habit] = old + 1
-        else:
-            # habit not completed -> reset (do not include)
-            pass
-
-    save_streaks(new_streaks)
-    return new_streaks
+    if not os.path.exists(CHART_ICON_FILE):
+        return None
+    try:
+        stale = (not os.path.exists(CHART_ICON_CACHE)
+                 or os.path.getmtime(CHART_ICON_CACHE) < os.path.getmtime(CHART_ICON_FILE))
+        if not stale or _build_icon_cache():
+            return tk.PhotoImage(file=CHART_ICON_CACHE)
+        img = tk.PhotoImage(file=CHART_ICON_FILE)
+        factor = max(1, -(-img.width() // CHART_ICON_SIZE))
+        return img.subsample(factor, factor)
+    except Exception:
+        return None
 
 
 # === MAIN APP ===
 class ChecklistApp:
-    def __init__(self, master, tasks, completed_today):
+    @habit_perf.timed()
+    def __init__(self, master, store):
         self.master = master
+        self.store = store
+        self._sync_job = None
+        # clicks change memory at once; the writes run on this thread
+        self.io = IOWorker(master, self.show_io_error)
+        self._io_error = None  # (window, label, count) while a save error is shown
+        self._closing = False
+        self.instance = None  # InstanceServer answering later launches
+        self.startup_rollover = None  # its Future, until on_rollover has applied it
+        self._heatmap = None  # (window, label, YearHeatmap, habit) while a heatmap is open
         master.title("Daily Checklist")
         master.configure(bg="#f0f0f0")
 
@@ -205,7 +238,7 @@ class ChecklistApp:
         quotes_button.place(x=15, y=35, anchor="nw")
 
         # --- DATE LABEL (centered) ---
-        today_str = datetime.now().strftime("%A, %B %d, %Y")
+        today_str = habit_clock.now().strftime("%A, %B %d, %Y")
         date_label = tk.Label(
             header_frame,
             text=f"CURRENT DATE: {today_str}",
@@ -215,37 +248,22 @@ class ChecklistApp:
         date_label.pack(pady=(0, 0))
 
         # --- CHART BUTTON (top-right corner) ---
-        if os.path.exists(CHART_ICON_FILE):
-            try:
-                img = Image.open(CHART_ICON_FILE)
-                img = img.resize((50, 50), Image.LANCZOS)
-                self.chart_icon = ImageTk.PhotoImage(img)
-                chart_button = tk.Button(
-                    header_frame,
-                    image=self.chart_icon,
-                    command=self.show_progress_chart,
-                    bd=0,
-                    bg="#f0f0f0",
-                    activebackground="#f0f0f0",
-                    cursor="hand2",
-                    highlightthickness=0,
-                    relief="flat",
-                    padx=8,
-                    pady=8
-                )
-                chart_button.place(relx=1.0, x=-25, y=5, anchor="ne")
-            except Exception:
-                chart_button = tk.Button(
-                    header_frame,
-                    text="📈",
-                    font=("Arial", 20),
-                    command=self.show_progress_chart,
-                    bd=0,
-                    bg="#f0f0f0",
-                    activebackground="#f0f0f0",
-                    cursor="hand2"
-                )
-                chart_button.place(relx=1.0, x=-20, y=0, anchor="ne")
+        self.chart_icon = load_chart_icon()
+        if self.chart_icon is not None:
+            chart_button = tk.Button(
+                header_frame,
+                image=self.chart_icon,
+                command=self.show_progress_chart,
+                bd=0,
+                bg="#f0f0f0",
+                activebackground="#f0f0f0",
+                cursor="hand2",
+                highlightthickness=0,
+                relief="flat",
+                padx=8,
+                pady=8
+            )
+            chart_button.place(relx=1.0, x=-25, y=5, anchor="ne")
         else:
             chart_button = tk.Button(
                 header_frame,
@@ -260,32 +278,27 @@ class ChecklistApp:
             chart_button.place(relx=1.0, x=-20, y=0, anchor="ne")
 
         # === QUOTE OR INSTRUCTION LABEL ===
-        quote_text = ""
-        if os.path.exists(QUOTES_FILE):
-            try:
-                with open(QUOTES_FILE, "r", encoding="utf-8") as f:
-                    quotes = [line.strip() for line in f if line.strip()]
-                if quotes:
-                    quote_text = random.choice(quotes)
-            except Exception:
-                quote_text = ""
-
-        if not quote_text:
-            quote_text = (
-                "Tip: Add your habits to 'habits.txt' (one per line) "
-                "and your motivational quotes to 'quotes.txt'!"
-            )
+        try:
+            self.quotes = QuoteIndex(QUOTES_FILE)
+        except Exception:
+            self.quotes = None
 
-        quote_label = tk.Label(
+        self.quote_label = tk.Label(
             master,
-            text=quote_text,
+            text="",
             font=("Arial", 12, "italic"),
             fg="gray30",
             bg="#f0f0f0",
             wraplength=800,
-            justify="center"
+            justify="center",
+            cursor="hand2"
         )
-        quote_label.pack(pady=(0, 15))
+        self.quote_label.pack(pady=(0, 15))
+        # click the quote for another one
+        self.quote_label.bind("<Button-1>", lambda event: self.next_quote())
+        self.next_quote()
+        if QUOTE_ROTATE_SECONDS > 0:
+            self._rotate_quotes()
 
         # === STREAK LABEL (bottom-left) ===
         self.streak_label = tk.Label(
@@ -299,93 +312,217 @@ class ChecklistApp:
         # place it at bottom-left of the window
         self.streak_label.pack(side="bottom", anchor="w", padx=15, pady=(0, 10))
 
-        # === SCROLLABLE CHECKLIST ===
-        canvas = tk.Canvas(master, borderwidth=0, background="#f0f0f0", highlightthickness=0)
-        scrollbar = tk.Scrollbar(master, orient="vertical", command=canvas.yview)
-        canvas.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
-        canvas.pack(side="left", fill="both", expand=True)
-
-        # Mousewheel scrolling
-        def _on_mousewheel(event):
-            if event.num == 5 or getattr(event, "delta", 0) < 0:
-                canvas.yview_scroll(1, "units")
-            elif event.num == 4 or getattr(event, "delta", 0) > 0:
-                canvas.yview_scroll(-1, "units")
-
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
-        canvas.bind_all("<Button-4>", _on_mousewheel)
-        canvas.bind_all("<Button-5>", _on_mousewheel)
-
-        frame = tk.Frame(canvas, background="#f0f0f0")
-        window_id = canvas.create_window((0, 0), window=frame, anchor="n")
-
-        def on_frame_configure(event):
-            canvas.configure(scrollregion=canvas.bbox("all"))
-        frame.bind("<Configure>", on_frame_configure)
-
-        def on_canvas_configure(event):
-            canvas.itemconfigure(window_id, width=event.width)
-        canvas.bind("<Configure>", on_canvas_configure)
-
-        frame.grid_columnconfigure(0, weight=1)
-        frame.grid_columnconfigure(1, weight=0)
-        frame.grid_columnconfigure(2, weight=1)
-
-        self.check_vars = {}
-        self.tasks = tasks
-
-        for i, task in enumerate(tasks):
-            var = tk.BooleanVar(value=(task in completed_today))
-
-            # --- STREAK COLORING ---
-            streak = get_streak(task)
-            if streak > 10:
-                color = "dark blue"
-                print("larger")
-            else:
-                color = "white"
-
-            cb = tk.Checkbutton(
-                frame,
-                text=task,
-                variable=var,
-                onvalue=True,
-                offvalue=False,
-                font=("Arial", 18),
-                indicatoron=False,
-                padx=20,
-                pady=10,
-                command=lambda v=var, t=task: self.toggle_box(v, t),
-                bg=color,
-                relief="solid",
-                bd=1
-            )
-
-            cb.grid(row=i, column=1, pady=8)
-            self.check_vars[task] = {"var": var, "button": cb}
+        # === SEARCH BOX (type to filter the checklist, Ctrl+F, Esc clears) ===
+        search_frame = tk.Frame(master, bg="#f0f0f0")
+        search_frame.pack(pady=(0, 10))
+        tk.Label(search_frame, text="Search:", font=("Arial", 12), bg="#f0f0f0").pack(side="left")
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=("Arial", 14),
+                                     width=30, relief="solid", bd=1)
+        self.search_entry.pack(side="left", padx=(6, 0))
+        self._search_job = None
+        self.search_var.trace_add("write", lambda *args: self._schedule_filter())
+        # the n-gram index is built when the box is first used, not at startup
+        self.search_entry.bind("<FocusIn>", lambda event: master.after_idle(self.checklist.prepare_search))
+        self.search_entry.bind("<Escape>", lambda event: self.search_var.set(""))
+        master.bind("<Control-f>", lambda event: self.search_entry.focus_set())
 
-            if var.get():
-                self._mark_complete(cb)
+        # === SCROLLABLE CHECKLIST ===
+        # only the rows in view get widgets (see habit_checklist.py)
+        self.tasks = store.habits
+        self.checklist = VirtualChecklist(master, store, self.toggle_box)
+        # the stored day is shown until the rollover is applied (see on_rollover)
+        self.checklist.set_enabled(False)
+
+        # Streak text is not needed for the first paint
+        master.after_idle(self.update_streak_display)
+
+        # === LIVE RELOAD (habits.txt / quotes.txt edited while open) ===
+        self.watcher = None
+        master.after_idle(self._start_watcher)
+
+        # === PERF OVERLAY (only with --perf) ===
+        self._perf_overlay = None
+        if habit_perf.ENABLED:
+            master.bind("<F12>", self.toggle_perf_overlay)
+
+    @habit_perf.timed()
+    def on_rollover(self):
+        """The startup rollover finished: show the new day and take clicks."""
+        self.store.reload()
+        self.startup_rollover = None
+        self.tasks = self.store.habits
+        self.checklist.set_habits(self.tasks)
+        self.checklist.refresh()
+        self.checklist.set_enabled(True)
+        self.update_streak_display()
 
+    def toggle_perf_overlay(self, event=None):
+        if self._perf_overlay is not None:
+            label, job = self._perf_overlay
+            self.master.after_cancel(job)
+            label.destroy()
+            self._perf_overlay = None
+            return
+        label = tk.Label(self.master, font=("Courier", 9), bg="#fffbe6", fg="#333333",
+                         justify="left", anchor="nw", relief="solid", bd=1, padx=6, pady=4)
+        label.place(relx=1.0, x=-10, y=10, anchor="ne")
+        self._perf_overlay = (label, None)
+        self._refresh_perf_overlay()
+
+    def _refresh_perf_overlay(self):
+        label, _ = self._perf_overlay
+        label.config(text=habit_perf.report())
+        label.lift()
+        self._perf_overlay = (label, self.master.after(PERF_OVERLAY_MS, self._refresh_perf_overlay))
+
+    def _schedule_filter(self):
+        """Debounce keystrokes: filter once typing pauses for SEARCH_DELAY_MS."""
+        if self._search_job is not None:
+            self.master.after_cancel(self._search_job)
+        self._search_job = self.master.after(SEARCH_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._search_job = None
+        self.checklist.filter(self.search_var.get())
+
+    def _start_watcher(self):
+        from habit_watch import FileWatcher
+        self.watcher = FileWatcher(self.master, [HABITS_FILE, QUOTES_FILE], self.on_files_changed)
+
+    @habit_perf.timed()
+    def on_files_changed(self, paths):
+        """Apply edits in place: only the affected checklist rows change."""
+        paths = {os.path.abspath(p) for p in paths}
+        if os.path.abspath(HABITS_FILE) in paths:
+            # refresh() may re-read today: let queued clicks reach the disk first
+            self.io.flush()
+            self.store.refresh()
+            self.tasks = self.store.habits
+            self.checklist.set_habits(self.tasks)
+            self.update_streak_display()
+        if os.path.abspath(QUOTES_FILE) in paths:
+            if self.quotes is None:
+                try:
+                    self.quotes = QuoteIndex(QUOTES_FILE)
+                except Exception:
+                    self.quotes = None
+            self.next_quote()
+
+    def next_quote(self):
+        """Show another random quote (one index lookup, no full read)."""
+        quote_text = ""
+        if self.quotes is not None:
+            try:
+                self.quotes.refresh()
+                quote_text = self.quotes.random()
+            except Exception:
+                quote_text = ""
 
+        if not quote_text:
+            quote_text = (
+                "Tip: Add your habits to 'habits.txt' (one per line) "
+                "and your motivational quotes to 'quotes.txt'!"
+            )
+        self.quote_label.config(text=quote_text)
 
-        # Update streak display on start
-        self.update_streak_display()
+    def _rotate_quotes(self):
+        self.next_quote()
+        self.master.after(QUOTE_ROTATE_SECONDS * 1000, self._rotate_quotes)
 
-    def toggle_box(self, var, task):
-        btn = self.check_vars[task]["button"]
-        if var.get():
-            self._mark_complete(btn)
-            save_completion(task)
-        else:
-            self._mark_incomplete(btn)
-            remove_completion(task)
+    @habit_perf.timed()
+    def toggle_box(self, task, done):
+        if self.startup_rollover is not None:
+            # a click on the stored day would be journaled under the old date
+            self.checklist.refresh()
+            return
+        if not self.store.mark(task, done):
+            return
+        # the write (and the folder lock a batch tool may be holding) is the
+        # worker's problem; clicking the same habit again before it ran
+        # replaces the queued write
+        write = self.store.persist(task)
+        self.io.submit(("toggle", task), lambda: _locked(write))
+        self._schedule_sync()
+
+        # an open heatmap only repaints today's cell
+        if self._heatmap is not None:
+            _, _, heatmap, habit = self._heatmap
+            if heatmap.year == habit_clock.now().year:
+                heatmap.set_day(self.store.today_date, self._today_value(habit))
 
         # Refresh streak display (streak file only updates at day rollover,
-        # but UI keeps consistent with file)
+        # so the cached streaks are still current)
         self.update_streak_display()
 
+    def _schedule_sync(self):
+        """Debounce journal fsyncs so a burst of clicks costs one fsync."""
+        if self._sync_job is not None:
+            self.master.after_cancel(self._sync_job)
+        self._sync_job = self.master.after(SYNC_DELAY_MS, self._sync)
+
+    def _sync(self):
+        self._sync_job = None
+        self.io.submit("sync", self.store.sync)
+
+    def show_io_error(self, key, error):
+        """A background write failed: say so without grabbing input (the app keeps working)."""
+        what = f"saving '{key[1]}'" if isinstance(key, tuple) else key
+        message = f"Failed while {what}:\n{error}"
+        if self._closing:
+            messagebox.showerror("Error", message)
+            return
+        if self._io_error is not None and self._io_error[0].winfo_exists():
+            win, label, count = self._io_error
+            count += 1
+            label.config(text=f"{message}\n\n({count} errors so far)")
+            self._io_error = (win, label, count)
+            win.lift()
+            return
+        win = tk.Toplevel(self.master)
+        win.title("Error")
+        win.transient(self.master)
+        label = tk.Label(win, text=message, justify="left", wraplength=400, padx=15, pady=10)
+        label.pack()
+        tk.Button(win, text="OK", width=10, command=win.destroy).pack(pady=(0, 10))
+        self._io_error = (win, label, 1)
+
+    def on_close(self):
+        """Compact the completion journal into today.txt, then exit."""
+        if self.watcher is not None:
+            self.watcher.close()
+        if self._perf_overlay is not None:
+            self.toggle_perf_overlay()
+        if self.instance is not None:
+            self.instance.close()
+        if self._sync_job is not None:
+            self.master.after_cancel(self._sync_job)
+            self._sync_job = None
+        # flush on exit: queued writes run (errors now show as plain dialogs)
+        self._closing = True
+        self.io.close()
+        # closed before the startup rollover was applied: let it finish and
+        # close on the day it left on disk, not on the stored day
+        pending, self.startup_rollover = self.startup_rollover, None
+        if pending is not None:
+            try:
+                pending.result()
+            except Exception:
+                pass
+        try:
+            with folder_lock(base_dir):
+                if pending is not None:
+                    self.store.reload()
+                self.store.close()
+        except (OSError, LockTimeout) as e:
+            messagebox.showerror("Error", f"Failed to save today's progress:\n{e}")
+        if habit_perf.ENABLED:
+            try:
+                print(f"perf trace written to {habit_perf.dump(habit_perf.trace_path(base_dir))}", file=sys.stderr)
+            except OSError:
+                pass
+        self.master.destroy()
+
     def center_window(self, win):
         win.update_idletasks()
         w = win.winfo_width()
@@ -397,27 +534,21 @@ class ChecklistApp:
         win.geometry(f"{w}x{h}+{x}+{y}")
 
 
-    def _mark_complete(self, btn):
-        btn.config(bg="black", fg="white")
-
-    def _mark_incomplete(self, btn):
-        btn.config(bg="white", fg="black")
-
+    @habit_perf.timed()
     def show_progress_chart(self):
-        if not os.path.exists(PROGRESS_FILE):
+        # chart code is only imported once somebody asks for a chart
+        from habit_analytics import Analytics, completion_series
+        from habit_chart import ProgressChart
+        from habit_history import HistoryStore
+
+        # SQLite folders are queried through the store's connection
+        history = getattr(self.store, "storage", None)
+        if history is None and not HistoryStore(base_dir).exists():
             messagebox.showinfo("No Data", "No progress data found yet.")
             return
 
-        with open(PROGRESS_FILE, "r") as f:
-            raw = [line.strip() for line in f]
-
-        data = []
-        for line in raw:
-            try:
-                if line != "":
-                    data.append(int(line))
-            except ValueError:
-                pass
+        analytics = Analytics(base_dir, self.tasks, history)
+        title, data, labels = completion_series(analytics, "daily")
 
         if len(data) == 0:
             messagebox.showinfo("No Data", "No valid progress entries found.")
@@ -429,79 +560,108 @@ class ChecklistApp:
         chart_win.geometry("800x500")
         self.center_window(chart_win)
 
+        # ---- View picker + summary ----
+        bar = tk.Frame(chart_win, bg="white")
+        bar.pack(fill="x")
+        view = tk.StringVar(value="daily")
+
+        def show_view():
+            view_title, values, view_labels = completion_series(analytics, view.get())
+            chart.set_data(values, view_title, view_labels)
+
+        for value, label in (("daily", "Daily"), ("avg7", "7-day avg"), ("avg30", "30-day avg"),
+                             ("weekly", "Weekly"), ("monthly", "Monthly"), ("weekdays", "Weekdays")):
+            tk.Radiobutton(bar, text=label, value=value, variable=view, command=show_view,
+                           indicatoron=False, font=("Arial", 9), padx=6, pady=2,
+                           bg="#e0e0e0", selectcolor="#c0c0c0").pack(side="left", padx=2, pady=4)
+        tk.Button(bar, text="Summary", font=("Arial", 9, "bold"), relief="solid", bd=1,
+                  command=lambda: self.show_summary(analytics)).pack(side="right", padx=6, pady=4)
+        tk.Button(bar, text="Heatmap", font=("Arial", 9, "bold"), relief="solid", bd=1,
+                  command=self.show_heatmap).pack(side="right", padx=2, pady=4)
+
         canvas = tk.Canvas(chart_win, bg="white")
         canvas.pack(fill="both", expand=True)
 
-        # ---- Redraw function ----
-        def redraw(event=None):
-            canvas.delete("all")
-
-            W = canvas.winfo_width()
-            H = canvas.winfo_height()
-            PAD = int(min(W, H) * 0.08)
-
-            # Axes
-            canvas.create_line(PAD, H - PAD, W - PAD, H - PAD, width=2)
-            canvas.create_line(PAD, PAD, PAD, H - PAD, width=2)
-
-            # Scaling calculations
-            max_y = max(data)
-            min_y = min(data)
-
-            if max_y == min_y:
-                max_y += 1
-
-            n = len(data)
-            x_step = (W - 2 * PAD) / (n - 1 if n > 1 else 1)
-            y_scale = (H - 2 * PAD) / (max_y - min_y)
-
-            points = []
-            for i, val in enumerate(data):
-                x = PAD + i * x_step
-                y = H - PAD - (val - min_y) * y_scale
-                points.append((x, y))
-
-            # Lines
-            for i in range(1, len(points)):
-                canvas.create_line(points[i - 1][0], points[i - 1][1],
-                                points[i][0], points[i][1], width=2)
-
-            # Dots
-            for (x, y) in points:
-                canvas.create_oval(x - 4, y - 4, x + 4, y + 4, fill="black")
-
-            # Y-axis labels
-            for y_val in range(min_y, max_y + 1):
-                y = H - PAD - (y_val - min_y) * y_scale
-                canvas.create_text(PAD - 20, y, text=str(y_val), anchor="e")
-
-            # X-axis labels
-            for i in range(n):
-                x = PAD + i * x_step
-                if n <= 15 or i % max(1, n // 15) == 0:
-                    canvas.create_text(x, H - PAD + 20, text=str(i + 1))
-
-            # Title
-            canvas.create_text(W / 2, PAD / 2, text="Habit Progress Over Time",
-                            font=("Arial", int(PAD * 0.4), "bold"))
-
-        # ---- Bind redraw to window resize ----
-        canvas.bind("<Configure>", redraw)
-
-        # Initial draw
-        redraw()
-
-
+        # ---- Chart (downsampled single polyline, debounced resize) ----
+        chart = ProgressChart(canvas, data, title, labels)
+        chart.redraw()
 
+    @habit_perf.timed()
+    def show_heatmap(self):
+        """Year calendar of completions, drawn as one image (see habit_heatmap)."""
+        if self._heatmap is not None:
+            self._heatmap[0].lift()
+            return
+        from habit_heatmap import heatmap_image
+
+        win = tk.Toplevel(self.master)
+        win.title("Habit Calendar")
+        win.configure(bg="white")
+        state = {"year": habit_clock.now().year}
+        habit_var = tk.StringVar(value="All habits")
+
+        bar = tk.Frame(win, bg="white")
+        bar.pack(fill="x", padx=10, pady=(8, 0))
+        year_label = tk.Label(bar, font=("Arial", 12, "bold"), bg="white")
+        image_label = tk.Label(win, bg="white")
+
+        def show():
+            habit = habit_var.get()
+            habit = None if habit == "All habits" else habit
+            heatmap = heatmap_image(base_dir, state["year"], habit, self.tasks,
+                                    getattr(self.store, "storage", None))
+            if state["year"] == habit_clock.now().year and self.store.today_date:
+                heatmap.set_day(self.store.today_date, self._today_value(habit))
+            year_label.config(text=str(state["year"]))
+            image_label.config(image=heatmap.image)
+            self._heatmap = (win, image_label, heatmap, habit)
+
+        def step(delta):
+            state["year"] += delta
+            show()
+
+        tk.Button(bar, text="◀", command=lambda: step(-1), relief="flat", bg="white").pack(side="left")
+        year_label.pack(side="left", padx=6)
+        tk.Button(bar, text="▶", command=lambda: step(1), relief="flat", bg="white").pack(side="left")
+        tk.OptionMenu(bar, habit_var, "All habits", *self.tasks, command=lambda _: show()).pack(side="right")
+        image_label.pack(padx=10, pady=10)
+
+        def close():
+            self._heatmap = None
+            win.destroy()
+
+        win.protocol("WM_DELETE_WINDOW", close)
+        show()
+        self.center_window(win)
+
+    def _today_value(self, habit):
+        if habit is None:
+            return len(self.store.completed)
+        return 1 if self.store.is_done(habit) else 0
+
+    def show_summary(self, analytics):
+        win = tk.Toplevel(self.master)
+        win.title("Habit Summary")
+        text = tk.Text(win, font=("Courier", 10), wrap="none", width=80, height=30)
+        text.insert("1.0", analytics.summary())
+        text.config(state="disabled")
+        text.pack(fill="both", expand=True)
+        self.center_window(win)
+
+
+    @habit_perf.timed()
     def update_streak_display(self):
-        streaks = load_streaks()
         display = []
 
         # Keep the same ordering as tasks
         for habit in self.tasks:
-            count = streaks.get(habit, 0)
+            count = self.store.streaks.get(habit, 0)
             if count >= 3:
-                display.append(f"{habit}: {count}🔥")
+                best = self.store.best(habit)
+                if best > count:
+                    display.append(f"{habit}: {count}🔥 (best {best})")
+                else:
+                    display.append(f"{habit}: {count}🔥")
 
         if display:
             text = "Streaks:\n" + "\n".join(display)
@@ -512,133 +672,36 @@ class ChecklistApp:
 
 
 # === DATA HANDLING ===
-def load_tasks(filename):
-    if not os.path.exists(filename):
-        # create empty habits file so user can edit
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write("")
-        return []
-    with open(filename, "r", encoding="utf-8") as f:
-        return [line.strip() for line in f if line.strip()]
-
-
-def record_yesterday_progress():
-    if not os.path.exists(TODAY_FILE):
-        return
-    with open(TODAY_FILE, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f if line.strip()]
-    # lines: [date, task1, task2, ...]
-    completed_count = max(0, len(lines) - 1)
-    with open(PROGRESS_FILE, "a", encoding="utf-8") as pf:
-        pf.write(str(completed_count) + "\n")
+def ensure_today_file():
+    with folder_lock(base_dir):
+        return habit_rollover.rollover(base_dir)
 
 
-def ensure_today_file():
-    os.makedirs(base_dir, exist_ok=True)
-    today_date = datetime.now().strftime("%Y-%m-%d")
-    today_obj = datetime.strptime(today_date, "%Y-%m-%d")
-
-    # If today.txt missing → create fresh
-    if not os.path.exists(TODAY_FILE):
-        with open(TODAY_FILE, "w", encoding="utf-8") as f:
-            f.write(today_date + "\n")
-        return today_date, []
-
-    # Load existing today.txt
-    with open(TODAY_FILE, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]
-
-    try: 
-        stored_date = lines[0]
-    except IndexError:
-        with open(TODAY_FILE, "w", encoding="utf-8") as f:
-            f.write(today_date + "\n")
-            stored_date = today_date
-
-    stored_obj = datetime.strptime(stored_date, "%Y-%m-%d")
-    day_diff = (today_obj - stored_obj).days
-
-    # === CASE 1 ===
-    # Same day → normal load
-    if day_diff == 0:
-        return today_date, lines[1:]
-
-    # === CASE 2: ONE DAY PASSED (normal rollover) ===
-    if day_diff == 1:
-        # record yesterday's progress
-        record_yesterday_progress()
-
-        # update streaks
-        yesterday_completed = lines[1:] if len(lines) > 1 else []
-        all_tasks = load_tasks(HABITS_FILE)
-        update_streaks(yesterday_completed, all_tasks)
-
-        # reset file for today
-        with open(TODAY_FILE, "w", encoding="utf-8") as f:
-            f.write(today_date + "\n")
-        return today_date, []
-
-    # === CASE 3: MULTIPLE DAYS MISSED ===
-    if day_diff > 1:
-        missed_days = day_diff - 1  # days between last use and yesterday
-
-        # 1. record "0" for each missed day + yesterday
-        # First: record yesterday's real progress
-        record_yesterday_progress()
-
-        # Then: append missed days of zeros
-        with open(PROGRESS_FILE, "a", encoding="utf-8") as pf:
-            for _ in range(missed_days):
-                pf.write("0\n")
-
-        # 2. Clear streaks entirely
-        with open(STREAKS_FILE, "w", encoding="utf-8") as sf:
-            sf.write("")
-
-        # 3. Reset today file fresh
-        with open(TODAY_FILE, "w", encoding="utf-8") as f:
-            f.write(today_date + "\n")
-
-        return today_date, []
-
-
-
-def save_completion(task):
-    today_date = datetime.now().strftime("%Y-%m-%d")
-    if not os.path.exists(TODAY_FILE):
-        with open(TODAY_FILE, "w", encoding="utf-8") as f:
-            f.write(today_date + "\n")
-    with open(TODAY_FILE, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f if line.strip()]
-    if not lines or lines[0] != today_date:
-        with open(TODAY_FILE, "w", encoding="utf-8") as f:
-            f.write(today_date + "\n" + task + "\n")
-    else:
-        completed = set(lines[1:])
-        if task not in completed:
-            completed.add(task)
-            with open(TODAY_FILE, "w", encoding="utf-8") as f:
-                f.write(today_date + "\n" + "\n".join(sorted(completed)) + "\n")
-
-
-def remove_completion(task):
-    today_date = datetime.now().strftime("%Y-%m-%d")
-    if not os.path.exists(TODAY_FILE):
-        return
-    with open(TODAY_FILE, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f if line.strip()]
-    if not lines or lines[0] != today_date:
-        return
-    completed = set(lines[1:])
-    if task in completed:
-        completed.remove(task)
-        with open(TODAY_FILE, "w", encoding="utf-8") as f:
-            f.write(today_date + "\n" + "\n".join(sorted(completed)) + "\n")
+def _locked(write):
+    """Run a store write (see HabitStore.persist) under the folder lock."""
+    with folder_lock(base_dir):
+        write()
 
 
 # === MAIN EXECUTION ===
 if __name__ == "__main__":
+    # Already running for this folder? Bring that window up instead of
+    # paying for a second startup. If it does not answer, start anyway;
+    # every writer takes the folder lock, so two copies cannot corrupt data.
+    instance_lock = claim(base_dir)
+    if instance_lock is None and notify_running(base_dir):
+        sys.exit(0)
+
+    # the rollover's file I/O runs on a thread while Tk starts up
+    startup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="habit-startup")
+    rollover_done = startup_pool.submit(ensure_today_file)
+
     root = tk.Tk()
+    startup_mark("create Tk root")
+    instance = None
+    if instance_lock is not None:
+        # listen before the slow part of startup, so a relaunch during it is answered
+        instance = InstanceServer(root, base_dir, instance_lock, lambda: raise_window(root))
 
     # Start maximized (not fullscreen)
     try:
@@ -652,8 +715,58 @@ if __name__ == "__main__":
         y_pos = int((screen_h - window_h) / 2)
         root.geometry(f"{window_w}x{window_h}+{x_pos}+{y_pos}")
 
-    tasks = load_tasks(HABITS_FILE)
-    _, completed_today = ensure_today_file()
+    # the window shows the stored day (clicks disabled) while the rollover runs
+    store = open_store(base_dir, journal=True)
+    startup_mark("load habits/streaks/today")
+
+    app = ChecklistApp(root, store)
+    app.instance = instance
+    app.startup_rollover = rollover_done
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    startup_mark("build window")
+
+    # the startup report is written once the window is painted and clickable
+    startup_waits = {"first paint", "rollover"}
+
+    def _startup_done(step):
+        startup_waits.discard(step)
+        if startup_waits or not STARTUP_REPORT:
+            return
+        report = startup_report()
+        print(report, file=sys.stderr)
+        try:
+            with open(os.path.join(base_dir, "startup_report.txt"), "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+        except OSError:
+            pass
+
+    def _first_paint():
+        startup_mark("first paint")
+        _startup_done("first paint")
+
+    def _apply_rollover():
+        if app.startup_rollover is None:
+            return  # the window was closed first (see on_close)
+        if not rollover_done.done():
+            root.after(ROLLOVER_POLL_MS, _apply_rollover)
+            return
+        startup_pool.shutdown()
+        try:
+            rollover_done.result()
+        except Exception as e:
+            # clicks never started, so there is nothing of this session to save
+            messagebox.showerror("Error", f"Failed to start the new day:\n{e}")
+            if instance is not None:
+                instance.close()
+            root.destroy()
+            return
+        startup_mark("rollover (ensure_today_file)")
+        app.on_rollover()
+        startup_mark("rollover applied (interactive)")
+        _startup_done("rollover")
+
+    _apply_rollover()
+    # runs once the first batch of idle redraws is done
+    root.after(0, lambda: root.after_idle(_first_paint))
 
-    app = ChecklistApp(root, tasks, completed_today)
     root.mainloop()
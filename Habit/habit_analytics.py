@@ -0,0 +1,345 @@
+"""
+Completion analytics over history.txt, answered from prefix sums.
+
+prefix[i] is the number of completions on the first i days, so any range
+total is prefix[end + 1] - prefix[start]: O(1) per query however many
+years of history there are. Rates, rolling averages and weekly/monthly
+rollups are all built from such differences.
+
+The overall index is kept in analytics.idx next to the history, together
+with the (mtime, size) of the history.txt it covers. Rollover only appends
+to history.txt, so extend_index() reads just the new tail and appends to
+the index; any other change (backfill, rename, hand edits) no longer
+matches the stamp and the index is rebuilt on next use. A rebuild takes
+archived years from their segment summaries (see HistoryStore.archive):
+one header per closed year instead of a parse of its records. Per-habit
+prefix sums are built in memory on first use, from history.bits when the
+folder has one (or from habits.db's (habit, date) index).
+"""
+import calendar
+import datetime
+import os
+import struct
+from array import array
+from itertools import accumulate
+
+from habit_bitmap import BITMAP_NAME, BitmapStore
+from habit_history import HISTORY_NAME, HistoryStore, format_date, parse_date, parse_record
+from habit_store import _read_text, file_stamp, parse_habits
+
+ANALYTICS_NAME = "analytics.idx"
+ANALYTICS_MAGIC = b"HANLY001"
+# magic, first day ordinal, days, history mtime_ns, history size
+ANALYTICS_HEADER = struct.Struct("<8sqqqq")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _ordinal_date(ordinal):
+    return format_date(datetime.date.fromordinal(ordinal))
+
+
+# === INDEX FILE ===
+def _read_index(path):
+    """Return (first_ordinal, stamp, prefix) or None if missing/corrupt."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(ANALYTICS_HEADER.size)
+            if len(header) != ANALYTICS_HEADER.size:
+                return None
+            magic, first, days, mtime_ns, size = ANALYTICS_HEADER.unpack(header)
+            if magic != ANALYTICS_MAGIC:
+                return None
+            prefix = array("q")
+            prefix.fromfile(f, days + 1)
+    except (OSError, EOFError):
+        return None
+    return first, (mtime_ns, size), prefix
+
+
+def _write_index(path, first, stamp, prefix):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ANALYTICS_HEADER.pack(ANALYTICS_MAGIC, first, len(prefix) - 1, stamp[0], stamp[1]))
+        prefix.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def _add_record(totals, date, kind, value):
+    """Same counting rules as HistoryStore.daily_counts."""
+    if kind == "done":
+        totals[date] = totals.get(date, 0) + 1
+    elif kind == "gap":
+        totals.setdefault(date, 0)
+        totals.setdefault(value, 0)
+    elif kind == "count":
+        try:
+            totals[date] = totals.get(date, 0) + int(value)
+        except ValueError:
+            totals.setdefault(date, 0)
+
+
+def build_index(base_dir):
+    """Rebuild analytics.idx from the whole history. Returns (first_ordinal, prefix)."""
+    history_path = os.path.join(base_dir, HISTORY_NAME)
+    stamp = file_stamp(history_path)
+    counts = HistoryStore(base_dir).daily_counts()
+    if stamp is None or not counts:
+        return None, array("q", [0])
+    first = parse_date(counts[0][0]).toordinal()
+    prefix = array("q", [0])
+    prefix.extend(accumulate(count for _, count in counts))
+    _write_index(os.path.join(base_dir, ANALYTICS_NAME), first, stamp, prefix)
+    return first, prefix
+
+
+def extend_index(base_dir, stamp_before):
+    """
+    Bring analytics.idx up to date after records were appended to a
+    history.txt whose stamp was stamp_before. Reads only the appended
+    bytes. Does nothing if there is no index or it was already stale
+    (it is rebuilt on next use instead).
+    """
+    path = os.path.join(base_dir, ANALYTICS_NAME)
+    index = _read_index(path)
+    if index is None or index[1] != stamp_before:
+        return
+    first, (_, covered), prefix = index
+    history_path = os.path.join(base_dir, HISTORY_NAME)
+    stamp = file_stamp(history_path)
+    if stamp is None or stamp[1] < covered:
+        os.remove(path)
+        return
+
+    totals = {}
+    with open(history_path, "rb") as f:
+        f.seek(covered)
+        for raw in f:
+            record = parse_record(raw.decode("utf-8"))
+            if record is not None:
+                _add_record(totals, *record)
+    if totals:
+        days = len(prefix) - 1
+        start = parse_date(min(totals)).toordinal() - first
+        if start < days:
+            # not a plain append after all
+            os.remove(path)
+            return
+        end = parse_date(max(totals)).toordinal() - first
+        total = prefix[-1]
+        for i in range(days, end + 1):
+            total += totals.get(_ordinal_date(first + i), 0)
+            prefix.append(total)
+    _write_index(path, first, stamp, prefix)
+
+
+# === QUERIES ===
+class Analytics:
+    """
+    Range queries over one Habit folder. Dates are "YYYY-MM-DD" strings,
+    ranges are inclusive and clamped to the recorded days; habit=None means
+    all habits together.
+    """
+
+    def __init__(self, base_dir, habits=None, history=None):
+        self.base_dir = base_dir
+        if habits is None:
+            habits = parse_habits(_read_text(os.path.join(base_dir, "habits.txt")) or "")
+        self.habits = list(habits)
+        self._habit_prefix = {}
+        # history: another source with iter_range/daily_counts (e.g. the
+        # SQLite backend, already indexed); its prefix sums stay in memory
+        self.history = history
+        if history is not None:
+            counts = history.daily_counts()
+            self.first = parse_date(counts[0][0]).toordinal() if counts else None
+            self.prefix = array("q", [0])
+            self.prefix.extend(accumulate(count for _, count in counts))
+            return
+        index = _read_index(os.path.join(base_dir, ANALYTICS_NAME))
+        if index is not None and index[1] == file_stamp(os.path.join(base_dir, HISTORY_NAME)):
+            self.first, _, self.prefix = index
+        else:
+            self.first, self.prefix = build_index(base_dir)
+
+    @property
+    def days(self):
+        return len(self.prefix) - 1
+
+    def first_date(self):
+        return _ordinal_date(self.first) if self.days else None
+
+    def last_date(self):
+        return _ordinal_date(self.first + self.days - 1) if self.days else None
+
+    # --- prefix sums ---
+    def _span(self, start, end):
+        """Index range [lo, hi) of start..end within the recorded days."""
+        if not self.days:
+            return 0, 0
+        lo = 0 if start is None else min(max(parse_date(start).toordinal() - self.first, 0), self.days)
+        hi = self.days if end is None else min(parse_date(end).toordinal() - self.first + 1, self.days)
+        return lo, max(lo, hi)
+
+    def _prefix(self, habit):
+        if habit is None:
+            return self.prefix
+        prefix = self._habit_prefix.get(habit)
+        if prefix is None:
+            self._build_habit_prefixes([habit])
+            prefix = self._habit_prefix[habit]
+        return prefix
+
+    def _build_habit_prefixes(self, wanted):
+        if not self.days:
+            for habit in wanted:
+                self._habit_prefix[habit] = array("q", [0])
+            return
+        first, last = self.first_date(), self.last_date()
+        if self.history is None and os.path.exists(os.path.join(self.base_dir, BITMAP_NAME)):
+            with BitmapStore(self.base_dir) as bitmap:
+                columns = {habit: bitmap.column(habit, first, last) for habit in wanted}
+        elif hasattr(self.history, "habit_days"):
+            # habits.db: each habit's days straight from the (habit, date) index
+            columns = {}
+            for habit in wanted:
+                column = columns[habit] = bytearray(self.days)
+                for date in self.history.habit_days(habit, first, last):
+                    column[parse_date(date).toordinal() - self.first] = 1
+        else:
+            # one pass over the history for every habit of habits.txt at once
+            wanted = list(dict.fromkeys(list(wanted) + self.habits))
+            columns = {habit: bytearray(self.days) for habit in wanted}
+            history = self.history or HistoryStore(self.base_dir)
+            for date, kind, value in history.iter_range(first, last):
+                column = columns.get(value)
+                if kind == "done" and column is not None:
+                    column[parse_date(date).toordinal() - self.first] = 1
+        for habit, column in columns.items():
+            prefix = array("q", [0])
+            prefix.extend(accumulate(column))
+            self._habit_prefix[habit] = prefix
+
+    def total(self, start=None, end=None, habit=None):
+        """Completions in start..end."""
+        lo, hi = self._span(start, end)
+        prefix = self._prefix(habit)
+        return prefix[hi] - prefix[lo]
+
+    def day_count(self, start=None, end=None):
+        lo, hi = self._span(start, end)
+        return hi - lo
+
+    def rate(self, start=None, end=None, habit=None):
+        """
+        Share of possible completions that happened: done days / days for
+        one habit, completions / (days x current habit count) overall.
+        """
+        days = self.day_count(start, end)
+        slots = days if habit is not None else days * len(self.habits)
+        return self.total(start, end, habit) / slots if slots else 0.0
+
+    def daily(self, start=None, end=None, habit=None):
+        """[(date, completions)] for every day in start..end."""
+        lo, hi = self._span(start, end)
+        prefix = self._prefix(habit)
+        return [(_ordinal_date(self.first + i), prefix[i + 1] - prefix[i]) for i in range(lo, hi)]
+
+    def rolling(self, window, start=None, end=None, habit=None):
+        """[(date, average completions over the `window` days ending on date)]."""
+        lo, hi = self._span(start, end)
+        prefix = self._prefix(habit)
+        series = []
+        for i in range(lo, hi):
+            begin = max(0, i + 1 - window)
+            series.append((_ordinal_date(self.first + i), (prefix[i + 1] - prefix[begin]) / (i + 1 - begin)))
+        return series
+
+    def rollup(self, period, start=None, end=None, habit=None):
+        """
+        [(label, completions, days)] per "week" (Monday-Sunday, labelled by
+        its Monday) or "month" ("YYYY-MM"); the first and last buckets may
+        be partial.
+        """
+        lo, hi = self._span(start, end)
+        prefix = self._prefix(habit)
+        buckets = []
+        i = lo
+        while i < hi:
+            day = parse_date(_ordinal_date(self.first + i))
+            if period == "week":
+                label = _ordinal_date(day.toordinal() - day.weekday())
+                length = 7 - day.weekday()
+            elif period == "month":
+                label = day.strftime("%Y-%m")
+                length = calendar.monthrange(day.year, day.month)[1] - day.day + 1
+            else:
+                raise ValueError(f"unknown period: {period}")
+            j = min(i + length, hi)
+            buckets.append((label, prefix[j] - prefix[i], j - i))
+            i = j
+        return buckets
+
+    def weekdays(self, start=None, end=None, habit=None):
+        """[(weekday name, completions, days)] for Monday..Sunday."""
+        lo, hi = self._span(start, end)
+        prefix = self._prefix(habit)
+        result = []
+        for weekday in range(7):
+            # first index in range that falls on this weekday, then every 7th
+            offset = (weekday - (self.first + lo - 1) % 7) % 7
+            idx = range(lo + offset, hi, 7)
+            total = sum(prefix[i + 1] - prefix[i] for i in idx)
+            result.append((WEEKDAYS[weekday], total, len(idx)))
+        return result
+
+    # --- text ---
+    def summary(self, start=None, end=None):
+        """Plain-text report for start..end (default: everything)."""
+        if not self.days:
+            return "No history yet."
+        lo, hi = self._span(start, end)
+        if hi <= lo:
+            return "No history in that range."
+        first, last = _ordinal_date(self.first + lo), _ordinal_date(self.first + hi - 1)
+        lines = [f"{first} to {last} ({hi - lo} days)",
+                 f"Overall: {self.total(first, last)} completions, {self.rate(first, last):.0%} of possible",
+                 f"Last 7 days: {self._recent_rate(last, 7):.0%}   Last 30 days: {self._recent_rate(last, 30):.0%}",
+                 ""]
+        if self.habits:
+            self._build_habit_prefixes([h for h in self.habits if h not in self._habit_prefix])
+            width = max(len(h) for h in self.habits)
+            for habit in self.habits:
+                lines.append(f"{habit.ljust(width)}  {self.total(first, last, habit):>6}  "
+                             f"{self.rate(first, last, habit):>4.0%}")
+            lines.append("")
+        lines.append("By weekday: " + "  ".join(
+            f"{name} {total / days:.1f}" if days else f"{name} -"
+            for name, total, days in self.weekdays(first, last)))
+        return "\n".join(lines)
+
+    def _recent_rate(self, last, days):
+        return self.rate(_ordinal_date(parse_date(last).toordinal() - days + 1), last)
+
+
+def completion_series(analytics, view, start=None, end=None):
+    """
+    (title, values, labels) for one of the chart views:
+    daily, avg7, avg30, weekly, monthly, weekdays. labels name each value's
+    bucket: its date, its week's Monday, "YYYY-MM" or the weekday.
+    """
+    if view == "daily":
+        series = analytics.daily(start, end)
+        return "Completions per day", [v for _, v in series], [d for d, _ in series]
+    if view in ("avg7", "avg30"):
+        window = 7 if view == "avg7" else 30
+        series = analytics.rolling(window, start, end)
+        return f"{window}-day average", [v for _, v in series], [d for d, _ in series]
+    if view in ("weekly", "monthly"):
+        series = analytics.rollup("week" if view == "weekly" else "month", start, end)
+        title = "Completions per week" if view == "weekly" else "Completions per month"
+        return title, [v for _, v, _ in series], [label for label, _, _ in series]
+    if view == "weekdays":
+        series = analytics.weekdays(start, end)
+        return ("Average per weekday (Mon-Sun)", [t / d if d else 0 for _, t, d in series],
+                [name for name, _, _ in series])
+    raise ValueError(f"unknown view: {view}")
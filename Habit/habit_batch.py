@@ -0,0 +1,369 @@
+"""
+Headless rollover for many Habit folders.
+
+    python habit_batch.py rollover [--workers N] [--date YYYY-MM-DD] FOLDER_OR_GLOB...
+    python habit_batch.py backfill FOLDER YYYY-MM-DD [HABIT...]
+    python habit_batch.py streaks FOLDER [--fix]
+    python habit_batch.py bitmap FOLDER
+    python habit_batch.py rename FOLDER OLD NEW
+    python habit_batch.py stats FOLDER [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+    python habit_batch.py migrate FOLDER --to sqlite|txt
+    python habit_batch.py import FOLDER FILE.csv [--format auto|long|wide]
+    python habit_batch.py export FOLDER FILE.csv|- [--format long|wide]
+    python habit_batch.py report FOLDER_OR_GLOB... [--out DIR] [--format svg|png] [--days N]
+    python habit_batch.py archive FOLDER [--before YEAR]
+
+Each folder is rolled over (history, streaks, today.txt) in a process pool
+while holding that folder's lock. Prints one line per failure and a summary
+with throughput. Never imports tkinter or PIL, so it runs on servers.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import habit_clock
+from habit_analytics import Analytics
+from habit_bitmap import build_bitmap
+from habit_csv import CHUNK_ROWS, export_csv, import_csv
+from habit_lock import folder_lock
+from habit_report import render_report
+from habit_history import HistoryStore, shift_date
+from habit_rollover import backfill_day, load_tasks, rename_habit, rollover
+from habit_storage import migrate, open_storage
+from habit_streaks import StreakEngine
+
+
+def expand_folders(patterns):
+    """Expand globs, keep only directories, drop duplicates (order kept)."""
+    seen = set()
+    folders = []
+    for pattern in patterns:
+        matches = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        for path in sorted(matches):
+            path = os.path.abspath(path)
+            if os.path.isdir(path) and path not in seen:
+                seen.add(path)
+                folders.append(path)
+    return folders
+
+
+def rollover_folder(folder, today=None, lock_timeout=10.0):
+    """Worker: roll one folder over. Returns (folder, error_or_None, seconds)."""
+    start = time.perf_counter()
+    try:
+        with folder_lock(folder, timeout=lock_timeout):
+            rollover(folder, today)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return folder, error, time.perf_counter() - start
+
+
+def _rollover_task(args):
+    return rollover_folder(*args)
+
+
+def run_rollover(folders, workers=None, today=None, lock_timeout=10.0):
+    """
+    Roll all folders over in a process pool (in-process when workers == 1).
+    Returns a report dict with counts, failures and folders per second.
+    """
+    start = time.perf_counter()
+    tasks = [(folder, today, lock_timeout) for folder in folders]
+    if workers == 1 or len(folders) <= 1:
+        results = [_rollover_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(_rollover_task, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    failures = [{"folder": folder, "error": error} for folder, error, _ in results if error]
+    return {
+        "folders": len(folders),
+        "ok": len(folders) - len(failures),
+        "failed": len(failures),
+        "failures": failures,
+        "seconds": round(elapsed, 4),
+        "folders_per_second": round(len(folders) / elapsed, 1) if elapsed > 0 else None,
+        "slowest_seconds": round(max((s for _, _, s in results), default=0.0), 4),
+    }
+
+
+def report_path(folder, out_dir, fmt, common):
+    """Where folder's chart goes: inside the folder, or in out_dir named after its path."""
+    if out_dir is None:
+        return os.path.join(folder, f"report.{fmt}")
+    rel = os.path.relpath(folder, common) if common else os.path.basename(folder)
+    name = rel.replace(os.sep, "_") if rel != "." else os.path.basename(folder)
+    return os.path.join(out_dir, f"{name}.{fmt}")
+
+
+def report_folder(folder, out_path, fmt="svg", view="daily", days=None, size=(800, 500)):
+    """Worker: render one folder's chart. Returns (folder, error_or_None, seconds)."""
+    start = time.perf_counter()
+    try:
+        render_report(folder, out_path, fmt, view, days, *size)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return folder, error, time.perf_counter() - start
+
+
+def _report_task(args):
+    return report_folder(*args)
+
+
+def run_reports(folders, out_dir=None, fmt="svg", view="daily", days=None, size=(800, 500), workers=None):
+    """Render a chart for every folder in a process pool. Returns a report dict like run_rollover."""
+    start = time.perf_counter()
+    common = os.path.commonpath(folders) if len(folders) > 1 else None
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    tasks = [(folder, report_path(folder, out_dir, fmt, common), fmt, view, days, size) for folder in folders]
+    if workers == 1 or len(folders) <= 1:
+        results = [_report_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(_report_task, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    failures = [{"folder": folder, "error": error} for folder, error, _ in results if error]
+    return {
+        "folders": len(folders),
+        "ok": len(folders) - len(failures),
+        "failed": len(failures),
+        "failures": failures,
+        "seconds": round(elapsed, 4),
+        "folders_per_second": round(len(folders) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def audit_streaks(folder, fix=False):
+    """Print stored vs recomputed streaks as JSON; exit code 1 on mismatch."""
+    with folder_lock(folder):
+        storage = open_storage(folder)
+        try:
+            today_date, _ = storage.load_today()
+            if today_date is None:
+                # fresh folder: never rolled over, so the history is empty
+                today_date = habit_clock.today_str()
+            habits = load_tasks(folder)
+            stored = StreakEngine(*storage.load_streaks())
+            computed = StreakEngine.from_history(folder, habits, end=shift_date(today_date, -1),
+                                                 history=storage)
+            mismatches = {
+                habit: {"stored": [stored.current_streak(habit), stored.best_streak(habit)],
+                        "computed": [computed.current_streak(habit), computed.best_streak(habit)]}
+                for habit in habits
+                if (stored.current_streak(habit), stored.best_streak(habit))
+                != (computed.current_streak(habit), computed.best_streak(habit))
+            }
+            if fix and mismatches:
+                storage.save_streaks(computed.current, computed.best)
+        finally:
+            storage.close()
+    print(json.dumps({
+        "current": computed.current,
+        "best": computed.best,
+        "runs": {habit: runs for habit, runs in computed.runs.items() if runs},
+        "mismatches": mismatches,
+    }, indent=2))
+    return 1 if mismatches and not fix else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Habit folder tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_roll = sub.add_parser("rollover", help="run the daily rollover for many Habit folders")
+    p_roll.add_argument("folders", nargs="+", help="Habit folders or glob patterns")
+    p_roll.add_argument("--workers", type=int, default=None, help="process count (default: CPU count)")
+    p_roll.add_argument("--date", default=None, help="roll over to this YYYY-MM-DD instead of today")
+    p_roll.add_argument("--lock-timeout", type=float, default=10.0, help="seconds to wait for a folder lock")
+    p_roll.add_argument("--json", action="store_true", help="print the report as JSON")
+
+    p_fill = sub.add_parser("backfill", help="set which habits were done on a past day")
+    p_fill.add_argument("folder", help="Habit folder")
+    p_fill.add_argument("date", help="YYYY-MM-DD")
+    p_fill.add_argument("habits", nargs="*", help="habits done that day (none = nothing done)")
+
+    p_streaks = sub.add_parser("streaks", help="recompute streaks from history.txt and compare")
+    p_streaks.add_argument("folder", help="Habit folder")
+    p_streaks.add_argument("--fix", action="store_true", help="write the recomputed streaks")
+
+    p_bits = sub.add_parser("bitmap", help="build history.bits (one bit per day and habit) from the history")
+    p_bits.add_argument("folder", help="Habit folder")
+
+    p_rename = sub.add_parser("rename", help="rename a habit, keeping its history and streaks")
+    p_rename.add_argument("folder", help="Habit folder")
+    p_rename.add_argument("old", help="current habit name")
+    p_rename.add_argument("new", help="new habit name")
+
+    p_stats = sub.add_parser("stats", help="print completion rates and a weekday breakdown")
+    p_stats.add_argument("folder", help="Habit folder")
+    p_stats.add_argument("--start", default=None, help="first day (YYYY-MM-DD)")
+    p_stats.add_argument("--end", default=None, help="last day (YYYY-MM-DD)")
+
+    p_migrate = sub.add_parser("migrate", help="move a folder between the txt and sqlite backends")
+    p_migrate.add_argument("folder", help="Habit folder")
+    p_migrate.add_argument("--to", required=True, choices=("sqlite", "txt"))
+
+    p_import = sub.add_parser("import", help="merge a CSV export (Loop Habit Tracker or date,habit,done) into the history")
+    p_import.add_argument("folder", help="Habit folder")
+    p_import.add_argument("csv", help="CSV file")
+    p_import.add_argument("--format", default="auto", choices=("auto", "long", "wide"))
+    p_import.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="records sorted in memory at a time")
+
+    p_export = sub.add_parser("export", help="write the whole history as CSV")
+    p_export.add_argument("folder", help="Habit folder")
+    p_export.add_argument("csv", help="CSV file, or - for stdout")
+    p_export.add_argument("--format", default="long", choices=("long", "wide"))
+
+    p_report = sub.add_parser("report", help="render progress chart images for many Habit folders")
+    p_report.add_argument("folders", nargs="+", help="Habit folders or glob patterns")
+    p_report.add_argument("--out", default=None, help="directory for the images (default: report.svg in each folder)")
+    p_report.add_argument("--format", default="svg", choices=("svg", "png"), help="png needs Pillow")
+    p_report.add_argument("--view", default="daily", choices=("daily", "avg7", "avg30", "weekly", "monthly", "weekdays"))
+    p_report.add_argument("--days", type=int, default=None, help="only chart the last N recorded days")
+    p_report.add_argument("--size", default="800x500", help="WIDTHxHEIGHT in pixels")
+    p_report.add_argument("--workers", type=int, default=None, help="process count (default: CPU count)")
+    p_report.add_argument("--json", action="store_true", help="print the report as JSON")
+
+    p_archive = sub.add_parser("archive", help="move closed years of history.txt into compressed segments")
+    p_archive.add_argument("folder", help="Habit folder")
+    p_archive.add_argument("--before", type=int, default=None, help="archive the years before this one (default: this year)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "archive":
+        before = args.before or habit_clock.today().year
+        with folder_lock(args.folder):
+            storage = open_storage(args.folder)
+            try:
+                with storage.transaction():
+                    years = storage.archive_history(f"{before:04d}-01-01")
+            finally:
+                storage.close()
+        if storage.kind == "sqlite":
+            print("habits.db is indexed by date already; nothing to archive")
+            return 0
+        print(f"{len(years)} years archived")
+        print(f"{'year':<6}{'days':>6}{'sum':>9}{'min':>6}{'max':>6}{'records':>10}")
+        for header in HistoryStore(args.folder).segments():
+            if header is not None:
+                print(f"{header['year']:<6}{header['count']:>6}{header['sum']:>9}"
+                      f"{header['min']:>6}{header['max']:>6}{header['records']:>10}")
+        return 0
+
+    if args.command == "report":
+        if args.format == "png":
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                print("--format png needs Pillow (pip install pillow); --format svg needs nothing", file=sys.stderr)
+                return 1
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        folders = expand_folders(args.folders)
+        report = run_reports(folders, args.out, args.format, args.view, args.days, (width, height), args.workers)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            for failure in report["failures"]:
+                print(f"FAILED {failure['folder']}: {failure['error']}", file=sys.stderr)
+            print(f"{report['ok']}/{report['folders']} reports written in {report['seconds']:.2f}s "
+                  f"({report['folders_per_second']} folders/s), {report['failed']} failed")
+        return 1 if report["failed"] else 0
+
+    if args.command == "import":
+        def progress(stats):
+            percent = 100 * stats["bytes"] / stats["total_bytes"] if stats["total_bytes"] else 100
+            print(f"\r{percent:5.1f}%  {stats['rows']} rows, {stats['days']} days merged",
+                  end="", file=sys.stderr, flush=True)
+
+        with folder_lock(args.folder):
+            stats = import_csv(args.folder, args.csv, args.format, args.chunk_rows, progress)
+        print(file=sys.stderr)
+        print(json.dumps(stats, indent=2))
+        return 0
+
+    if args.command == "export":
+        if args.csv == "-":
+            rows = export_csv(args.folder, sys.stdout, args.format)
+        else:
+            with open(args.csv, "w", encoding="utf-8", newline="", buffering=1 << 20) as out:
+                rows = export_csv(args.folder, out, args.format)
+        print(f"{rows} rows exported", file=sys.stderr)
+        return 0
+
+    if args.command == "migrate":
+        try:
+            with folder_lock(args.folder):
+                copied = migrate(args.folder, args.to)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"{copied} history records moved to {args.to}")
+        return 0
+
+    if args.command == "stats":
+        storage = open_storage(args.folder)
+        try:
+            history = storage if storage.kind == "sqlite" else None
+            print(Analytics(args.folder, history=history).summary(args.start, args.end))
+        finally:
+            storage.close()
+        return 0
+
+    if args.command == "streaks":
+        return audit_streaks(args.folder, args.fix)
+
+    if args.command == "bitmap":
+        with folder_lock(args.folder):
+            storage = open_storage(args.folder)
+            try:
+                days = build_bitmap(args.folder, storage)
+            finally:
+                storage.close()
+        print(f"{days} days written to history.bits")
+        return 0
+
+    if args.command == "rename":
+        try:
+            with folder_lock(args.folder):
+                rename_habit(args.folder, args.old, args.new)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "backfill":
+        datetime.strptime(args.date, "%Y-%m-%d")
+        with folder_lock(args.folder):
+            streaks = backfill_day(args.folder, args.date, args.habits)
+        print(json.dumps(streaks, indent=2))
+        return 0
+
+    today = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else None
+    folders = expand_folders(args.folders)
+    report = run_rollover(folders, args.workers, today, args.lock_timeout)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for failure in report["failures"]:
+            print(f"FAILED {failure['folder']}: {failure['error']}", file=sys.stderr)
+        print(f"{report['ok']}/{report['folders']} folders rolled over in "
+              f"{report['seconds']:.2f}s ({report['folders_per_second']} folders/s), "
+              f"{report['failed']} failed")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
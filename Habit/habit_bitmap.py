@@ -0,0 +1,325 @@
+"""
+Columnar completion store: one bit per (day, habit).
+
+history.bits is a small header followed by one fixed-width row per day,
+starting at the first recorded day; bit i of a row is the habit with ID i
+in habit_ids.txt. New days are only ever appended, and the file is read
+through mmap, so a day is one contiguous row slice and a habit's column is
+a strided slice over the rows.
+
+A habit keeps its ID for good (a rename only changes the name next to it),
+so renaming never touches the bitmap. The history (history.txt or
+habits.db) stays the source of truth; build_bitmap() recreates the bitmap
+from it at any time.
+"""
+import datetime
+import mmap
+import os
+import struct
+
+from habit_history import HistoryStore, format_date, parse_date
+from habit_store import _read_text, atomic_write, parse_habits
+
+BITMAP_NAME = "history.bits"
+IDS_NAME = "habit_ids.txt"
+BITMAP_MAGIC = b"HBITS001"
+# magic, ordinal of the first day, bytes per day row
+BITMAP_HEADER = struct.Struct("<8sqq")
+MIN_STRIDE = 8
+
+# byte value -> 1/0 "is bit n set", one translate table per bit
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def _stride_for(max_id):
+    """Row width in bytes for IDs up to max_id, rounded up to 8 bytes."""
+    needed = max_id // 8 + 1
+    return max(MIN_STRIDE, (needed + 7) // 8 * 8)
+
+
+# === HABIT IDS ===
+class HabitIds:
+    """
+    habit_ids.txt: one "id<TAB>name" line per habit ever seen.
+    IDs are handed out in order and never reused.
+    """
+
+    def __init__(self, base_dir):
+        self.path = os.path.join(base_dir, IDS_NAME)
+        self.names = []
+        self.ids = {}
+        for line in (_read_text(self.path) or "").splitlines():
+            id_text, sep, name = line.partition("\t")
+            if not sep:
+                continue
+            try:
+                habit_id = int(id_text)
+            except ValueError:
+                continue
+            while len(self.names) <= habit_id:
+                self.names.append(None)
+            self.names[habit_id] = name
+            self.ids[name] = habit_id
+
+    def get(self, name):
+        return self.ids.get(name)
+
+    def assign(self, habits):
+        """Give every habit without an ID the next free one. Returns True if any were new."""
+        new = [habit for habit in dict.fromkeys(habits) if habit not in self.ids]
+        if not new:
+            return False
+        for habit in new:
+            self.ids[habit] = len(self.names)
+            self.names.append(habit)
+        self.save()
+        return True
+
+    def rename(self, old, new):
+        if new in self.ids:
+            raise ValueError(f"habit already exists: {new}")
+        if old not in self.ids:
+            return
+        habit_id = self.ids.pop(old)
+        self.names[habit_id] = new
+        self.ids[new] = habit_id
+        self.save()
+
+    def save(self):
+        atomic_write(self.path, "".join(
+            f"{habit_id}\t{name}\n" for habit_id, name in enumerate(self.names) if name is not None))
+
+
+# === BITMAP ===
+class BitmapStore:
+    """
+    history.bits, memory-mapped read/write.
+
+    day_row() and column_view() return memoryviews straight into the map;
+    release them (or drop them) before the next write, which may have to
+    grow and remap the file.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, BITMAP_NAME)
+        self.ids = HabitIds(base_dir)
+        self.first = None  # ordinal of row 0
+        self.stride = 0
+        self.days = 0
+        self._file = None
+        self._map = None
+        if os.path.exists(self.path):
+            self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def exists(self):
+        return self._map is not None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # --- file layout ---
+    def _open(self):
+        self._file = open(self.path, "r+b")
+        header = self._file.read(BITMAP_HEADER.size)
+        if len(header) != BITMAP_HEADER.size:
+            self.close()
+            raise ValueError(f"{self.path}: truncated header")
+        magic, self.first, self.stride = BITMAP_HEADER.unpack(header)
+        if magic != BITMAP_MAGIC or self.stride <= 0:
+            self.close()
+            raise ValueError(f"{self.path}: not a habit bitmap")
+        size = os.fstat(self._file.fileno()).st_size
+        self.days = (size - BITMAP_HEADER.size) // self.stride
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def _offset(self, index):
+        return BITMAP_HEADER.size + index * self.stride
+
+    def _rewrite(self, first, stride):
+        """
+        Rewrite the file with an earlier first day and/or wider rows.
+        Only needed for a backfill before the first day or once the habit
+        IDs outgrow the row width; goes through a temp file and rename.
+        """
+        shift = (self.first - first) if self._map is not None else 0
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(BITMAP_HEADER.pack(BITMAP_MAGIC, first, stride))
+            out.write(bytes(shift * stride))
+            pad = bytes(stride - self.stride) if self._map is not None else b""
+            for index in range(self.days):
+                start = self._offset(index)
+                out.write(self._map[start:start + self.stride] + pad)
+            out.flush()
+            os.fsync(out.fileno())
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def _ensure(self, ordinal, max_id):
+        """Make room for day `ordinal` and habit ID max_id; return the row index."""
+        stride = _stride_for(max_id)
+        if self._map is None:
+            self.first, self.stride, self.days = ordinal, stride, 0
+            self._rewrite(ordinal, stride)
+        elif ordinal < self.first or stride > self.stride:
+            self._rewrite(min(ordinal, self.first), max(stride, self.stride))
+        index = ordinal - self.first
+        if index >= self.days:
+            # append zero rows (missed days stay all-zero)
+            self._map.close()
+            self._file.truncate(self._offset(index + 1))
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self.days = index + 1
+        return index
+
+    def _index(self, date):
+        if self._map is None:
+            return None
+        index = parse_date(date).toordinal() - self.first
+        return index if 0 <= index < self.days else None
+
+    # --- writes ---
+    def set_day(self, date, completed):
+        """Store exactly the habits in completed as done on date."""
+        self.ids.assign(completed)
+        bits = [self.ids.get(habit) for habit in completed]
+        index = self._ensure(parse_date(date).toordinal(), max(bits, default=0))
+        row = bytearray(self.stride)
+        for bit in bits:
+            row[bit >> 3] |= 1 << (bit & 7)
+        start = self._offset(index)
+        self._map[start:start + self.stride] = bytes(row)
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+
+    # --- queries ---
+    def first_date(self):
+        return None if self._map is None else _ordinal_date(self.first)
+
+    def last_date(self):
+        return None if not self.days else _ordinal_date(self.first + self.days - 1)
+
+    def day_row(self, date):
+        """Zero-copy view of date's row (bit i = habit ID i), or None outside the store."""
+        index = self._index(date)
+        if index is None:
+            return None
+        start = self._offset(index)
+        return memoryview(self._map)[start:start + self.stride]
+
+    def habits_on(self, date):
+        """Names of the habits done on date, in ID order."""
+        row = self.day_row(date)
+        if row is None:
+            return []
+        done = []
+        with row:
+            for byte_index, value in enumerate(row):
+                while value:
+                    low = value & -value
+                    done.append(self.ids.names[byte_index * 8 + low.bit_length() - 1])
+                    value ^= low
+        return done
+
+    def column_view(self, habit, start=None, end=None):
+        """
+        Zero-copy strided view with one byte per day from start to end (both
+        clamped to the stored days): the byte that holds habit's bit.
+        Mask with 1 << (ID % 8) to read it. None if the habit is unknown.
+        """
+        habit_id = self.ids.get(habit)
+        if habit_id is None or not self.days:
+            return None
+        lo, hi = self._span(start, end)
+        view = memoryview(self._map)
+        if hi < lo:
+            return view[0:0]
+        first = self._offset(lo) + (habit_id >> 3)
+        return view[first:self._offset(hi) + (habit_id >> 3) + 1:self.stride]
+
+    def column(self, habit, start, end):
+        """
+        0/1 byte per day from start to end (inclusive), like the columns
+        habit_streaks works on. Days outside the store count as not done.
+        """
+        start_ordinal = parse_date(start).toordinal()
+        out = bytearray(parse_date(end).toordinal() - start_ordinal + 1)
+        habit_id = self.ids.get(habit)
+        if habit_id is None or not self.days:
+            return out
+        lo, hi = self._span(start, end)
+        if hi < lo:
+            return out
+        first = self._offset(lo) + (habit_id >> 3)
+        raw = self._map[first:self._offset(hi) + (habit_id >> 3) + 1:self.stride]
+        at = self.first + lo - start_ordinal
+        out[at:at + len(raw)] = raw.translate(_BIT_TABLES[habit_id & 7])
+        return out
+
+    def _span(self, start, end):
+        """Row indexes (lo, hi) of start..end intersected with the stored days."""
+        lo = 0 if start is None else max(parse_date(start).toordinal() - self.first, 0)
+        hi = self.days - 1 if end is None else min(parse_date(end).toordinal() - self.first, self.days - 1)
+        return lo, hi
+
+
+def _ordinal_date(ordinal):
+    return format_date(datetime.date.fromordinal(ordinal))
+
+
+# === BUILD / UPDATE ===
+def build_bitmap(base_dir, history=None):
+    """
+    (Re)create history.bits from the history (history.txt unless a storage
+    backend is given). Habits in habits.txt get their IDs first, in file
+    order. Returns the number of days stored.
+    """
+    history = history or HistoryStore(base_dir)
+    ids = HabitIds(base_dir)
+    ids.assign(parse_habits(_read_text(os.path.join(base_dir, "habits.txt")) or ""))
+    # first pass: IDs for habits that only appear in the history
+    ids.assign(value for _, kind, value in history.iter_range() if kind == "done")
+
+    path = os.path.join(base_dir, BITMAP_NAME)
+    if os.path.exists(path):
+        os.remove(path)
+    first, last = history.first_date(), history.last_date()
+    if first is None:
+        return 0
+
+    with BitmapStore(base_dir) as store:
+        store._ensure(parse_date(first).toordinal(), max(len(ids.names) - 1, 0))
+        store._ensure(parse_date(last).toordinal(), 0)
+        # second pass: set the bits in place
+        m = store._map
+        for date, kind, value in history.iter_range():
+            if kind != "done":
+                continue
+            habit_id = ids.get(value)
+            at = store._offset(parse_date(date).toordinal() - store.first) + (habit_id >> 3)
+            m[at] |= 1 << (habit_id & 7)
+        store.flush()
+        return store.days
+
+
+def update_bitmap(base_dir, date, completed):
+    """Mirror one recorded day into history.bits, if the folder has one."""
+    if not os.path.exists(os.path.join(base_dir, BITMAP_NAME)):
+        return
+    with BitmapStore(base_dir) as store:
+        store.set_day(date, completed)
@@ -0,0 +1,270 @@
+import math
+
+import habit_perf
+
+RESIZE_DELAY_MS = 60  # wait for the window to stop resizing before redrawing
+MAX_DOTS = 120  # draw per-day dots only while they are still distinguishable
+CHAR_WIDTH = 7  # px per character of an axis label, roughly, in the default font
+
+
+# === DOWNSAMPLING ===
+def minmax_downsample(values, buckets):
+    """
+    Reduce values to at most 2 * buckets points, keeping each bucket's
+    min and max (in their original order) so spikes survive.
+    Returns a list of (index, value).
+    """
+    n = len(values)
+    if n <= 2 * buckets:
+        return list(enumerate(values))
+    out = []
+    size = n / buckets
+    for b in range(buckets):
+        start = int(b * size)
+        end = int((b + 1) * size)
+        chunk = values[start:end]
+        lo = min(chunk)
+        hi = max(chunk)
+        i_lo = start + chunk.index(lo)
+        i_hi = start + chunk.index(hi)
+        if i_lo == i_hi:
+            out.append((i_lo, lo))
+        elif i_lo < i_hi:
+            out.append((i_lo, lo))
+            out.append((i_hi, hi))
+        else:
+            out.append((i_hi, hi))
+            out.append((i_lo, lo))
+    return out
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of [(x, y)] to threshold
+    points. Keeps the first and last point and the visually important ones.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle corner
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = points[next_start:next_end]
+        avg_x = sum(p[0] for p in span) / len(span)
+        avg_y = sum(p[1] for p in span) / len(span)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best = -1.0
+        best_index = start
+        for j in range(start, end):
+            px, py = points[j]
+            area = abs((ax - avg_x) * (py - ay) - (ax - px) * (avg_y - ay))
+            if area > best:
+                best = area
+                best_index = j
+        out.append(points[best_index])
+        a = best_index
+    out.append(points[-1])
+    return out
+
+
+def downsample(values, width):
+    """
+    Reduce a daily series to about one point per pixel column.
+    Min/max bucketing first bounds the work, LTTB then picks the shape.
+    """
+    width = max(3, int(width))
+    if len(values) <= width:
+        return list(enumerate(values))
+    return lttb(minmax_downsample(values, width), width)
+
+
+# === AXIS TICKS ===
+def _nice_number(x, round_result):
+    exponent = math.floor(math.log10(x))
+    fraction = x / 10 ** exponent
+    if round_result:
+        if fraction < 1.5:
+            nice = 1
+        elif fraction < 3:
+            nice = 2
+        elif fraction < 7:
+            nice = 5
+        else:
+            nice = 10
+    else:
+        if fraction <= 1:
+            nice = 1
+        elif fraction <= 2:
+            nice = 2
+        elif fraction <= 5:
+            nice = 5
+        else:
+            nice = 10
+    return nice * 10 ** exponent
+
+
+def nice_ticks(lo, hi, max_ticks=8, integer=True):
+    """
+    Return evenly spaced "nice" tick values (steps of 1, 2 or 5 x 10^k)
+    covering lo..hi, with at most about max_ticks of them.
+    """
+    if hi <= lo:
+        return [lo]
+    span = _nice_number(hi - lo, False)
+    step = _nice_number(span / max(1, max_ticks - 1), True)
+    if integer:
+        step = max(1, int(round(step)))
+    first = math.ceil(lo / step) * step
+    ticks = []
+    value = first
+    while value <= hi + step * 1e-9:
+        ticks.append(int(value) if integer else value)
+        value += step
+    return ticks
+
+
+def tick_text(value):
+    # float steps leave 0.30000000000000004 behind
+    return f"{value:.10g}"
+
+
+# === LAYOUT ===
+def chart_items(data, points, W, H, title, labels=None):
+    """
+    The drawing for one chart as backend-neutral items, so the Tk canvas
+    and the offscreen renderers (habit_report.py) draw the same thing:
+
+      ("line", coords, width)              flat [x0, y0, x1, y1, ...]
+      ("dot", x, y, radius)
+      ("text", x, y, text, anchor, size)   anchor "center" or "e"; size 0 = default
+    points is downsample(data, plot width). labels name each value on the
+    x axis (dates, weeks, months, weekdays); without them the values are
+    numbered from 1.
+    """
+    PAD = int(min(W, H) * 0.08)
+    if W <= 2 * PAD or H <= 2 * PAD or not data:
+        return []
+    items = []
+
+    # Axes
+    items.append(("line", [PAD, H - PAD, W - PAD, H - PAD], 2))
+    items.append(("line", [PAD, PAD, PAD, H - PAD], 2))
+
+    # Scaling calculations
+    max_y = max(data)
+    min_y = min(data)
+    if max_y == min_y:
+        max_y += 1
+
+    n = len(data)
+    x_step = (W - 2 * PAD) / (n - 1 if n > 1 else 1)
+    y_scale = (H - 2 * PAD) / (max_y - min_y)
+
+    # Line: one polyline item for the whole series
+    coords = []
+    for i, val in points:
+        coords.append(PAD + i * x_step)
+        coords.append(H - PAD - (val - min_y) * y_scale)
+    if len(points) > 1:
+        items.append(("line", coords, 2))
+
+    # Dots, only while there is room for them
+    if len(points) <= MAX_DOTS:
+        for k in range(0, len(coords), 2):
+            items.append(("dot", coords[k], coords[k + 1], 4))
+
+    # Y-axis labels (averages get fractional ticks)
+    integer = all(isinstance(val, int) for val in data)
+    for y_val in nice_ticks(min_y, max_y, integer=integer):
+        y = H - PAD - (y_val - min_y) * y_scale
+        items.append(("text", PAD - 20, y, tick_text(y_val), "e", 0))
+
+    # X-axis labels: as many bucket names as fit side by side
+    if labels is None:
+        labels = [str(i) for i in range(1, n + 1)]
+    longest = max(len(label) for label in labels)
+    max_ticks = max(2, min(15, int((W - 2 * PAD) / (longest * CHAR_WIDTH + 20))))
+    step = math.ceil((n - 1) / (max_ticks - 1)) if n > max_ticks else 1
+    for pos in range(1, n + 1, step):
+        x = PAD + (pos - 1) * x_step
+        items.append(("text", x, H - PAD + 20, labels[pos - 1], "center", 0))
+
+    # Title
+    items.append(("text", W / 2, PAD / 2, title, "center", max(1, int(PAD * 0.4))))
+    return items
+
+
+# === CANVAS CHART ===
+class ProgressChart:
+    """
+    Line chart of daily totals drawn into a Tk canvas.
+
+    The series is downsampled to the plot width and drawn as one polyline,
+    the axes get a handful of nice ticks, and <Configure> storms during a
+    window resize collapse into a single redraw.
+    """
+
+    def __init__(self, canvas, data, title="Habit Progress Over Time", labels=None):
+        self.canvas = canvas
+        self.data = list(data)
+        self.title = title
+        self.labels = labels
+        self._resize_job = None
+        self._cache_key = None
+        self._cache_points = None
+        canvas.bind("<Configure>", self._on_configure)
+
+    def set_data(self, data, title=None, labels=None):
+        """Show a different series (e.g. another analytics view) in the same canvas."""
+        self.data = list(data)
+        self.labels = labels
+        if title is not None:
+            self.title = title
+        self._cache_key = None
+        self.redraw()
+
+    def _on_configure(self, event=None):
+        if self._resize_job is not None:
+            self.canvas.after_cancel(self._resize_job)
+        self._resize_job = self.canvas.after(RESIZE_DELAY_MS, self.redraw)
+
+    def _points(self, plot_width):
+        key = int(plot_width)
+        if key != self._cache_key:
+            self._cache_points = downsample(self.data, key)
+            self._cache_key = key
+        return self._cache_points
+
+    @habit_perf.timed("ProgressChart.redraw")
+    def redraw(self):
+        self._resize_job = None
+        canvas = self.canvas
+        canvas.delete("all")
+
+        W = canvas.winfo_width()
+        H = canvas.winfo_height()
+        PAD = int(min(W, H) * 0.08)
+        if W <= 2 * PAD or H <= 2 * PAD:
+            return
+
+        for item in chart_items(self.data, self._points(W - 2 * PAD), W, H, self.title, self.labels):
+            kind = item[0]
+            if kind == "line":
+                canvas.create_line(*item[1], width=item[2])
+            elif kind == "dot":
+                _, x, y, r = item
+                canvas.create_oval(x - r, y - r, x + r, y + r, fill="black")
+            else:
+                _, x, y, text, anchor, size = item
+                if size:
+                    canvas.create_text(x, y, text=text, anchor=anchor, font=("Arial", size, "bold"))
+                else:
+                    canvas.create_text(x, y, text=text, anchor=anchor)
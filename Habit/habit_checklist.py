@@ -0,0 +1,224 @@
+import tkinter as tk
+
+import habit_perf
+from habit_search import HabitIndex
+
+ROW_GAP = 16  # vertical space between rows (was grid pady=8 above and below)
+OFFSCREEN = -10000  # parking spot for pooled rows with nothing to show
+STREAK_HIGHLIGHT = 10  # streaks above this get the dark blue button
+
+
+class _Row:
+    """One reusable Checkbutton slot of the virtual list."""
+
+    def __init__(self, checklist):
+        self.habit = None
+        self.index = None
+        self.var = tk.BooleanVar(value=False)
+        self.button = tk.Checkbutton(
+            checklist.canvas,
+            text="",
+            variable=self.var,
+            onvalue=True,
+            offvalue=False,
+            font=("Arial", 18),
+            indicatoron=False,
+            padx=20,
+            pady=10,
+            command=lambda: checklist._on_click(self),
+            bg="white",
+            relief="solid",
+            bd=1,
+            state="normal" if checklist.enabled else "disabled"
+        )
+        self.window_id = checklist.canvas.create_window(0, 0, window=self.button, anchor="n")
+
+
+# === VIRTUAL CHECKLIST ===
+class VirtualChecklist:
+    """
+    Scrollable checklist that only creates widgets for the rows in view.
+
+    The canvas scroll region is sized for all habits, but only a small pool
+    of Checkbuttons exists; on every scroll or resize they are moved to the
+    visible row positions and re-labelled. Startup and scrolling therefore
+    cost the same for 10 habits or 10,000. Filtering works the same way:
+    the rows just get bound to the matching habits only.
+    """
+
+    def __init__(self, master, store, on_toggle):
+        self.store = store
+        self.on_toggle = on_toggle
+        self.all_habits = list(store.habits)
+        self.habits = self.all_habits  # the habits shown (all, or the filter's matches)
+        self.query = ""
+        self._search = None  # HabitIndex over all_habits, built on first use
+        self.rows = []
+        self.first_index = None
+        self.enabled = True
+
+        self.canvas = tk.Canvas(master, borderwidth=0, background="#f0f0f0", highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(master, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        # measure one row with a real button so the spacing matches the old grid
+        probe = _Row(self)
+        probe.button.config(text="Ag")
+        self.canvas.update_idletasks()
+        self.row_height = probe.button.winfo_reqheight() + ROW_GAP
+        self.canvas.delete(probe.window_id)
+        probe.button.destroy()
+
+        # one mousewheel "unit" scrolls exactly one row
+        self.canvas.configure(yscrollincrement=self.row_height)
+
+        def _on_mousewheel(event):
+            if event.num == 5 or getattr(event, "delta", 0) < 0:
+                self.canvas.yview_scroll(1, "units")
+            elif event.num == 4 or getattr(event, "delta", 0) > 0:
+                self.canvas.yview_scroll(-1, "units")
+
+        self.canvas.bind_all("<MouseWheel>", _on_mousewheel)
+        self.canvas.bind_all("<Button-4>", _on_mousewheel)
+        self.canvas.bind_all("<Button-5>", _on_mousewheel)
+        self.canvas.bind("<Configure>", lambda event: self._layout())
+
+        self._update_scrollregion()
+
+    # --- geometry ---
+    def _update_scrollregion(self):
+        total = len(self.habits) * self.row_height
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), total))
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def _layout(self):
+        """Canvas resized: grow the row pool if needed and re-centre rows."""
+        self._update_scrollregion()
+        visible = self.canvas.winfo_height() // self.row_height + 2
+        while len(self.rows) < min(visible, len(self.habits)):
+            self.rows.append(_Row(self))
+        # the width may have changed: every row has to move, none re-labelled
+        for row in self.rows:
+            row.index = None
+        self.first_index = None
+        self.render()
+
+    # --- rendering ---
+    @habit_perf.timed("VirtualChecklist.render")
+    def render(self):
+        """Bind the pooled rows to the habits currently in the viewport."""
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.row_height))
+        if first == self.first_index:
+            return
+        self.first_index = first
+        center_x = self.canvas.winfo_width() / 2
+        for offset, row in enumerate(self.rows):
+            self._bind(row, first + offset, center_x)
+
+    def _bind(self, row, index, center_x):
+        """Show habit number index in row; a row already showing it is left alone."""
+        habit = self.habits[index] if index < len(self.habits) else None
+        if habit is None:
+            row.habit = row.index = None
+            self.canvas.coords(row.window_id, OFFSCREEN, OFFSCREEN)
+            return
+        if row.habit == habit and row.index == index:
+            return
+        if row.habit != habit:
+            row.habit = habit
+            row.var.set(self.store.is_done(habit))
+            row.button.config(text=habit)
+            self._style(row)
+        row.index = index
+        self.canvas.coords(row.window_id, center_x, index * self.row_height + ROW_GAP // 2)
+
+    def refresh(self):
+        """Re-read done/streak state for the visible rows."""
+        for row in self.rows:
+            row.habit = row.index = None
+        self.first_index = None
+        self.render()
+
+    def set_habits(self, habits):
+        """
+        Switch to a new habit list (habits.txt was edited) without rebuilding.
+
+        Rows that still show the same habit at the same position are left
+        alone; only rows whose habit was added, removed or moved get
+        re-labelled or moved, and surplus pooled rows are destroyed.
+        Completion state comes from the store, so it carries over, and an
+        active filter is applied to the new list.
+        Returns (added, removed) habit lists.
+        """
+        old = self.all_habits
+        self.all_habits = list(habits)
+        old_set, new_set = set(old), set(self.all_habits)
+        added = [h for h in self.all_habits if h not in old_set]
+        removed = [h for h in old if h not in new_set]
+
+        while len(self.rows) > len(self.all_habits):
+            row = self.rows.pop()
+            self.canvas.delete(row.window_id)
+            row.button.destroy()
+        self._search = None
+        if self.query.strip():
+            self._show(self._matches(self.query))
+        else:
+            self._show(self.all_habits)
+        return added, removed
+
+    def set_enabled(self, enabled):
+        """Take clicks (True) or show the rows greyed out (False)."""
+        self.enabled = enabled
+        for row in self.rows:
+            row.button.config(state="normal" if enabled else "disabled")
+
+    # --- filtering ---
+    def prepare_search(self):
+        """Build the search index now (e.g. when the search box gets focus)."""
+        if self._search is None:
+            self._search = HabitIndex(self.all_habits)
+
+    def _matches(self, query):
+        self.prepare_search()
+        habits = self.all_habits
+        return [habits[p] for p in self._search.find(query)]
+
+    @habit_perf.timed("VirtualChecklist.filter")
+    def filter(self, query):
+        """Show only the habits whose name contains every word of query (any case)."""
+        if query == self.query:
+            return
+        self.query = query
+        self.canvas.yview_moveto(0)
+        self._show(self._matches(query) if query.strip() else self.all_habits)
+
+    def _show(self, habits):
+        """Bind the pooled rows to habits; rows left over are parked, not destroyed."""
+        self.habits = habits
+        self._update_scrollregion()
+        visible = self.canvas.winfo_height() // self.row_height + 2
+        while len(self.rows) < min(visible, len(self.habits)):
+            self.rows.append(_Row(self))
+        self.first_index = None
+        self.render()
+
+    def _style(self, row):
+        if row.var.get():
+            row.button.config(bg="black", fg="white")
+        elif self.store.streak(row.habit) > STREAK_HIGHLIGHT:
+            row.button.config(bg="dark blue", fg="black")
+        else:
+            row.button.config(bg="white", fg="black")
+
+    def _on_click(self, row):
+        if row.habit is None or not self.enabled:
+            return
+        self._style(row)
+        self.on_toggle(row.habit, row.var.get())
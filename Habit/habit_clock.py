@@ -0,0 +1,91 @@
+"""
+The app's idea of "now".
+
+Everything that needs today's date asks this module (now(), today(),
+today_str()) instead of calling datetime.now(), so another clock can be
+put in with set_clock(): a FixedClock for the simulator (habit_sim.py), or
+the real time shifted by whole days. Starting with HABIT_TODAY=YYYY-MM-DD
+does the latter, to try a rollover in the real app without touching the
+system clock (time keeps running from that day; a bad value is ignored).
+"""
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+
+class OffsetClock:
+    """The system clock shifted by a fixed timedelta."""
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    def now(self):
+        return datetime.now() + self.offset
+
+
+class FixedClock:
+    """Stands still until set() or advance() moves it."""
+
+    def __init__(self, when):
+        self.when = when
+
+    def now(self):
+        return self.when
+
+    def set(self, when):
+        self.when = when
+
+    def advance(self, **delta):
+        """Move on by timedelta(**delta), e.g. advance(days=1)."""
+        self.when += timedelta(**delta)
+        return self.when
+
+
+def _initial_clock():
+    try:
+        day = datetime.strptime(os.environ.get("HABIT_TODAY", ""), "%Y-%m-%d").date()
+    except ValueError:
+        return SystemClock()
+    return OffsetClock(timedelta(days=(day - date.today()).days))
+
+
+_clock = _initial_clock()
+
+
+def now():
+    return _clock.now()
+
+
+def today():
+    return _clock.now().date()
+
+
+def today_str():
+    return _clock.now().strftime("%Y-%m-%d")
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Use clock from now on (None: the system clock). Returns the previous clock."""
+    global _clock
+    previous = _clock
+    _clock = clock or SystemClock()
+    return previous
+
+
+@contextmanager
+def using(clock):
+    """Run a block on clock, then put the previous clock back."""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
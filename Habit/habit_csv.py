@@ -0,0 +1,336 @@
+"""
+Streaming CSV import/export of habit history.
+
+Two layouts are understood:
+
+    long   date,habit,done          one row per (day, habit); "done" is
+                                    1/0, yes/no, x, ... An empty habit with a
+                                    number is a bare daily total.
+    wide   Date,Habit 1,Habit 2,..  one row per day, one column per habit
+                                    (Loop Habit Tracker's Checkmarks.csv:
+                                    2 = done, 0 / -1 = not done)
+
+Importing never holds the file in memory: rows are turned into history
+records, sorted in chunks of chunk_rows into temp files, and the sorted
+chunks are merged with the existing history in one pass, whatever order
+the input was in. The merged history is written once (one transaction on
+SQLite), and streaks are recomputed once at the end, not per row.
+"""
+import csv
+import heapq
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from itertools import groupby
+
+from habit_bitmap import BITMAP_NAME, build_bitmap
+from habit_history import format_record, parse_record, shift_date
+from habit_storage import open_storage
+from habit_store import atomic_write
+from habit_streaks import StreakEngine
+
+CHUNK_ROWS = 250_000
+PROGRESS_SECONDS = 1.0
+DONE_WORDS = {"1", "2", "y", "yes", "true", "x", "done", "yes_manual", "yes_auto"}
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d.%m.%Y", "%m/%d/%Y")
+
+
+# === PARSING ===
+def parse_csv_date(text):
+    """Normalise a CSV date (ISO, with or without a time part, or a few common layouts)."""
+    text = text.strip()
+    if len(text) >= 10 and text[4] == "-" and text[7] == "-":
+        text = text[:10]
+        datetime.strptime(text, "%Y-%m-%d")
+        return text
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date: {text!r}")
+
+
+def is_done(value):
+    value = value.strip().lower()
+    if value in DONE_WORDS:
+        return True
+    try:
+        return float(value) > 0
+    except ValueError:
+        return False
+
+
+def _clean_habit(name):
+    # history.txt is tab separated and line based
+    return " ".join(name.replace("\t", " ").split())
+
+
+class _ByteCounter:
+    """Iterate a binary file as text lines while counting the bytes read."""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes = 0
+
+    def __iter__(self):
+        first = True
+        for raw in self.f:
+            self.bytes += len(raw)
+            line = raw.decode("utf-8", errors="replace")
+            if first:
+                line = line.lstrip("﻿")
+                first = False
+            yield line
+
+
+def _records(rows, layout, header, stats):
+    """Yield (date, kind, value) history records from CSV rows."""
+    if layout == "wide":
+        habits = [_clean_habit(h) for h in header[1:]]
+        for row in rows:
+            stats["rows"] += 1
+            try:
+                date = parse_csv_date(row[0])
+            except (ValueError, IndexError):
+                stats["skipped"] += 1
+                continue
+            done = [h for h, value in zip(habits, row[1:]) if h and is_done(value)]
+            for habit in done:
+                yield date, "done", habit
+            if not done:
+                yield date, "count", "0"
+        return
+
+    columns = [c.strip().lower() for c in header]
+    date_col = columns.index("date")
+    habit_col = columns.index("habit")
+    done_col = columns.index("done") if "done" in columns else None
+    for row in rows:
+        stats["rows"] += 1
+        try:
+            date = parse_csv_date(row[date_col])
+            habit = _clean_habit(row[habit_col])
+            value = row[done_col] if done_col is not None and done_col < len(row) else "1"
+        except (ValueError, IndexError):
+            stats["skipped"] += 1
+            continue
+        if not habit:
+            # a bare daily total (e.g. exported from migrated progress.txt)
+            try:
+                yield date, "count", str(int(float(value)))
+            except ValueError:
+                stats["skipped"] += 1
+        elif is_done(value):
+            yield date, "done", habit
+        else:
+            # the day was tracked, with this habit not done
+            yield date, "count", "0"
+
+
+def detect_layout(header):
+    columns = {c.strip().lower() for c in header}
+    return "long" if {"date", "habit"} <= columns else "wide"
+
+
+# === EXTERNAL SORT ===
+def _spill(chunk, tmp_dir, index):
+    chunk.sort()
+    path = os.path.join(tmp_dir, f"chunk{index:05d}.txt")
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.writelines(format_record(*record) for record in chunk)
+    return path
+
+
+def _read_chunk(path):
+    with open(path, "r", encoding="utf-8", buffering=1 << 20) as f:
+        for line in f:
+            record = parse_record(line)
+            if record is not None:
+                yield record
+
+
+def _imported_days(records):
+    """Group sorted records into (date, done set, [counts]) per day, duplicates dropped."""
+    for date, group in groupby(records, key=lambda r: r[0]):
+        done = set()
+        counts = []
+        for _, kind, value in group:
+            if kind == "done":
+                done.add(value)
+            elif value != "0" or not counts:
+                counts.append(value)
+        yield date, done, counts
+
+
+def _day_records(date, done, counts):
+    if done:
+        return [(date, "done", habit) for habit in sorted(done)]
+    nonzero = [c for c in counts if c != "0"]
+    return [(date, "count", c) for c in (nonzero or ["0"])]
+
+
+def merge_history(existing, imported):
+    """
+    Merge sorted existing history records with imported days. A day in
+    both keeps the union of done habits; gap runs are split around
+    imported days.
+    """
+    imported = iter(imported)
+    nxt = next(imported, None)
+    for date, group in groupby(existing, key=lambda r: r[0]):
+        group = list(group)
+        while nxt is not None and nxt[0] < date:
+            yield from _day_records(*nxt)
+            nxt = next(imported, None)
+
+        gaps = [r for r in group if r[1] == "gap"]
+        others = [r for r in group if r[1] != "gap"]
+        piece_start = date
+        if nxt is not None and nxt[0] == date:
+            done = nxt[1] | {v for _, kind, v in others if kind == "done"}
+            counts = [v for _, kind, v in others if kind == "count"] + nxt[2]
+            yield from _day_records(date, done, counts)
+            nxt = next(imported, None)
+            piece_start = shift_date(date, 1)
+        elif others:
+            yield from others
+            piece_start = shift_date(date, 1)
+
+        for _, _, gap_end in gaps:
+            while nxt is not None and nxt[0] <= gap_end:
+                if nxt[0] > piece_start:
+                    yield piece_start, "gap", shift_date(nxt[0], -1)
+                yield from _day_records(*nxt)
+                piece_start = shift_date(nxt[0], 1)
+                nxt = next(imported, None)
+            if piece_start <= gap_end:
+                yield piece_start, "gap", gap_end
+    while nxt is not None:
+        yield from _day_records(*nxt)
+        nxt = next(imported, None)
+
+
+# === IMPORT ===
+def import_csv(base_dir, path, layout="auto", chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Import a CSV export into base_dir's history (any storage backend).
+    New habit names are appended to habits.txt. Days on or after the day
+    currently being tracked are skipped. progress(stats) is called about
+    once a second. Returns the stats dict.
+    """
+    stats = {"rows": 0, "records": 0, "skipped": 0, "future": 0, "days": 0,
+             "new_habits": [], "bytes": 0, "total_bytes": os.path.getsize(path)}
+    storage = open_storage(base_dir)
+    tmp_dir = tempfile.mkdtemp(prefix="habit-import-", dir=base_dir)
+    try:
+        storage.prepare()
+        today_date, _ = storage.load_today()
+        habits = storage.load_habits()
+        known = set(habits)
+        new_habits = []
+
+        # 1. parse and sort in bounded chunks
+        chunks = []
+        chunk = []
+        last_report = time.monotonic()
+        with open(path, "rb") as f:
+            counter = _ByteCounter(f)
+            reader = csv.reader(counter)
+            header = next(reader, None)
+            if header is None:
+                return stats
+            if layout == "auto":
+                layout = detect_layout(header)
+            for record in _records(reader, layout, header, stats):
+                if today_date is not None and record[0] >= today_date:
+                    stats["future"] += 1
+                    continue
+                if record[1] == "done" and record[2] not in known:
+                    known.add(record[2])
+                    new_habits.append(record[2])
+                chunk.append(record)
+                stats["records"] += 1
+                if len(chunk) >= chunk_rows:
+                    chunks.append(_spill(chunk, tmp_dir, len(chunks)))
+                    chunk = []
+                if progress is not None and time.monotonic() - last_report >= PROGRESS_SECONDS:
+                    stats["bytes"] = counter.bytes
+                    progress(stats)
+                    last_report = time.monotonic()
+            stats["bytes"] = counter.bytes
+        if chunk:
+            chunks.append(_spill(chunk, tmp_dir, len(chunks)))
+        chunk = None
+
+        # 2. merge sorted chunks with the existing history into a temp file
+        imported = _imported_days(heapq.merge(*(_read_chunk(p) for p in chunks)))
+
+        def counted(days):
+            for day in days:
+                stats["days"] += 1
+                yield day
+
+        merged_path = os.path.join(tmp_dir, "merged.txt")
+        with open(merged_path, "w", encoding="utf-8", buffering=1 << 20) as out:
+            for record in merge_history(storage.iter_range(), counted(imported)):
+                out.write(format_record(*record))
+
+        # 3. one write of the whole history, then streaks once
+        with storage.transaction():
+            storage.write_history(_read_chunk(merged_path))
+            if new_habits:
+                habits += new_habits
+                atomic_write(os.path.join(base_dir, "habits.txt"), "".join(h + "\n" for h in habits))
+            if today_date is not None:
+                engine = StreakEngine.from_history(base_dir, habits, end=shift_date(today_date, -1),
+                                                   history=storage)
+                storage.save_streaks(engine.current, engine.best)
+        if os.path.exists(os.path.join(base_dir, BITMAP_NAME)):
+            build_bitmap(base_dir, storage)
+        stats["new_habits"] = new_habits
+        if progress is not None:
+            progress(stats)
+        return stats
+    finally:
+        storage.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# === EXPORT ===
+def export_csv(base_dir, out, layout="long", progress=None):
+    """
+    Write the whole history to the text stream out as CSV, one day at a
+    time. Gap runs (days with nothing done) are left out, like in the
+    history itself. Returns the number of rows written.
+    """
+    storage = open_storage(base_dir)
+    try:
+        writer = csv.writer(out, lineterminator="\n")
+        habits = storage.load_habits()
+        rows = 0
+        last_report = time.monotonic()
+        days = groupby((r for r in storage.iter_range() if r[1] != "gap"), key=lambda r: r[0])
+
+        if layout == "wide":
+            # habits that only appear in the history are not known up front,
+            # so the columns are the habits of habits.txt
+            writer.writerow(["Date"] + habits)
+            for date, group in days:
+                done = {v for _, kind, v in group if kind == "done"}
+                writer.writerow([date] + ["2" if h in done else "0" for h in habits])
+                rows += 1
+        else:
+            writer.writerow(["date", "habit", "done"])
+            for date, group in days:
+                for _, kind, value in group:
+                    writer.writerow([date, value, 1] if kind == "done" else [date, "", value])
+                    rows += 1
+                if progress is not None and time.monotonic() - last_report >= PROGRESS_SECONDS:
+                    progress({"rows": rows, "date": date})
+                    last_report = time.monotonic()
+        return rows
+    finally:
+        storage.close()
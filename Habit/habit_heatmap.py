@@ -0,0 +1,133 @@
+"""
+Calendar heatmap: one year as a 7-row grid of day cells, one column per week.
+
+The whole year is painted into a single tk.PhotoImage instead of one canvas
+rectangle per cell. Each weekday row of cells is one line of pixel colors
+that Tk tiles down over the cell height, so a year takes 7 put() calls.
+Images are cached per (folder, year, habit) and reused while history.txt is
+unchanged; clicking a habit only repaints today's cell.
+"""
+import datetime
+import math
+import os
+import tkinter as tk
+
+from habit_analytics import Analytics
+from habit_history import HISTORY_NAME
+from habit_storage import DB_NAME
+from habit_store import file_stamp
+
+CELL = 12
+GAP = 3
+BACKGROUND = "#ffffff"
+# nothing done, then four levels up to the busiest day of the year
+PALETTE = ("#ebedf0", "#9be9a8", "#40c463", "#30a14e", "#216e39")
+
+_IMAGE_CACHE = {}
+
+
+# === LAYOUT ===
+def year_layout(year):
+    """(first day, weekday row of Jan 1, number of week columns) for year."""
+    first = datetime.date(year, 1, 1)
+    days = (datetime.date(year + 1, 1, 1) - first).days
+    offset = first.weekday()
+    return first, offset, (offset + days + 6) // 7
+
+
+def level_color(value, max_value):
+    if value <= 0 or max_value <= 0:
+        return PALETTE[0]
+    level = math.ceil((len(PALETTE) - 1) * min(value, max_value) / max_value)
+    return PALETTE[level]
+
+
+def pixel_rows(year, values, max_value, cell=CELL, gap=GAP):
+    """
+    Return 7 strings of Tk pixel data, one per weekday: a single pixel line
+    across all week columns. values maps "YYYY-MM-DD" to a completion count.
+    """
+    first, offset, weeks = year_layout(year)
+    gap_pixels = " ".join([BACKGROUND] * gap)
+    rows = []
+    for row in range(7):
+        pixels = []
+        for week in range(weeks):
+            index = week * 7 + row - offset
+            day = first + datetime.timedelta(days=index)
+            if day.year == year:
+                color = level_color(values.get(day.strftime("%Y-%m-%d"), 0), max_value)
+            else:
+                color = BACKGROUND
+            pixels.append(" ".join([color] * cell))
+            pixels.append(gap_pixels)
+        rows.append("{" + " ".join(pixels) + "}")
+    return rows
+
+
+# === IMAGE ===
+class YearHeatmap:
+    """One year of one habit (or all habits) as a PhotoImage."""
+
+    def __init__(self, year, values, max_value, cell=CELL, gap=GAP):
+        self.year = year
+        self.values = dict(values)
+        self.max_value = max_value
+        self.cell = cell
+        self.gap = gap
+        self.first, self.offset, self.weeks = year_layout(year)
+        self.width = self.weeks * (cell + gap)
+        self.height = 7 * (cell + gap)
+        self.image = tk.PhotoImage(width=self.width, height=self.height)
+        self.render()
+
+    def render(self):
+        self.image.put(BACKGROUND, to=(0, 0, self.width, self.height))
+        rows = pixel_rows(self.year, self.values, self.max_value, self.cell, self.gap)
+        for row, data in enumerate(rows):
+            y = row * (self.cell + self.gap)
+            # one pixel line, tiled by Tk over the cell height
+            self.image.put(data, to=(0, y, self.width, y + self.cell))
+
+    def set_day(self, date, value):
+        """Update one day's value and repaint just that cell."""
+        day = datetime.datetime.strptime(date, "%Y-%m-%d").date()
+        if day.year != self.year:
+            return
+        self.values[date] = value
+        if value > self.max_value:
+            # the scale changed: every cell may change color
+            self.max_value = value
+            self.render()
+            return
+        index = (day - self.first).days + self.offset
+        x = (index // 7) * (self.cell + self.gap)
+        y = (index % 7) * (self.cell + self.gap)
+        self.image.put(level_color(value, self.max_value), to=(x, y, x + self.cell, y + self.cell))
+
+
+def year_values(base_dir, year, habit=None, habits=None, history=None):
+    """{date: completions} for the recorded days of year (from the analytics prefix sums)."""
+    analytics = Analytics(base_dir, habits, history)
+    return dict(analytics.daily(f"{year}-01-01", f"{year}-12-31", habit))
+
+
+def heatmap_image(base_dir, year, habit=None, habits=None, history=None):
+    """
+    Cached YearHeatmap for (base_dir, year, habit). Rebuilt only when the
+    history (history.txt, or habits.db and its WAL) changed since it was drawn.
+    """
+    key = (os.path.abspath(base_dir), year, habit)
+    stamp = tuple(file_stamp(os.path.join(base_dir, name))
+                  for name in (HISTORY_NAME, DB_NAME, DB_NAME + "-wal"))
+    cached = _IMAGE_CACHE.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    values = year_values(base_dir, year, habit, habits, history)
+    if habit is None:
+        max_value = max(values.values(), default=0) or len(habits or ()) or 1
+    else:
+        max_value = 1
+    heatmap = YearHeatmap(year, values, max_value)
+    _IMAGE_CACHE[key] = (stamp, heatmap)
+    return heatmap
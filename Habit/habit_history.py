@@ -0,0 +1,638 @@
+import json
+import os
+import zlib
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import chain
+
+import habit_clock
+from habit_store import atomic_write, parse_today
+
+HISTORY_NAME = "history.txt"
+DATE_LEN = 10  # "YYYY-MM-DD"
+
+
+# === DATE HELPERS ===
+def parse_date(text):
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+def format_date(day):
+    return day.strftime("%Y-%m-%d")
+
+
+def shift_date(date, days):
+    return format_date(parse_date(date) + timedelta(days=days))
+
+
+def date_range(start, end):
+    """Yield every date string from start to end (inclusive)."""
+    day = parse_date(start)
+    last = parse_date(end)
+    while day <= last:
+        yield format_date(day)
+        day += timedelta(days=1)
+
+
+# === RECORDS ===
+def format_record(date, kind, value):
+    return f"{date}\t{kind}\t{value}\n"
+
+
+def parse_record(line):
+    """
+    Return (date, kind, value) for one history.txt line, or None if malformed.
+
+    kinds:
+      done  - value is a habit completed on date
+      count - value is a bare daily total (days migrated from progress.txt,
+              or days with nothing completed)
+      gap   - value is the last date of a run of days with nothing done,
+              starting at date (one record however long the gap is)
+    """
+    parts = line.rstrip("\r\n").split("\t", 2)
+    if len(parts) != 3 or len(parts[0]) != DATE_LEN:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def count_days(records, start=None, end=None):
+    """[(date, completed_count)] for every day from start to end, from (date, kind, value) records."""
+    totals = {}
+    for date, kind, value in records:
+        if kind == "done":
+            totals[date] = totals.get(date, 0) + 1
+        elif kind == "gap":
+            totals.setdefault(date, 0)
+            if end is None or value <= end:
+                totals.setdefault(value, 0)
+        elif kind == "count":
+            try:
+                totals[date] = totals.get(date, 0) + int(value)
+            except ValueError:
+                totals.setdefault(date, 0)
+    if not totals:
+        return []
+    first = start or min(totals)
+    last = end or max(totals)
+    return [(day, totals.get(day, 0)) for day in date_range(first, last)]
+
+
+def join_days(runs, start=None, end=None):
+    """
+    Concatenate ascending runs of consecutive (date, count) days into one
+    list from start to end, with 0 for the days between and around the
+    runs. [] if no run has a day in start..end.
+    """
+    out = []
+    for run in runs:
+        if start:
+            run = run[bisect_left(run, (start,)):]
+        if end:
+            run = run[:bisect_left(run, (shift_date(end, 1),))]
+        if not run:
+            continue
+        if out:
+            out.extend((day, 0) for day in date_range(shift_date(out[-1][0], 1), shift_date(run[0][0], -1)))
+        out.extend(run)
+    if not out:
+        return []
+    head = [(day, 0) for day in date_range(start, shift_date(out[0][0], -1))] if start else []
+    if end:
+        out.extend((day, 0) for day in date_range(shift_date(out[-1][0], 1), end))
+    return head + out
+
+
+# === YEAR SEGMENTS ===
+# Closed years move out of history.txt into history.YYYY.seg: one header
+# line (SEGMENT_MAGIC + a JSON summary of the year: min/max/sum/count of the
+# daily totals, per month and per day) followed by the year's records,
+# zlib-compressed. Daily totals are answered from the header alone.
+SEGMENT_MAGIC = b"HSEG1 "
+
+
+def segment_name(year):
+    return f"history.{year}.seg"
+
+
+def segment_years(base_dir):
+    """Years that have a segment file, ascending."""
+    try:
+        names = os.listdir(base_dir)
+    except OSError:
+        return []
+    years = []
+    for name in names:
+        year = name[8:-4]
+        if name.startswith("history.") and name.endswith(".seg") and len(year) == 4 and year.isdigit():
+            years.append(int(year))
+    years.sort()
+    return years
+
+
+def split_gap(start, end):
+    """Yield the (start, end) pieces of a gap run, one per calendar year."""
+    while start[:4] < end[:4]:
+        yield start, start[:4] + "-12-31"
+        start = f"{int(start[:4]) + 1}-01-01"
+    yield start, end
+
+
+def summarize(year, records):
+    """The header of a segment holding records."""
+    days = count_days(records)
+    daily = [count for _, count in days]
+    months = [[0, 0] for _ in range(12)]
+    for date, count in days:
+        month = months[int(date[5:7]) - 1]
+        month[0] += count
+        month[1] += 1
+    return {
+        "year": year,
+        "first": days[0][0] if days else None,
+        "last": days[-1][0] if days else None,
+        "records": len(records),
+        "count": len(daily),
+        "sum": sum(daily),
+        "min": min(daily, default=0),
+        "max": max(daily, default=0),
+        "months": months,  # [sum, days] per month
+        "daily": daily,  # one total per day from first to last
+    }
+
+
+def write_segment(path, year, records):
+    """Replace path with a segment of records (all dated in year)."""
+    header = json.dumps(summarize(year, records), separators=(",", ":")).encode("ascii")
+    body = "".join(format_record(*record) for record in records).encode("utf-8")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SEGMENT_MAGIC + header + b"\n")
+        f.write(zlib.compress(body, 6))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_segment_header(path):
+    """The summary of a segment, or None if it is missing or corrupt."""
+    try:
+        with open(path, "rb") as f:
+            line = f.readline()
+        if line.startswith(SEGMENT_MAGIC):
+            return json.loads(line[len(SEGMENT_MAGIC):])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def read_segment(path):
+    """Every (date, kind, value) record of a segment, in order."""
+    with open(path, "rb") as f:
+        if not f.readline().startswith(SEGMENT_MAGIC):
+            raise ValueError(f"not a history segment: {path}")
+        body = zlib.decompress(f.read()).decode("utf-8")
+    return [record for record in map(parse_record, body.splitlines()) if record is not None]
+
+
+def _around_gap(gap, date, lines):
+    """lines, with the parts of the gap run before and after date kept around them."""
+    gap_start, _, gap_end = gap
+    pieces = []
+    if gap_start < date:
+        pieces.append(format_record(gap_start, "gap", shift_date(date, -1)))
+    pieces.extend(lines)
+    if gap_end > date:
+        pieces.append(format_record(shift_date(date, 1), "gap", gap_end))
+    return pieces
+
+
+# === STORE ===
+class HistoryStore:
+    """
+    Dated per-habit history in history.txt.
+
+    One record per line, sorted by date, so a date can be found with a
+    binary search over byte offsets (O(log n) seeks) and a date range is
+    read as one contiguous slice of the file.
+
+    Closed years can be moved into compressed segments with archive(); a
+    query then opens only the segments of the years it asks for, and
+    daily_counts() reads nothing but their summary headers.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, HISTORY_NAME)
+
+    def exists(self):
+        return os.path.exists(self.path) or bool(segment_years(self.base_dir))
+
+    # --- segments ---
+    def _segment_path(self, year):
+        return os.path.join(self.base_dir, segment_name(year))
+
+    def _archived_through(self):
+        """Last year kept in a segment, or None."""
+        years = segment_years(self.base_dir)
+        return years[-1] if years else None
+
+    def _layout(self, start, end):
+        """
+        ([(year, path)] of the segments overlapping start..end, date to start
+        reading history.txt from). history.txt only holds the years after the
+        last segment; older lines there are leftovers of an interrupted
+        archive() and are skipped.
+        """
+        years = segment_years(self.base_dir)
+        segments = [(year, self._segment_path(year)) for year in years
+                    if (not start or year >= int(start[:4])) and (not end or year <= int(end[:4]))]
+        floor = f"{years[-1] + 1}-01-01" if years else None
+        return segments, max(filter(None, (start, floor)), default=None)
+
+    def _touch(self):
+        # analytics.idx and the heatmap cache key on history.txt's stamp, so
+        # a segment rewrite bumps it too
+        with open(self.path, "a", encoding="utf-8"):
+            pass
+        os.utime(self.path)
+
+    # --- seeking ---
+    @staticmethod
+    def _line_start(f, pos):
+        """Offset of the first line that starts at or after pos."""
+        if pos == 0:
+            return 0
+        f.seek(pos - 1)
+        f.readline()
+        return f.tell()
+
+    def _seek(self, f, date, size):
+        """Return the offset of the first record whose date is >= date."""
+        key = date.encode("ascii")
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._line_start(f, mid)
+            f.seek(start)
+            line = f.readline()
+            if line and line[:DATE_LEN] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self._line_start(f, lo)
+
+    def iter_range(self, start=None, end=None):
+        """Yield (date, kind, value) for records with start <= date <= end."""
+        segments, text_start = self._layout(start, end)
+        for _, path in segments:
+            records = read_segment(path)
+            lo = bisect_left(records, (start,)) if start else 0
+            hi = bisect_left(records, (shift_date(end, 1),)) if end else len(records)
+            yield from records[lo:hi]
+        yield from self._iter_text(text_start, end)
+
+    def _iter_text(self, start, end):
+        if not os.path.exists(self.path):
+            return
+        end_key = end.encode("ascii") if end else None
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(self._seek(f, start, size) if start else 0)
+            for raw in f:
+                if end_key is not None and raw[:DATE_LEN] > end_key:
+                    break
+                record = parse_record(raw.decode("utf-8"))
+                if record is not None:
+                    yield record
+
+    def _gap_into(self, date):
+        """The gap record of history.txt that starts before date and reaches it, or None."""
+        if not date or not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            prev = self._prev_line(f, self._seek(f, date, os.fstat(f.fileno()).st_size))
+        record = parse_record(prev[1].decode("utf-8")) if prev else None
+        if record is not None and record[1] == "gap" and record[2] >= date:
+            return record
+        return None
+
+    @staticmethod
+    def _prev_line(f, offset):
+        """Return (start, bytes) of the line ending just before offset, or None."""
+        if offset == 0:
+            return None
+        pos = offset
+        chunk = b""
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+            cut = chunk.rfind(b"\n", 0, len(chunk) - 1)
+            if cut >= 0:
+                return pos + cut + 1, chunk[cut + 1:]
+        return 0, chunk
+
+    def first_date(self):
+        years = segment_years(self.base_dir)
+        header = read_segment_header(self._segment_path(years[0])) if years else None
+        if header is not None and header["first"]:
+            return header["first"]
+        for date, _, _ in self.iter_range():
+            return date
+        return None
+
+    def last_date(self):
+        """
+        Last date covered by the history, read from the tail of history.txt
+        (or the summary of the last segment once history.txt is empty).
+        """
+        last = None
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                prev = self._prev_line(f, os.fstat(f.fileno()).st_size)
+            record = parse_record(prev[1].decode("utf-8")) if prev else None
+            if record is not None:
+                last = record[2] if record[1] == "gap" else record[0]
+            elif prev:
+                return None
+        through = self._archived_through()
+        header = read_segment_header(self._segment_path(through)) if through else None
+        if header is not None and header["last"] and (last is None or header["last"] > last):
+            last = header["last"]
+        return last
+
+    # --- queries ---
+    def completed_on(self, date):
+        """Set of habits recorded as done on date."""
+        return {value for _, kind, value in self.iter_range(date, date) if kind == "done"}
+
+    def completions(self, start, end):
+        """Return {date: set(habits done)} for days in start..end that have any."""
+        days = {}
+        for date, kind, value in self.iter_range(start, end):
+            if kind == "done":
+                days.setdefault(date, set()).add(value)
+        return days
+
+    def daily_counts(self, start=None, end=None):
+        """
+        Return [(date, completed_count)] for every day from start to end.
+        Days without any record inside the range (gap runs) count as 0;
+        they are expanded here rather than stored one line per day.
+        Archived years come from their segment's summary, undecompressed,
+        and a gap run that began before start still counts inside the range.
+        """
+        segments, text_start = self._layout(start, end)
+        runs = []
+        for _, path in segments:
+            header = read_segment_header(path)
+            if header is None:
+                runs.append(count_days(read_segment(path)))
+            elif header["first"]:
+                runs.append(list(zip(date_range(header["first"], header["last"]), header["daily"])))
+        gap = self._gap_into(text_start)
+        runs.append(count_days(chain([gap] if gap else [], self._iter_text(text_start, end))))
+        return join_days(runs, start, end)
+
+    # --- writes ---
+    def record_day(self, date, completed):
+        """
+        Store the habits completed on date. A day with nothing completed is
+        stored as a zero count so it still shows up in the history.
+        Recording a day that is already covered replaces it (backfill).
+        Returns True if the day was appended at the end of the file.
+        """
+        if completed:
+            lines = [format_record(date, "done", habit) for habit in sorted(completed)]
+        else:
+            lines = [format_record(date, "count", 0)]
+        last = self.last_date()
+        through = self._archived_through()
+        if (last is None or date > last) and (through is None or int(date[:4]) > through):
+            self._append(lines)
+            return True
+        self._splice(date, lines)
+        return False
+
+    def record_gap(self, start, end):
+        """Record start..end (inclusive) as days with nothing done, in one line."""
+        if end < start:
+            return
+        last = self.last_date()
+        if last is not None and start <= last:
+            for day in date_range(start, end):
+                self._splice(day, [])
+            return
+        through = self._archived_through()
+        if through is not None and int(start[:4]) <= through:
+            # past the end of the history but in an archived year (the
+            # clock was set back): one gap record per segment
+            for piece_start, piece_end in split_gap(start, min(end, f"{through}-12-31")):
+                self._splice(piece_start, [format_record(piece_start, "gap", piece_end)])
+            start = f"{through + 1}-01-01"
+            if end < start:
+                return
+        self._append([format_record(start, "gap", end)])
+
+    def _append(self, lines):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def _splice(self, date, lines):
+        """
+        Replace whatever is recorded for date with lines. A gap run that
+        covers date is split around it. The file is rebuilt through a temp
+        file and renamed, so a crash leaves either the old or the new history.
+        """
+        through = self._archived_through()
+        if through is not None and int(date[:4]) <= through:
+            self._splice_segment(int(date[:4]), date, lines)
+            return
+        if not os.path.exists(self.path):
+            self._append(lines)
+            return
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            cut_start = self._seek(f, date, size)
+            cut_end = self._seek(f, shift_date(date, 1), size)
+
+            # a gap run starting before date that reaches into it
+            gap = None
+            prev = self._prev_line(f, cut_start)
+            record = parse_record(prev[1].decode("utf-8")) if prev else None
+            if record is not None and record[1] == "gap" and record[2] >= date:
+                gap = record
+                cut_start = prev[0]
+            # ...or one starting on date itself
+            f.seek(cut_start)
+            for raw in f.read(cut_end - cut_start).splitlines():
+                record = parse_record(raw.decode("utf-8"))
+                if record is not None and record[1] == "gap" and record[0] == date:
+                    gap = record
+
+            if gap is not None:
+                lines = _around_gap(gap, date, lines)
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as out:
+                f.seek(0)
+                _copy_bytes(f, out, cut_start)
+                out.write("".join(lines).encode("utf-8"))
+                f.seek(cut_end)
+                _copy_bytes(f, out, size - cut_end)
+                out.flush()
+                os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _splice_segment(self, year, date, lines):
+        """_splice for a date in an archived year: that year's segment is rewritten."""
+        path = self._segment_path(year)
+        records = read_segment(path) if os.path.exists(path) else []
+        lo = bisect_left(records, (date,))
+        hi = bisect_left(records, (shift_date(date, 1),))
+        gap = None
+        if lo and records[lo - 1][1] == "gap" and records[lo - 1][2] >= date:
+            lo -= 1
+            gap = records[lo]
+        for record in records[lo:hi]:
+            if record[1] == "gap" and record[0] == date:
+                gap = record
+        if gap is not None:
+            lines = _around_gap(gap, date, lines)
+        records[lo:hi] = [parse_record(line) for line in lines]
+        write_segment(path, year, records)
+        self._touch()
+
+    def rename_habit(self, old, new):
+        """Rewrite the "done" records of old as new, in history.txt and every segment."""
+        for year in segment_years(self.base_dir):
+            path = self._segment_path(year)
+            records = read_segment(path)
+            if any(kind == "done" and value == old for _, kind, value in records):
+                write_segment(path, year, [
+                    (date, kind, new if kind == "done" and value == old else value)
+                    for date, kind, value in records
+                ])
+        if not os.path.exists(self.path):
+            return
+        tmp_path = self.path + ".tmp"
+        with open(self.path, "r", encoding="utf-8") as src, \
+                open(tmp_path, "w", encoding="utf-8") as out:
+            for line in src:
+                record = parse_record(line)
+                if record is not None and record[1] == "done" and record[2] == old:
+                    line = format_record(record[0], "done", new)
+                out.write(line)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+
+    # --- archiving ---
+    def archive(self, before):
+        """
+        Move the records dated before Jan 1 of year `before` out of
+        history.txt into one compressed history.YYYY.seg per year (gap runs
+        are split at Dec 31). Reads a single line when there is nothing to
+        move, so it can run at every rollover. Returns the years written.
+        """
+        if not os.path.exists(self.path):
+            return []
+        floor = f"{before:04d}-01-01"
+        with open(self.path, "rb") as f:
+            first = f.readline()
+            if not first or first[:DATE_LEN] >= floor.encode("ascii"):
+                return []
+            size = os.fstat(f.fileno()).st_size
+            cut = self._seek(f, floor, size)
+            f.seek(0)
+            head = f.read(cut).decode("utf-8")
+
+        by_year = {}
+        carry = []
+        for line in head.splitlines():
+            record = parse_record(line)
+            if record is None:
+                continue
+            date, kind, value = record
+            if kind != "gap":
+                by_year.setdefault(int(date[:4]), []).append(record)
+                continue
+            for piece_start, piece_end in split_gap(date, min(value, f"{before - 1}-12-31")):
+                by_year.setdefault(int(piece_start[:4]), []).append((piece_start, "gap", piece_end))
+            if value >= floor:
+                carry.append(format_record(floor, "gap", value))
+
+        for year, records in by_year.items():
+            path = self._segment_path(year)
+            if os.path.exists(path):
+                # an interrupted archive() already wrote it (or a backfill did)
+                records = sorted(set(read_segment(path)) | set(records))
+            write_segment(path, year, records)
+
+        tmp_path = self.path + ".tmp"
+        with open(self.path, "rb") as f, open(tmp_path, "wb") as out:
+            out.write("".join(carry).encode("utf-8"))
+            f.seek(cut)
+            _copy_bytes(f, out, os.fstat(f.fileno()).st_size - cut)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+        return sorted(by_year)
+
+    def segments(self):
+        """The summary header of every segment, oldest year first."""
+        return [read_segment_header(self._segment_path(year)) for year in segment_years(self.base_dir)]
+
+
+def _copy_bytes(src, dst, count, block=1 << 20):
+    while count > 0:
+        data = src.read(min(block, count))
+        if not data:
+            break
+        dst.write(data)
+        count -= len(data)
+
+
+# === ONE-TIME MIGRATION ===
+def migrate_progress(base_dir):
+    """
+    Build history.txt from the legacy progress.txt (one bare count per day).
+
+    progress.txt has no dates, but its last line always belongs to the day
+    before the date stored in today.txt, so dates are assigned backwards
+    from there. progress.txt is renamed to progress.txt.migrated afterwards.
+    Returns the number of days migrated.
+    """
+    history = HistoryStore(base_dir)
+    progress_file = os.path.join(base_dir, "progress.txt")
+    if history.exists() or not os.path.exists(progress_file):
+        return 0
+
+    with open(progress_file, "r", encoding="utf-8") as f:
+        counts = []
+        for line in f:
+            try:
+                counts.append(int(line.strip()))
+            except ValueError:
+                pass
+
+    anchor = None
+    try:
+        with open(os.path.join(base_dir, "today.txt"), "r", encoding="utf-8") as f:
+            anchor, _ = parse_today(f.read())
+        anchor = parse_date(anchor) if anchor else None
+    except (OSError, ValueError):
+        anchor = None
+    if anchor is None:
+        anchor = habit_clock.today()
+
+    first = anchor - timedelta(days=len(counts))
+    lines = [
+        format_record(format_date(first + timedelta(days=i)), "count", count)
+        for i, count in enumerate(counts)
+    ]
+    atomic_write(history.path, "".join(lines))
+    os.replace(progress_file, progress_file + ".migrated")
+    return len(counts)
@@ -0,0 +1,123 @@
+"""
+One app window per Habit folder.
+
+The first launch holds an advisory lock on .habit.instance.lock for as long
+as it runs and listens on a loopback port, written (with a random token) to
+.habit.instance. A second launch fails to take the lock, sends "raise" to
+that port and exits before creating its Tk root, rolling over or loading
+anything, so a double-click on the exe just brings the running window to
+the front. The lock is released by the OS if the app dies, so a crash
+never blocks the next start.
+"""
+import os
+import secrets
+import socket
+import time
+import tkinter as tk
+
+from habit_lock import release, try_hold
+from habit_store import atomic_write
+
+INSTANCE_NAME = ".habit.instance"
+INSTANCE_LOCK_NAME = ".habit.instance.lock"
+POLL_MS = 200  # accept() polling where Tk cannot watch sockets (Windows)
+CONNECT_TIMEOUT = 2.0
+
+
+# === FIRST LAUNCH ===
+def claim(base_dir):
+    """Lock descriptor if this is the only running app for base_dir, else None."""
+    return try_hold(os.path.join(base_dir, INSTANCE_LOCK_NAME))
+
+
+class InstanceServer:
+    """Accept messages from later launches on the Tk thread and call on_raise()."""
+
+    def __init__(self, master, base_dir, lock_fd, on_raise):
+        self.master = master
+        self.path = os.path.join(base_dir, INSTANCE_NAME)
+        self.lock_fd = lock_fd
+        self.on_raise = on_raise
+        self.token = secrets.token_hex(16)
+        self._job = None
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(8)
+        self.sock.setblocking(False)
+        atomic_write(self.path, f"{self.sock.getsockname()[1]}\n{self.token}\n{os.getpid()}\n")
+        os.chmod(self.path, 0o600)
+
+        self._filehandler = hasattr(master.tk, "createfilehandler") and os.name == "posix"
+        if self._filehandler:
+            master.tk.createfilehandler(self.sock.fileno(), tk.READABLE, lambda fd, mask: self._accept())
+        else:
+            self._job = master.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        self._accept()
+        self._job = self.master.after(POLL_MS, self._poll)
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            with conn:
+                conn.settimeout(0.5)
+                try:
+                    message = conn.recv(256).decode("utf-8", errors="replace").split()
+                except OSError:
+                    continue
+            # the token keeps other local users from poking the window
+            if message == [self.token, "raise"]:
+                self.on_raise()
+
+    def close(self):
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+            self._job = None
+        if self._filehandler:
+            self.master.tk.deletefilehandler(self.sock.fileno())
+            self._filehandler = False
+        self.sock.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        if self.lock_fd is not None:
+            release(self.lock_fd)
+            self.lock_fd = None
+
+
+def raise_window(root):
+    """Bring root to the front, even if it was minimized."""
+    root.deiconify()
+    root.lift()
+    root.attributes("-topmost", True)
+    root.after_idle(root.attributes, "-topmost", False)
+    root.focus_force()
+
+
+# === LATER LAUNCHES ===
+def notify_running(base_dir, message="raise", timeout=CONNECT_TIMEOUT):
+    """
+    Send message to the running app. Retries until timeout, since the
+    running app may still be starting up. Returns True if it was delivered.
+    """
+    path = os.path.join(base_dir, INSTANCE_NAME)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                port, token = f.read().split()[:2]
+            with socket.create_connection(("127.0.0.1", int(port)), timeout=0.5) as conn:
+                conn.sendall(f"{token} {message}\n".encode("utf-8"))
+            return True
+        except (OSError, ValueError):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
@@ -0,0 +1,114 @@
+"""
+A single background thread for the app's disk writes.
+
+Tk callbacks change the in-memory state and submit() the write; the worker
+runs writes in order, one at a time. A job that is still queued when
+another job with the same key arrives is replaced, so clicking one habit
+on-off-on while the disk is slow costs one write, not three.
+
+Nothing on the worker thread touches Tk. Results and errors go through a
+queue that the Tk thread drains with after() while jobs are outstanding;
+errors are handed to on_error there. close() runs whatever is still
+queued before the app exits.
+"""
+import queue
+import threading
+from collections import OrderedDict
+
+import habit_perf
+
+POLL_MS = 30
+
+
+class IOWorker:
+    def __init__(self, master, on_error, poll_ms=POLL_MS):
+        self.master = master
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # key -> (func, on_done), oldest first
+        self._busy = False
+        self._closed = False
+        self._results = queue.SimpleQueue()
+        self._drain_job = None
+        self._thread = threading.Thread(target=self._run, name="habit-io", daemon=True)
+        self._thread.start()
+
+    # --- Tk thread ---
+    def submit(self, key, func, on_done=None):
+        """
+        Queue func() on the worker. A queued job with the same key is
+        replaced (keeping its place in line). on_done(result) runs on the
+        Tk thread afterwards.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("I/O worker is closed")
+            self._pending[key] = (func, on_done)
+            self._cond.notify()
+        if self._drain_job is None:
+            self._drain_job = self.master.after(self.poll_ms, self._drain)
+
+    def idle(self):
+        with self._cond:
+            return not self._pending and not self._busy
+
+    @habit_perf.timed("IOWorker.flush")
+    def flush(self, timeout=None):
+        """Wait until every queued job ran, then deliver their results. True if it got there."""
+        with self._cond:
+            done = self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+        self._deliver()
+        return done
+
+    def close(self, timeout=10.0):
+        """Run what is still queued, stop the thread and deliver the last results."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._drain_job is not None:
+            self.master.after_cancel(self._drain_job)
+            self._drain_job = None
+        self._deliver()
+        return not self._thread.is_alive()
+
+    def _drain(self):
+        self._drain_job = None
+        # results are queued before the worker goes idle, so once it is
+        # idle the drain below sees all of them
+        idle = self.idle()
+        self._deliver()
+        if not idle:
+            self._drain_job = self.master.after(self.poll_ms, self._drain)
+
+    def _deliver(self):
+        while True:
+            try:
+                key, on_done, result, error = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if error is not None:
+                self.on_error(key, error)
+            elif on_done is not None:
+                on_done(result)
+
+    # --- worker thread ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                key, (func, on_done) = self._pending.popitem(last=False)
+                self._busy = True
+            try:
+                with habit_perf.span("IOWorker job", "io"):
+                    result = func()
+                self._results.put((key, on_done, result, None))
+            except Exception as e:
+                self._results.put((key, on_done, None, e))
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
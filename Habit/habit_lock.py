@@ -0,0 +1,78 @@
+import os
+import time
+from contextlib import contextmanager
+
+LOCK_NAME = ".habit.lock"
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(fd):
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class LockTimeout(Exception):
+    """Another process kept the Habit folder locked for too long."""
+
+
+@contextmanager
+def folder_lock(base_dir, timeout=10.0, poll=0.05):
+    """
+    Hold an exclusive advisory lock on a Habit folder (.habit.lock) while
+    reading-modifying-writing its files. Raises LockTimeout if the lock
+    cannot be taken within timeout seconds.
+    """
+    path = os.path.join(base_dir, LOCK_NAME)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"{base_dir} is locked by another process")
+            time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def try_hold(path):
+    """
+    Take an exclusive advisory lock on path without waiting. Returns the
+    descriptor holding it (pass it to release()), or None if another
+    process holds it. The OS drops the lock if the holder dies.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if _try_lock(fd):
+        return fd
+    os.close(fd)
+    return None
+
+
+def release(fd):
+    try:
+        _unlock(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,255 @@
+"""
+Opt-in instrumentation: where does the time (and the file I/O) go?
+
+Enable with --perf or HABIT_PERF=1. While enabled:
+
+  - every open() is counted (reads / writes) and the bytes (characters for
+    text files) moved through it are added up, per file name
+  - functions decorated with @timed, blocks wrapped in span(), Tk callbacks
+    and startup phases are timed (count, total, max)
+  - each of those becomes a trace event; dump() writes them in the Chrome
+    trace-event format, which chrome://tracing and https://ui.perfetto.dev
+    open directly
+
+When disabled, @timed returns the function unchanged and span() is a no-op,
+so nothing is paid. Never imports tkinter unless install_tk_hooks()
+is called.
+"""
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ENABLED = "--perf" in sys.argv or bool(os.environ.get("HABIT_PERF"))
+TRACE_NAME = "perf_trace.json"
+MAX_EVENTS = 200_000
+
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)
+_spans = {}  # name -> [count, total_ns, max_ns]
+_io = {"reads": 0, "writes": 0, "bytes_read": 0, "bytes_written": 0}
+_io_files = {}  # basename -> [opens, bytes_read, bytes_written]
+_real_open = builtins.open
+
+
+def enable():
+    """Switch on from code (habit_sim.py). Functions @timed before this stay untimed."""
+    global ENABLED
+    ENABLED = True
+
+
+# === SPANS ===
+def _us(ns):
+    # trace viewers start the timeline at the first event
+    return ns / 1000
+
+
+def record(name, start_ns, end_ns, cat="app"):
+    """Add one finished span (perf_counter_ns timestamps)."""
+    duration = end_ns - start_ns
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = [0, 0, 0]
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
+    _events.append({"name": name, "cat": cat, "ph": "X", "ts": _us(start_ns), "dur": duration / 1000,
+                    "pid": os.getpid(), "tid": threading.get_ident()})
+
+
+@contextmanager
+def _span(name, cat):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, start, time.perf_counter_ns(), cat)
+
+
+@contextmanager
+def _no_span():
+    yield
+
+
+def span(name, cat="app"):
+    """Context manager timing a block (a no-op when disabled)."""
+    if not ENABLED:
+        return _no_span()
+    return _span(name, cat)
+
+
+def timed(name=None, cat="app"):
+    """Decorator timing every call (returns the function untouched when disabled)."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        label = name or func.__qualname__
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, start, time.perf_counter_ns(), cat)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__qualname__ = func.__qualname__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorate
+
+
+def phase(name, start_seconds, end_seconds):
+    """Record a startup phase from time.perf_counter() readings."""
+    if ENABLED:
+        record(name, int(start_seconds * 1e9), int(end_seconds * 1e9), "startup")
+
+
+# === FILE I/O ===
+class _CountingFile:
+    """Wraps a file object and counts what is read from / written to it."""
+
+    def __init__(self, f, name):
+        self._f = f
+        self._name = name
+
+    def _add(self, key, n):
+        with _lock:
+            _io[key] += n
+            _io_files[self._name][1 if key == "bytes_read" else 2] += n
+
+    def read(self, *args):
+        data = self._f.read(*args)
+        self._add("bytes_read", len(data))
+        return data
+
+    def readline(self, *args):
+        data = self._f.readline(*args)
+        self._add("bytes_read", len(data))
+        return data
+
+    def readlines(self, *args):
+        lines = self._f.readlines(*args)
+        self._add("bytes_read", sum(map(len, lines)))
+        return lines
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._f)
+        self._add("bytes_read", len(line))
+        return line
+
+    def write(self, data):
+        self._add("bytes_written", len(data))
+        return self._f.write(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def __enter__(self):
+        self._f.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._f.__exit__(*exc)
+
+    def __getattr__(self, attr):
+        return getattr(self._f, attr)
+
+
+def _counting_open(file, mode="r", *args, **kwargs):
+    f = _real_open(file, mode, *args, **kwargs)
+    if not isinstance(file, (str, bytes, os.PathLike)):
+        return f
+    name = os.path.basename(os.fsdecode(file))
+    writing = any(c in mode for c in "wax+")
+    with _lock:
+        _io["writes" if writing else "reads"] += 1
+        _io_files.setdefault(name, [0, 0, 0])[0] += 1
+    return _CountingFile(f, name)
+
+
+def install_io_hooks():
+    """Route open() through the counting wrapper (only when enabled)."""
+    if ENABLED and builtins.open is _real_open:
+        builtins.open = _counting_open
+
+
+def install_tk_hooks():
+    """Time every Tk callback (button commands, bindings, after() jobs)."""
+    if not ENABLED:
+        return
+    import tkinter
+
+    call = tkinter.CallWrapper.__call__
+    if getattr(call, "_perf", False):
+        return
+
+    def timed_call(self, *args):
+        start = time.perf_counter_ns()
+        try:
+            return call(self, *args)
+        finally:
+            func = getattr(self.func, "__func__", self.func)
+            label = getattr(func, "__qualname__", None) or type(func).__name__
+            record("tk: " + label, start, time.perf_counter_ns(), "tk")
+
+    timed_call._perf = True
+    tkinter.CallWrapper.__call__ = timed_call
+
+
+# === REPORTING ===
+def snapshot():
+    """{"spans": {name: {count, total_ms, mean_ms, max_ms}}, "io": {...}, "files": {...}}"""
+    with _lock:
+        spans = {
+            name: {"count": count, "total_ms": round(total / 1e6, 3),
+                   "mean_ms": round(total / count / 1e6, 3), "max_ms": round(worst / 1e6, 3)}
+            for name, (count, total, worst) in _spans.items()
+        }
+        files = {name: {"opens": opens, "bytes_read": read, "bytes_written": written}
+                 for name, (opens, read, written) in _io_files.items()}
+        return {"spans": spans, "io": dict(_io), "files": files}
+
+
+def report(limit=15):
+    """The overlay text: slowest spans by total time, then I/O counters."""
+    snap = snapshot()
+    lines = [f"{'span':<34}{'n':>6}{'total ms':>10}{'max ms':>9}"]
+    ranked = sorted(snap["spans"].items(), key=lambda item: -item[1]["total_ms"])
+    for name, stats in ranked[:limit]:
+        lines.append(f"{name[:33]:<34}{stats['count']:>6}{stats['total_ms']:>10.1f}{stats['max_ms']:>9.1f}")
+    io = snap["io"]
+    lines.append("")
+    lines.append(f"files: {io['reads']} reads ({io['bytes_read']:,} B), "
+                 f"{io['writes']} writes ({io['bytes_written']:,} B)")
+    busiest = sorted(snap["files"].items(), key=lambda item: -item[1]["opens"])
+    for name, stats in busiest[:5]:
+        lines.append(f"  {name[:30]:<30}{stats['opens']:>5} opens")
+    return "\n".join(lines)
+
+
+def trace_path(base_dir):
+    return os.environ.get("HABIT_PERF_TRACE") or os.path.join(base_dir, TRACE_NAME)
+
+
+def dump(path):
+    """Write the trace events and the summary as trace-event JSON."""
+    now = time.perf_counter_ns()
+    snap = snapshot()
+    events = list(_events)
+    events.append({"name": "files", "ph": "C", "ts": _us(now), "pid": os.getpid(),
+                   "args": {"reads": snap["io"]["reads"], "writes": snap["io"]["writes"]}})
+    with _real_open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": snap}, f)
+    return path
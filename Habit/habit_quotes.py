@@ -0,0 +1,120 @@
+import mmap
+import os
+import random
+import struct
+from array import array
+
+INDEX_MAGIC = b"HQIDX001"
+# magic, source mtime_ns, source size, quote count
+INDEX_HEADER = struct.Struct("<8sqqq")
+OFFSET = struct.Struct("<Q")
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def build_offsets(path):
+    """Byte offsets of every non-blank line of the quotes file."""
+    offsets = array("Q")
+    pos = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                offsets.append(pos)
+            pos += len(line)
+    return offsets
+
+
+# === QUOTE INDEX ===
+class QuoteIndex:
+    """
+    Random access to quotes.txt through a sidecar offset index.
+
+    quotes.txt.idx holds the (mtime, size) of the quotes file it was built
+    from plus one 8-byte offset per quote. It is only rebuilt when the
+    quotes file changes, so picking a quote costs one read of the index
+    entry and one mmap seek into the quotes file, however big it is.
+    The quotes file is not kept open between picks, so it can still be
+    edited (Windows refuses to modify a mapped file).
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or path + ".idx"
+        self.count = 0
+        self._offsets = None  # in-memory fallback when the index can't be written
+        self._stamp = None
+        self.refresh()
+
+    def refresh(self):
+        """Make sure the index matches the quotes file; rebuild if not."""
+        if not os.path.exists(self.path):
+            self.count = 0
+            self._stamp = None
+            return
+        stamp = _stamp(self.path)
+        if stamp == self._stamp:
+            return
+        self._offsets = None
+        if not self._index_matches(stamp):
+            offsets = build_offsets(self.path)
+            try:
+                self._write_index(stamp, offsets)
+            except OSError:
+                # read-only corpus: keep the offsets in memory instead
+                self._offsets = offsets
+            self.count = len(offsets)
+        self._stamp = stamp
+
+    def _index_matches(self, stamp):
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(INDEX_HEADER.size)
+        except OSError:
+            return False
+        if len(header) != INDEX_HEADER.size:
+            return False
+        magic, mtime_ns, size, count = INDEX_HEADER.unpack(header)
+        if magic != INDEX_MAGIC or (mtime_ns, size) != stamp:
+            return False
+        self.count = count
+        return True
+
+    def _write_index(self, stamp, offsets):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, stamp[0], stamp[1], len(offsets)))
+            offsets.tofile(f)
+        os.replace(tmp_path, self.index_path)
+
+    def _offset(self, i):
+        if self._offsets is not None:
+            return self._offsets[i]
+        with open(self.index_path, "rb") as f:
+            f.seek(INDEX_HEADER.size + i * OFFSET.size)
+            return OFFSET.unpack(f.read(OFFSET.size))[0]
+
+    def quote(self, i):
+        """Return quote number i (0-based), stripped."""
+        start = self._offset(i)
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                end = m.find(b"\n", start)
+                raw = m[start:end if end >= 0 else len(m)]
+        return raw.decode("utf-8", errors="replace").strip()
+
+    def random(self, rng=random):
+        """One random quote, or "" if there are none."""
+        if self.count == 0:
+            return ""
+        return self.quote(rng.randrange(self.count))
+
+
+def random_quote(path):
+    """Return one random non-empty line of the quotes file, or "" if none."""
+    try:
+        return QuoteIndex(path).random()
+    except Exception:
+        return ""
@@ -0,0 +1,134 @@
+"""
+Progress charts without a window: the same chart as the app (chart_items in
+habit_chart.py: axes, nice ticks, downsampled line, title) written as SVG
+text, or drawn into a PIL image when Pillow is installed.
+
+SVG needs nothing but the standard library and is a few kB per chart, so a
+nightly job can regenerate thousands of reports (see "habit_batch.py report",
+which spreads folders over a process pool). Never imports tkinter.
+"""
+import os
+from xml.sax.saxutils import escape
+
+from habit_analytics import Analytics, completion_series
+from habit_chart import chart_items, downsample
+from habit_history import shift_date
+from habit_storage import open_storage
+
+WIDTH = 800
+HEIGHT = 500
+FONT_SIZE = 12  # px, the canvas default font
+FONT_FAMILY = "Arial, Helvetica, sans-serif"
+POINTS_TO_PX = 96 / 72
+
+
+def _layout(data, width, height, title, labels):
+    if not data:
+        return [("text", width / 2, height / 2, f"{title}: no progress data yet", "center", 0)]
+    pad = int(min(width, height) * 0.08)
+    return chart_items(data, downsample(data, width - 2 * pad), width, height, title, labels)
+
+
+def _num(x):
+    return f"{x:.1f}".rstrip("0").rstrip(".")
+
+
+# === SVG ===
+def render_svg(data, title, width=WIDTH, height=HEIGHT, labels=None):
+    """The chart for data as an SVG document (str)."""
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="{FONT_FAMILY}" font-size="{FONT_SIZE}">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+    ]
+    for item in _layout(data, width, height, title, labels):
+        kind = item[0]
+        if kind == "line":
+            coords = item[1]
+            points = " ".join(f"{_num(coords[k])},{_num(coords[k + 1])}" for k in range(0, len(coords), 2))
+            out.append(f'<polyline points="{points}" fill="none" stroke="black" '
+                       f'stroke-width="{item[2]}" stroke-linejoin="round"/>')
+        elif kind == "dot":
+            _, x, y, r = item
+            out.append(f'<circle cx="{_num(x)}" cy="{_num(y)}" r="{r}"/>')
+        else:
+            _, x, y, text, anchor, size = item
+            align = "end" if anchor == "e" else "middle"
+            style = f' font-size="{_num(size * POINTS_TO_PX)}" font-weight="bold"' if size else ""
+            out.append(f'<text x="{_num(x)}" y="{_num(y)}" text-anchor="{align}" '
+                       f'dominant-baseline="central"{style}>{escape(text)}</text>')
+    out.append("</svg>\n")
+    return "\n".join(out)
+
+
+# === PNG (Pillow) ===
+def _font(size, bold):
+    from PIL import ImageFont
+
+    names = ("DejaVuSans-Bold.ttf", "arialbd.ttf") if bold else ("DejaVuSans.ttf", "arial.ttf")
+    for name in names:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+def render_image(data, title, width=WIDTH, height=HEIGHT, labels=None):
+    """The chart for data as a PIL image (needs Pillow)."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    fonts = {}
+    for item in _layout(data, width, height, title, labels):
+        kind = item[0]
+        if kind == "line":
+            coords = item[1]
+            draw.line([(coords[k], coords[k + 1]) for k in range(0, len(coords), 2)],
+                      fill="black", width=item[2], joint="curve")
+        elif kind == "dot":
+            _, x, y, r = item
+            draw.ellipse((x - r, y - r, x + r, y + r), fill="black")
+        else:
+            _, x, y, text, anchor, size = item
+            px = int(size * POINTS_TO_PX) if size else FONT_SIZE
+            font = fonts.get(px)
+            if font is None:
+                font = fonts[px] = _font(px, bool(size))
+            left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+            x -= (right - left) if anchor == "e" else (right - left) / 2
+            draw.text((x - left, y - (bottom + top) / 2), text, fill="black", font=font)
+    return image
+
+
+# === REPORTS ===
+def report_series(base_dir, view="daily", days=None):
+    """(title, values, labels) of one chart view for base_dir, optionally only the last days."""
+    storage = open_storage(base_dir)
+    try:
+        history = storage if storage.kind == "sqlite" else None
+        analytics = Analytics(base_dir, history=history)
+        start = end = None
+        if days and analytics.days:
+            end = analytics.last_date()
+            start = shift_date(end, 1 - days)
+        return completion_series(analytics, view, start, end)
+    finally:
+        storage.close()
+
+
+def render_report(base_dir, out_path, fmt="svg", view="daily", days=None, width=WIDTH, height=HEIGHT):
+    """Write base_dir's chart to out_path. Returns the number of values charted."""
+    title, values, labels = report_series(base_dir, view, days)
+    if fmt == "png":
+        image = render_image(values, title, width, height, labels)
+        tmp_path = out_path + ".tmp"
+        image.save(tmp_path, format="PNG")
+        os.replace(tmp_path, out_path)
+    else:
+        tmp_path = out_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(render_svg(values, title, width, height, labels))
+        os.replace(tmp_path, out_path)
+    return len(values)
@@ -0,0 +1,270 @@
+"""
+Daily rollover for one Habit folder, without any tkinter/PIL dependency.
+
+The Tk app and the headless batch tool (habit_batch.py) share these
+functions; every path is derived from the base_dir argument so one process
+can roll over many folders.
+"""
+import os
+from contextlib import contextmanager
+
+import habit_clock
+from habit_history import format_date, parse_date, shift_date
+from habit_storage import open_storage
+from habit_streaks import StreakEngine
+from habit_store import atomic_write, parse_habits
+
+
+def _path(base_dir, name):
+    return os.path.join(base_dir, name)
+
+
+# === DATA FILES ===
+def load_tasks(base_dir):
+    path = _path(base_dir, "habits.txt")
+    if not os.path.exists(path):
+        # create empty habits file so user can edit
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("")
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_habits(f.read())
+
+
+@contextmanager
+def _opened(base_dir):
+    storage = open_storage(base_dir)
+    try:
+        yield storage
+    finally:
+        storage.close()
+
+
+def load_streaks(base_dir):
+    """Return dict: {habit: streak_count}"""
+    with _opened(base_dir) as storage:
+        return storage.load_streaks()[0]
+
+
+def save_streaks(base_dir, streaks):
+    """Store the streak dict (streaks.txt is replaced atomically)."""
+    with _opened(base_dir) as storage:
+        storage.save_streaks(streaks, storage.load_streaks()[1])
+
+
+def update_streaks(base_dir, completed_today, all_tasks):
+    """
+    Update streaks for end of day:
+    - Increment streak for tasks completed yesterday
+    - Reset/remove streaks for tasks not completed
+    Best streaks are carried along with them.
+    """
+    with _opened(base_dir) as storage:
+        engine = StreakEngine(*storage.load_streaks())
+        new_streaks = engine.advance(completed_today, all_tasks)
+        storage.save_streaks(engine.current, engine.best)
+    return new_streaks
+
+
+def record_stored_day(base_dir):
+    """Move the stored day (today.txt) into the history."""
+    with _opened(base_dir) as storage:
+        date, completed = storage.load_today()
+        if date is not None:
+            with storage.transaction():
+                storage.record_day(date, completed)
+
+
+# === ROLLOVER ===
+def rollover(base_dir, today=None):
+    """
+    Bring base_dir up to date for `today` (a date, defaults to now), using
+    whichever storage backend the folder has (see habit_storage.py).
+    Returns (today_str, completed).
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    with _opened(base_dir) as storage:
+        return rollover_storage(storage, today)
+
+
+def rollover_storage(storage, today=None):
+    """
+    Same day: nothing to do. One day later: yesterday goes into the history
+    and streaks are advanced. Several days later: the missed days are
+    recorded as one gap and streaks are cleared. A stored date in the
+    future (clock jumped back) is left untouched. Closed years are then
+    moved out of history.txt into compressed segments. All writes of one
+    rollover happen in one storage transaction.
+    """
+    # fold any completion journal left by the last session into today.txt,
+    # and convert the old undated progress.txt once
+    storage.prepare()
+
+    today_obj = today or habit_clock.today()
+    today_date = format_date(today_obj)
+
+    with storage.transaction():
+        stored_date, completed = storage.load_today()
+        # nothing stored yet → start fresh
+        if stored_date is None:
+            storage.save_today(today_date, [])
+            return today_date, []
+
+        day_diff = (today_obj - parse_date(stored_date)).days
+
+        # === CASE 1: same day (or the clock went backwards) → normal load ===
+        if day_diff <= 0:
+            return today_date, completed
+
+        # record the stored day's real progress; it counts towards streaks
+        storage.record_day(stored_date, completed)
+        engine = StreakEngine(*storage.load_streaks())
+        engine.advance(completed, storage.load_habits())
+
+        # === CASE 2: ONE DAY PASSED → streaks advanced above ===
+        # === CASE 3: MULTIPLE DAYS MISSED ===
+        if day_diff > 1:
+            # one run-length record however long the gap (or clock jump) was
+            storage.record_gap(shift_date(stored_date, 1), shift_date(today_date, -1))
+            engine.break_all()
+
+        storage.save_streaks(engine.current, engine.best)
+        storage.save_today(today_date, [])
+        storage.archive_history(today_date)
+    return today_date, []
+
+
+# === BACKFILL ===
+def _run_length(done_by_day, habit, end, start):
+    """Consecutive days ending at end (going back to start) with habit done."""
+    run = 0
+    day = end
+    while day >= start and habit in done_by_day.get(day, ()):
+        run += 1
+        day = shift_date(day, -1)
+    return run
+
+
+def _run_from(done_by_day, habit, start, end):
+    """Consecutive days starting at start (going on to end) with habit done."""
+    run = 0
+    day = start
+    while day <= end and habit in done_by_day.get(day, ()):
+        run += 1
+        day = shift_date(day, 1)
+    return run
+
+
+def _runs_ending(storage, habits, end, first_day, width):
+    """
+    {habit: consecutive done days ending at end}. The first window is width
+    days; habits done on every day of a window are followed further back
+    through windows twice as wide, until their run ends.
+    """
+    runs = {}
+    open_runs = dict.fromkeys(habits, 0)
+    while open_runs and first_day is not None and end >= first_day:
+        start = max(first_day, shift_date(end, -(width - 1)))
+        done_by_day = storage.completions(start, end)
+        span = (parse_date(end) - parse_date(start)).days + 1
+        for habit in list(open_runs):
+            run = _run_length(done_by_day, habit, end, start)
+            open_runs[habit] += run
+            if run < span:
+                runs[habit] = open_runs.pop(habit)
+        end = shift_date(start, -1)
+        width *= 2
+    runs.update(open_runs)
+    return runs
+
+
+def recompute_streaks(base_dir, since, storage=None):
+    """
+    Recompute streaks after history from `since` on was changed.
+
+    A streak is the run of done days ending yesterday (the day before the
+    stored date), so only the suffix since..yesterday has to be read.
+    Habits done on every day of that suffix are followed further back, one
+    doubling window at a time, until their run ends. Days migrated from
+    progress.txt carry no habit names and end a run.
+
+    Best streaks only change through the run that crosses `since`: a longer
+    joined run raises best, and a split run that was the best is recounted
+    from the whole history (for that habit only).
+    """
+    if storage is None:
+        with _opened(base_dir) as storage:
+            return recompute_streaks(base_dir, since, storage)
+
+    today_date, _ = storage.load_today()
+    current, best = storage.load_streaks()
+    if today_date is None:
+        return current
+    yesterday = shift_date(today_date, -1)
+    if since > yesterday:
+        return current
+
+    first_day = storage.first_date()
+    habits = storage.load_habits()
+
+    width = max(7, (parse_date(yesterday) - parse_date(since)).days + 1)
+    streaks = _runs_ending(storage, habits, yesterday, first_day, width)
+
+    # the run through since: what came before it, the day itself, what follows
+    done_by_day = storage.completions(since, yesterday)
+    before = _runs_ending(storage, habits, shift_date(since, -1), first_day, 7)
+    recount = []
+    for habit in habits:
+        joined = before[habit] + 1 + _run_from(done_by_day, habit, shift_date(since, 1), yesterday)
+        if habit in done_by_day.get(since, ()):
+            if joined > best.get(habit, 0):
+                best[habit] = joined
+        elif joined == best.get(habit, 0):
+            # since may have split the best run
+            recount.append(habit)
+    if recount:
+        engine = StreakEngine.from_history(base_dir, recount, end=yesterday, history=storage)
+        for habit in recount:
+            best[habit] = engine.best_streak(habit)
+    best = {habit: count for habit, count in best.items() if count}
+
+    # keep habits.txt order, like update_streaks
+    ordered = {habit: streaks[habit] for habit in habits if streaks.get(habit)}
+    storage.save_streaks(ordered, best)
+    return ordered
+
+
+def backfill_day(base_dir, date, completed):
+    """
+    Replace what the history says was done on a past date, then recompute
+    only the part of the streaks that date can affect.
+    """
+    with _opened(base_dir) as storage, storage.transaction():
+        storage.record_day(date, completed)
+        return recompute_streaks(base_dir, date, storage)
+
+
+# === RENAME ===
+def rename_habit(base_dir, old, new):
+    """
+    Rename a habit everywhere it is stored: habits.txt, the habit ID
+    dictionary (the bitmap keys on the ID, so it needs no change) and the
+    storage backend's streaks, today and history. Its history and streaks
+    carry over to the new name.
+    """
+    from habit_bitmap import HabitIds
+
+    new = new.strip()
+    habits = load_tasks(base_dir)
+    if old not in habits:
+        raise ValueError(f"no such habit: {old}")
+    if not new or new in habits:
+        raise ValueError(f"habit already exists: {new}")
+
+    with _opened(base_dir) as storage:
+        storage.prepare()
+        with storage.transaction():
+            HabitIds(base_dir).rename(old, new)
+            atomic_write(_path(base_dir, "habits.txt"),
+                         "".join((new if habit == old else habit) + "\n" for habit in habits))
+            storage.rename_habit(old, new)
@@ -0,0 +1,71 @@
+"""
+Substring search over habit names for the checklist's filter box.
+
+Every name is lower-cased and split into its 3-character n-grams; each
+trigram maps to the ascending list of habit positions that contain it. A
+query word is looked up by intersecting the posting lists of its trigrams
+(shortest list first) and confirming the survivors with a plain substring
+test, so a keystroke touches a few short lists instead of every name.
+Words of one or two characters are a plain scan, which is still only a
+couple of ms for 10k names. Typing one more character only re-checks the
+previous hits.
+"""
+GRAM = 3
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class HabitIndex:
+    """Positions of the habits whose name contains every word of a query."""
+
+    def __init__(self, habits):
+        self.names = [h.casefold() for h in habits]
+        postings = {}
+        for position, name in enumerate(self.names):
+            for gram in _grams(name):
+                hits = postings.get(gram)
+                if hits is None:
+                    postings[gram] = [position]
+                else:
+                    hits.append(position)
+        self.postings = postings
+        self._last = None  # (words, hits) of the previous query
+
+    def _candidates(self, word):
+        if len(word) < GRAM:
+            return [p for p, name in enumerate(self.names) if word in name]
+        lists = sorted((self.postings.get(g, ()) for g in _grams(word)), key=len)
+        if not lists[0]:
+            return []
+        hits = lists[0]
+        for other in lists[1:]:
+            other = set(other)
+            hits = [p for p in hits if p in other]
+            if not hits:
+                break
+        return hits
+
+    def find(self, query):
+        """Ascending positions of matching habits (every position for an empty query)."""
+        words = query.casefold().split()
+        if not words:
+            self._last = None
+            return list(range(len(self.names)))
+
+        last = self._last
+        if last is not None and len(words) >= len(last[0]) and all(
+                new.find(old) >= 0 for new, old in zip(words, last[0])):
+            # the query only grew: every hit is among the previous hits
+            hits = last[1]
+        else:
+            hits = None
+            for word in words:
+                found = self._candidates(word)
+                if hits is None or len(found) < len(hits):
+                    hits = found
+        names = self.names
+        hits = [p for p in hits if all(w in names[p] for w in words)]
+        self._last = (words, hits)
+        return hits
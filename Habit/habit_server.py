@@ -0,0 +1,312 @@
+"""
+Local multi-user HTTP/JSON service over a tree of Habit folders.
+
+    python habit_server.py --root /srv/habits [--host 127.0.0.1] [--port 8765]
+
+Every subdirectory of --root is one user's Habit folder (same files as the
+desktop app). Endpoints:
+
+    GET  /users                          -> ["alice", "bob", ...]
+    GET  /users/<user>/habits            -> [{"habit", "done", "streak"}, ...]
+    POST /users/<user>/toggle            body {"habit": "...", "done": true}
+                                         ("done" is a JSON bool; left out, it flips)
+    GET  /users/<user>/streaks           -> {"habit": count, ...}
+    GET  /users/<user>/progress?start=YYYY-MM-DD&end=YYYY-MM-DD
+                                         -> [["YYYY-MM-DD", count], ...]
+
+Stores are cached per user in an LRU with a fixed size; each cached store
+keeps at most one journal handle open, so open files stay bounded. A cached
+store re-checks its files' (mtime, size) on every request, so edits made by
+the desktop app or to habits.txt show up without a restart. All disk
+work runs in a thread pool, serialized per user, so a slow folder only
+delays its own user.
+"""
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import habit_clock
+from habit_history import HistoryStore
+from habit_lock import folder_lock
+from habit_rollover import rollover
+from habit_storage import open_store
+
+MAX_BODY = 64 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# === PER-USER CACHE ===
+class _UserEntry:
+    def __init__(self, store, day):
+        self.store = store
+        self.day = day
+        self.lock = asyncio.Lock()
+
+
+class UserCache:
+    """
+    LRU of open HabitStores, one per user folder.
+
+    Loading a user runs the daily rollover first; a store loaded on an
+    earlier day is closed and reloaded so the rollover happens on the
+    first request after midnight. Evicted stores are compacted and closed.
+    Closing never writes a store's cached day back (see _close_store), so a
+    folder the desktop app or habit_batch already rolled over stays rolled
+    over.
+    """
+
+    def __init__(self, root, executor, max_users=256):
+        self.root = os.path.abspath(root)
+        self.executor = executor
+        self.max_users = max_users
+        self.entries = OrderedDict()
+        self._loading = {}
+
+    def folder(self, user):
+        if not user or user.startswith(".") or os.sep in user or (os.altsep and os.altsep in user):
+            raise HttpError(404, "unknown user")
+        path = os.path.join(self.root, user)
+        if not os.path.isdir(path):
+            raise HttpError(404, "unknown user")
+        return path
+
+    def users(self):
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name)))
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def get(self, user):
+        folder = self.folder(user)
+        today = habit_clock.today()
+        entry = self.entries.get(user)
+        if entry is not None and entry.day == today:
+            self.entries.move_to_end(user)
+            async with entry.lock:
+                await self.run(entry.store.refresh)
+            return entry
+
+        # several requests for a cold user share one load
+        pending = self._loading.get(user)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(user, folder, today, entry))
+            self._loading[user] = pending
+        try:
+            return await asyncio.shield(pending)
+        finally:
+            self._loading.pop(user, None)
+
+    async def _load(self, user, folder, today, stale):
+        if stale is not None:
+            async with stale.lock:
+                await self.run(_close_store, stale.store)
+        store = await self.run(_open_store, folder, today)
+        entry = _UserEntry(store, today)
+        self.entries[user] = entry
+        self.entries.move_to_end(user)
+        while len(self.entries) > self.max_users:
+            _, old = self.entries.popitem(last=False)
+            async with old.lock:
+                await self.run(_close_store, old.store)
+        return entry
+
+    async def close(self):
+        for entry in self.entries.values():
+            async with entry.lock:
+                await self.run(_close_store, entry.store)
+        self.entries.clear()
+
+
+def _open_store(folder, today):
+    with folder_lock(folder):
+        rollover(folder, today)
+    return open_store(folder, journal=True)
+
+
+def _toggle(store, habit, done):
+    with folder_lock(store.base_dir):
+        store.set_completed(habit, done)
+        store.sync()
+
+
+def _close_store(store):
+    # the folder may have moved on to a new day behind this store's back:
+    # look again under the lock, then fold only the journal into what is on disk
+    with folder_lock(store.base_dir):
+        store.refresh()
+        store.close()
+
+
+# === ROUTES ===
+class HabitService:
+    def __init__(self, root, workers=8, max_users=256):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="habit-io")
+        self.cache = UserCache(root, self.executor, max_users)
+
+    async def handle(self, method, path, query, body):
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if parts == ["users"]:
+            self._method(method, "GET")
+            return await self.cache.run(self.cache.users)
+        if len(parts) != 3 or parts[0] != "users":
+            raise HttpError(404, "no such endpoint")
+
+        user, action = parts[1], parts[2]
+        entry = await self.cache.get(user)
+        store = entry.store
+
+        if action == "habits":
+            self._method(method, "GET")
+            return [{"habit": h, "done": store.is_done(h), "streak": store.streak(h)}
+                    for h in store.habits]
+        if action == "streaks":
+            self._method(method, "GET")
+            return store.streaks
+        if action == "toggle":
+            self._method(method, "POST")
+            try:
+                payload = json.loads(body or b"{}")
+                habit = payload["habit"]
+                done = payload.get("done", not store.is_done(habit))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise HttpError(400, 'expected {"habit": "...", "done": true|false}')
+            # "false" or 0 must not count as done
+            if not isinstance(habit, str) or not isinstance(done, bool):
+                raise HttpError(400, 'expected {"habit": "...", "done": true|false}')
+            if habit not in store.habits:
+                raise HttpError(404, "unknown habit")
+            async with entry.lock:
+                await self.cache.run(_toggle, store, habit, done)
+            return {"habit": habit, "done": store.is_done(habit)}
+        if action == "progress":
+            self._method(method, "GET")
+            start = query.get("start", [None])[0]
+            end = query.get("end", [None])[0]
+            for value in (start, end):
+                if value is not None:
+                    try:
+                        datetime.strptime(value, "%Y-%m-%d")
+                    except ValueError:
+                        raise HttpError(400, "dates must be YYYY-MM-DD")
+            # SQLite folders answer from the store's own connection
+            history = getattr(store, "storage", None) or HistoryStore(store.base_dir)
+            async with entry.lock:
+                return await self.cache.run(history.daily_counts, start, end)
+        raise HttpError(404, "no such endpoint")
+
+    @staticmethod
+    def _method(method, expected):
+        if method != expected:
+            raise HttpError(405, f"use {expected}")
+
+    async def close(self):
+        await self.cache.close()
+        self.executor.shutdown(wait=True)
+
+
+# === HTTP ===
+async def _read_request(reader):
+    """Return (method, target, headers, body) or None when the client closed."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HttpError(400, "bad Content-Length")
+    if length < 0:
+        raise HttpError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve_client(service, reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                url = urlsplit(target)
+                payload = await service.handle(method, url.path, parse_qs(url.query), body)
+                status = 200
+            except HttpError as e:
+                status, payload = e.status, {"error": e.message}
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception as e:
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def run_server(root, host="127.0.0.1", port=8765, workers=8, max_users=256):
+    service = HabitService(root, workers, max_users)
+    server = await asyncio.start_server(
+        lambda r, w: serve_client(service, r, w), host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve many Habit folders over HTTP/JSON.")
+    parser.add_argument("--root", required=True, help="directory whose subfolders are Habit folders")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8, help="disk I/O threads")
+    parser.add_argument("--max-users", type=int, default=256, help="cached users (bounds open files)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_server(args.root, args.host, args.port, args.workers, args.max_users))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
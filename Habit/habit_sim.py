@@ -0,0 +1,451 @@
+"""
+Time-travel simulator: replays months or years of app usage on a scratch
+Habit folder in seconds, headless, and checks the result day by day.
+
+habit_clock is switched to a FixedClock, so the real code paths run
+unchanged. Each simulated day:
+
+  - the app starts: rollover for "today", under the folder lock, the way
+    ensure_today_file does it
+  - clicks go through the app's store (open_store(..., journal=True)),
+    like toggle_box
+  - habits.txt is edited (add / remove) and habits renamed (rename_habit)
+  - the app closes (the journal is folded into today.txt), or stays open
+    past midnight while another writer rolls the folder over first
+
+A skipped day never opens the app, so the next start records a gap.
+Usage is either randomized (seeded, reproducible) or read from a script
+(see parse_script).
+
+What the folder says is compared with a model of what was clicked:
+
+  - after every rollover: today.txt holds the new date and no checkmarks,
+    and the history has exactly the habits checked on the last day the app
+    was open, with 0 for the skipped days since
+  - every --check-every days, after every overnight close and at the end:
+    streaks.txt/best_streaks.txt equal a full recompute from the history
+    (StreakEngine.from_history), and the analytics total equals every
+    click the model kept
+  - on the fresh folder and at the end: `habit_batch.py streaks` exits 0
+
+File opens and bytes per day come from habit_perf's I/O counters (checks
+excluded; SQLite's own file access is not seen). fsync is skipped unless
+--fsync: durability is not what is measured, and it would dominate the
+run time.
+
+    python habit_sim.py --days 3650 --habits 20 --seed 1
+    python habit_sim.py --script usage.txt --start 2024-12-28 --keep DIR
+"""
+import argparse
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import habit_clock
+import habit_perf
+from habit_analytics import Analytics
+from habit_history import date_range, parse_date, shift_date
+from habit_lock import folder_lock
+from habit_rollover import rename_habit, rollover
+from habit_storage import SqliteStorage, open_storage, open_store
+from habit_store import _read_text, atomic_write, parse_habits
+from habit_streaks import StreakEngine
+
+START = "2020-01-01"
+CHECK_EVERY = 30
+OPEN_HOUR = 8
+
+
+# === USAGE ===
+def parse_script(text):
+    """
+    One line per simulated day, its actions separated by ";":
+
+        done HABIT / undo HABIT     click a habit on / off
+        add HABIT / remove HABIT    edit habits.txt
+        rename OLD NEW              rename a habit (history and streaks follow)
+        skip                        the app is not opened that day
+        overnight                   the app is still open when the next day
+                                    is rolled over by `habit_batch.py
+                                    rollover` in a second process
+
+    Names with spaces are quoted ("Read books"). An empty line is a day the
+    app is opened and nothing is clicked; # starts a comment line.
+    Returns one [(action, args)] list per day.
+    """
+    arity = {"done": 1, "undo": 1, "add": 1, "remove": 1, "rename": 2, "skip": 0, "overnight": 0}
+    days = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.lstrip().startswith("#"):
+            continue
+        actions = []
+        for part in line.split(";"):
+            words = shlex.split(part)
+            if not words:
+                continue
+            action, args = words[0], tuple(words[1:])
+            if arity.get(action) != len(args):
+                raise ValueError(f"line {number}: bad action {part.strip()!r}")
+            actions.append((action, args))
+        days.append(actions)
+    return days
+
+
+class ScriptedUsage:
+    def __init__(self, days):
+        self.days = list(days)
+
+    def __len__(self):
+        return len(self.days)
+
+    def day(self, index, habits):
+        return self.days[index]
+
+
+class RandomUsage:
+    """
+    Seeded random usage: each habit is checked with probability `done`
+    (a few clicks are undone again), days are skipped with probability
+    `skip`, longer absences start with probability `away`, habits are
+    added, removed or renamed with probability `edit` per day, and the app
+    is left open overnight with probability `overnight`.
+    """
+
+    def __init__(self, seed=1, done=0.6, undo=0.05, skip=0.05, away=0.003, edit=0.01, overnight=0.02):
+        self.rng = random.Random(seed)
+        self.done, self.undo, self.skip, self.away, self.edit = done, undo, skip, away, edit
+        self.overnight = overnight
+        self._away_days = 0
+        self._names = 0
+
+    def new_name(self):
+        self._names += 1
+        return f"habit {self._names}"
+
+    def day(self, index, habits):
+        rng = self.rng
+        if self._away_days:
+            self._away_days -= 1
+            return [("skip", ())]
+        if rng.random() < self.away:
+            self._away_days = rng.randint(3, 40)
+            return [("skip", ())]
+        if rng.random() < self.skip:
+            return [("skip", ())]
+
+        actions = []
+        for habit in habits:
+            if rng.random() < self.done:
+                actions.append(("done", (habit,)))
+                if rng.random() < self.undo:
+                    actions.append(("undo", (habit,)))
+        if rng.random() < self.edit:
+            choice = rng.random()
+            if choice < 0.4 or len(habits) < 2:
+                actions.append(("add", (self.new_name(),)))
+            elif choice < 0.7:
+                actions.append(("remove", (rng.choice(habits),)))
+            else:
+                actions.append(("rename", (rng.choice(habits), self.new_name())))
+        if rng.random() < self.overnight:
+            actions.append(("overnight", ()))
+        return actions
+
+
+# === SIMULATION ===
+def _folder_bytes(base_dir):
+    total = 0
+    for name in os.listdir(base_dir):
+        path = os.path.join(base_dir, name)
+        if os.path.isfile(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def _io():
+    io = habit_perf.snapshot()["io"]
+    return [io["reads"] + io["writes"], io["bytes_read"], io["bytes_written"]]
+
+
+class Simulation:
+    def __init__(self, base_dir, usage, start=START, check_every=CHECK_EVERY):
+        self.base_dir = base_dir
+        self.usage = usage
+        self.clock = habit_clock.FixedClock(datetime.combine(parse_date(start), datetime.min.time())
+                                            + timedelta(hours=OPEN_HOUR))
+        self.check_every = check_every
+        self.model = {}  # date -> habits checked when the app closed that day
+        self.last_open = None
+        self.failures = []
+        self.days = []  # per opened day: [date, file opens, bytes read, bytes written]
+        self.growth = []  # [date, folder bytes] at every full check
+        self.counts = {"days": 0, "opened": 0, "skipped": 0, "overnight": 0, "clicks": 0, "edits": 0,
+                       "checks": 0}
+
+    def fail(self, date, message):
+        self.failures.append(f"{date}: {message}")
+
+    # --- one day ---
+    def run_day(self, index):
+        date = habit_clock.today_str()
+        self.counts["days"] += 1
+        habits = parse_habits(_read_text(os.path.join(self.base_dir, "habits.txt")) or "")
+        actions = self.usage.day(index, habits)
+        if ("skip", ()) in actions:
+            self.counts["skipped"] += 1
+            return
+        self.counts["opened"] += 1
+
+        io_start = _io()
+        with habit_perf.span("sim: rollover"), folder_lock(self.base_dir):
+            rollover(self.base_dir)
+        io_rollover = _io()
+        self.check_rollover(date)
+        io_clicks = _io()
+
+        overnight = ("overnight", ()) in actions
+        store = open_store(self.base_dir, journal=True)
+        try:
+            with habit_perf.span("sim: clicks"):
+                for action, args in actions:
+                    self.apply(date, store, action, args)
+            self.model[date] = set(store.completed)
+            if overnight:
+                # past midnight a second process (habit_batch rollover) starts the next day
+                self.counts["overnight"] += 1
+                self.clock.advance(days=1)
+                with habit_perf.span("sim: overnight rollover"):
+                    next_day = habit_clock.today_str()
+                    self.batch(next_day, "rollover", self.base_dir, "--date", next_day, "--workers", "1")
+        finally:
+            # the app closes under the folder lock, like on_close
+            with folder_lock(self.base_dir):
+                store.close()
+            if overnight:
+                self.clock.advance(days=-1)
+        self.last_open = date
+        if overnight:
+            # closing the stale store must not have put the day back
+            self.check_full()
+
+        io_end = _io()
+        self.days.append([date] + [a - b + c - d for a, b, c, d in zip(io_rollover, io_start, io_end, io_clicks)])
+
+    def batch(self, date, *args):
+        """Run habit_batch.py with args in its own process; a nonzero exit is a failure."""
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "habit_batch.py")
+        result = subprocess.run([sys.executable, script, *args], capture_output=True, text=True)
+        if result.returncode != 0:
+            self.fail(date, f"habit_batch {args[0]} exited {result.returncode}: "
+                      + (result.stderr.strip() or result.stdout.strip()))
+
+    def apply(self, date, store, action, args):
+        habits_file = os.path.join(self.base_dir, "habits.txt")
+        if action == "overnight":
+            return
+        if action in ("done", "undo"):
+            if args[0] not in store.habits:
+                raise ValueError(f"{date}: no habit {args[0]!r} to click")
+            store.set_completed(args[0], action == "done")
+            self.counts["clicks"] += 1
+            return
+
+        self.counts["edits"] += 1
+        with habit_perf.span("sim: " + action), folder_lock(self.base_dir):
+            habits = parse_habits(_read_text(habits_file) or "")
+            if action == "add" and args[0] not in habits:
+                atomic_write(habits_file, "".join(h + "\n" for h in habits + [args[0]]))
+            elif action == "remove" and args[0] in habits:
+                atomic_write(habits_file, "".join(h + "\n" for h in habits if h != args[0]))
+            elif action == "rename":
+                old, new = args
+                rename_habit(self.base_dir, old, new)
+                for done in self.model.values():
+                    if old in done:
+                        done.discard(old)
+                        done.add(new)
+        # what the file watcher does in the app
+        store.refresh()
+
+    # --- invariants ---
+    def check_rollover(self, date):
+        """today.txt moved to date; the days since the last open are in the history."""
+        storage = open_storage(self.base_dir)
+        try:
+            today_date, completed = storage.load_today()
+            if today_date != date or completed:
+                self.fail(date, f"today.txt holds {today_date} {sorted(completed)} after rollover")
+            if self.last_open is None:
+                return
+            yesterday = shift_date(date, -1)
+            expected = self.model[self.last_open]
+            got = storage.completions(self.last_open, self.last_open).get(self.last_open, set())
+            if got != expected:
+                self.fail(date, f"history for {self.last_open}: {sorted(got)}, clicked {sorted(expected)}")
+            if self.last_open != yesterday:
+                counts = storage.daily_counts(self.last_open, yesterday)
+                wanted = [(self.last_open, len(expected))] + [
+                    (day, 0) for day in date_range(shift_date(self.last_open, 1), yesterday)]
+                if counts != wanted:
+                    self.fail(date, f"daily totals {self.last_open}..{yesterday} do not match the clicks")
+            if storage.last_date() != yesterday:
+                self.fail(date, f"history ends on {storage.last_date()}, not {yesterday}")
+        finally:
+            storage.close()
+
+    def check_full(self):
+        """Stored streaks == a full recompute from the history; analytics total == the model."""
+        date = habit_clock.today_str()
+        self.counts["checks"] += 1
+        storage = open_storage(self.base_dir)
+        try:
+            today_date, _ = storage.load_today()
+            if today_date is None:
+                return
+            habits = storage.load_habits()
+            stored = StreakEngine(*storage.load_streaks())
+            computed = StreakEngine.from_history(self.base_dir, habits, end=shift_date(today_date, -1),
+                                                 history=storage)
+            for habit in habits:
+                got = (stored.current_streak(habit), stored.best_streak(habit))
+                want = (computed.current_streak(habit), computed.best_streak(habit))
+                if got != want:
+                    self.fail(date, f"{habit!r}: stored streak/best {got}, history says {want}")
+            history = storage if storage.kind == "sqlite" else None
+            total = Analytics(self.base_dir, habits, history).total()
+            clicked = sum(len(done) for day, done in self.model.items() if day < today_date)
+            if total != clicked:
+                self.fail(date, f"analytics total {total}, clicked {clicked}")
+        finally:
+            storage.close()
+        self.growth.append([date, _folder_bytes(self.base_dir)])
+
+    # --- driver ---
+    def run(self, days):
+        with habit_clock.using(self.clock):
+            started = time.perf_counter()
+            # the folder is fresh: no today.txt and no history yet
+            self.batch(habit_clock.today_str(), "streaks", self.base_dir)
+            for index in range(days):
+                self.run_day(index)
+                if self.check_every and (index + 1) % self.check_every == 0:
+                    self.check_full()
+                self.clock.advance(days=1)
+            # one last start, so the final day is rolled into the history too
+            with folder_lock(self.base_dir):
+                rollover(self.base_dir)
+            self.check_rollover(habit_clock.today_str())
+            self.check_full()
+            self.batch(habit_clock.today_str(), "streaks", self.base_dir)
+            seconds = time.perf_counter() - started
+        return self.report(seconds)
+
+    def report(self, seconds):
+        opened = self.days or [[None, 0, 0, 0]]
+        busiest = max(opened, key=lambda day: day[1])
+        spans = habit_perf.snapshot()["spans"]
+        return {
+            **self.counts,
+            "seconds": round(seconds, 3),
+            "days_per_second": round(self.counts["days"] / seconds, 1) if seconds else None,
+            "per_day": {
+                "opens": round(sum(day[1] for day in opened) / len(opened), 2),
+                "bytes_read": round(sum(day[2] for day in opened) / len(opened)),
+                "bytes_written": round(sum(day[3] for day in opened) / len(opened)),
+                "max_opens": busiest[1],
+                "max_opens_date": busiest[0],
+            },
+            "storage_bytes": _folder_bytes(self.base_dir),
+            "growth": self.growth,
+            "spans": {name: stats for name, stats in spans.items() if name.startswith("sim: ")},
+            "failures": self.failures,
+        }
+
+
+# === FOLDER ===
+def make_folder(base_dir, habits, backend="txt"):
+    os.makedirs(base_dir, exist_ok=True)
+    if os.listdir(base_dir):
+        raise ValueError(f"{base_dir} is not empty")
+    atomic_write(os.path.join(base_dir, "habits.txt"), "".join(f"{habit}\n" for habit in habits))
+    if backend == "sqlite":
+        SqliteStorage(base_dir).close()
+
+
+def _skip_fsync(fd):
+    pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay days of Habit usage on a simulated clock.")
+    parser.add_argument("--days", type=int, default=None, help="days to simulate (default: 365, or the whole script)")
+    parser.add_argument("--habits", type=int, default=None, help="habits at the start (default: 10, 0 with --script)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--script", default=None, help="usage script, one line per day (see parse_script)")
+    parser.add_argument("--start", default=START, help="first simulated day (YYYY-MM-DD)")
+    parser.add_argument("--storage", default="txt", choices=("txt", "sqlite"))
+    parser.add_argument("--check-every", type=int, default=CHECK_EVERY, help="days between full streak checks")
+    parser.add_argument("--keep", default=None, help="simulate in this (new or empty) folder and keep it")
+    parser.add_argument("--fsync", action="store_true", help="really fsync every write")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.script:
+        try:
+            usage = ScriptedUsage(parse_script(_read_text(args.script) or ""))
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        days = min(args.days or len(usage), len(usage))
+        habits = [f"habit {i + 1}" for i in range(args.habits or 0)]
+    else:
+        usage = RandomUsage(args.seed)
+        days = args.days or 365
+        habits = [usage.new_name() for _ in range(10 if args.habits is None else args.habits)]
+
+    base_dir = args.keep or tempfile.mkdtemp(prefix="habit-sim-")
+    habit_perf.enable()
+    habit_perf.install_io_hooks()
+    real_fsync = os.fsync
+    if not args.fsync:
+        os.fsync = _skip_fsync
+    try:
+        make_folder(base_dir, habits, args.storage)
+        report = Simulation(base_dir, usage, args.start, args.check_every).run(days)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        os.fsync = real_fsync
+        if not args.keep:
+            shutil.rmtree(base_dir, ignore_errors=True)
+    report["folder"] = args.keep
+    report["fsync"] = args.fsync
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        per_day = report["per_day"]
+        print(f"{report['days']} days simulated ({report['opened']} opened, {report['skipped']} skipped) "
+              f"in {report['seconds']:.2f}s: {report['days_per_second']} days/s")
+        print(f"{report['clicks']} clicks, {report['edits']} habit edits, {report['checks']} full checks")
+        print(f"per opened day: {per_day['opens']} file opens, {per_day['bytes_read']:,} B read, "
+              f"{per_day['bytes_written']:,} B written (most: {per_day['max_opens']} opens on "
+              f"{per_day['max_opens_date']})")
+        print(f"folder size at the end: {report['storage_bytes']:,} B "
+              f"({report['storage_bytes'] / max(report['days'], 1):.0f} B per day)")
+        for failure in report["failures"]:
+            print("FAILED " + failure, file=sys.stderr)
+        print(f"{len(report['failures'])} invariant failures")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
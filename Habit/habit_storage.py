@@ -0,0 +1,537 @@
+"""
+Storage backends for a Habit folder's app-managed data.
+
+TextStorage is the default: the plain files the app has always used
+(streaks.txt, best_streaks.txt, today.txt, history.txt). SqliteStorage keeps
+the same data in habits.db (WAL mode, history indexed on (habit, date)) for
+large installs. A folder uses SQLite when habits.db exists; migrate() moves
+a folder between the two without losing anything.
+
+habits.txt and quotes.txt stay plain text in both modes: they are what the
+user edits ("Edit Habits"), not data the app manages.
+
+sqlite3, habit_analytics and habit_bitmap are imported where they are first
+needed, so the app's startup (a same-day rollover of a text folder) loads
+none of them.
+
+Both backends offer:
+
+    load_habits()                      -> [habit]
+    load_streaks()                     -> (current, best) dicts
+    save_streaks(current, best)
+    load_today()                       -> (date or None, [completed])
+    save_today(date, completed)
+    iter_range(start, end)             -> (date, kind, value) records
+    record_day(date, completed)
+    record_gap(start, end)
+    first_date() / last_date()
+    rename_habit(old, new)
+    daily_counts(start, end) / completions(start, end)
+    archive_history(today)             -> [years moved out of history.txt]
+    transaction()                      -> context manager, one commit
+    prepare() / close()
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import habit_perf
+from habit_history import (HISTORY_NAME, HistoryStore, count_days, date_range, format_record,
+                           migrate_progress, segment_name, segment_years, shift_date)
+from habit_store import (HabitStore, _read_text, atomic_write, compact_today, file_stamp,
+                         parse_habits, parse_streaks, parse_today)
+from habit_streaks import BEST_STREAKS_NAME, StreakEngine
+
+DB_NAME = "habits.db"
+TEXT_FILES = ("streaks.txt", BEST_STREAKS_NAME, "today.txt", HISTORY_NAME)
+FETCH_ROWS = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS today (position INTEGER PRIMARY KEY, habit TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS streaks (
+    kind TEXT NOT NULL,             -- 'current' or 'best'
+    position INTEGER NOT NULL,
+    habit TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, habit)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,         -- keeps the file's order within a day
+    date TEXT NOT NULL,
+    kind TEXT NOT NULL,             -- done / count / gap, as in history.txt
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_date ON history (date);
+CREATE INDEX IF NOT EXISTS history_habit_date ON history (value, date) WHERE kind = 'done';
+"""
+
+
+def _update_bitmap(base_dir, date, completed):
+    from habit_bitmap import update_bitmap
+    update_bitmap(base_dir, date, completed)
+
+
+def _load_habits(base_dir):
+    path = os.path.join(base_dir, "habits.txt")
+    text = _read_text(path)
+    if text is None:
+        # create empty habits file so user can edit
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("")
+        return []
+    return parse_habits(text)
+
+
+# === TEXT ===
+class TextStorage:
+    """The plain-text files (default)."""
+
+    kind = "txt"
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.history = HistoryStore(base_dir)
+        self._history_stamp = None
+
+    def _path(self, name):
+        return os.path.join(self.base_dir, name)
+
+    def close(self):
+        pass
+
+    def prepare(self):
+        """Fold the click journal into today.txt and convert a legacy progress.txt."""
+        compact_today(self.base_dir)
+        migrate_progress(self.base_dir)
+
+    @contextmanager
+    def transaction(self):
+        # each file is replaced atomically on its own; history appends made
+        # inside the block are handed to the analytics index at the end
+        self._history_stamp = file_stamp(self._path(HISTORY_NAME))
+        try:
+            yield self
+        finally:
+            stamp, self._history_stamp = self._history_stamp, None
+            if stamp is not False and file_stamp(self._path(HISTORY_NAME)) != stamp:
+                # analytics code is only loaded when something was appended
+                from habit_analytics import extend_index
+                extend_index(self.base_dir, stamp)
+
+    # --- habits / streaks / today ---
+    def load_habits(self):
+        return _load_habits(self.base_dir)
+
+    def load_streaks(self):
+        engine = StreakEngine.load(self.base_dir)
+        return engine.current, engine.best
+
+    def save_streaks(self, current, best):
+        StreakEngine(current, best).save(self.base_dir)
+
+    def load_today(self):
+        text = _read_text(self._path("today.txt"))
+        if text is None:
+            return None, []
+        return parse_today(text)
+
+    def save_today(self, date, completed):
+        body = date + "\n" + "".join(habit + "\n" for habit in completed)
+        atomic_write(self._path("today.txt"), body)
+
+    # --- history ---
+    def iter_range(self, start=None, end=None):
+        return self.history.iter_range(start, end)
+
+    def first_date(self):
+        return self.history.first_date()
+
+    def last_date(self):
+        return self.history.last_date()
+
+    def record_day(self, date, completed):
+        if not self.history.record_day(date, completed):
+            # rewritten in the middle: the analytics index rebuilds itself
+            self._history_stamp = False
+        _update_bitmap(self.base_dir, date, completed)
+
+    def record_gap(self, start, end):
+        last = self.history.last_date()
+        if last is not None and start <= last:
+            self._history_stamp = False
+        self.history.record_gap(start, end)
+
+    def daily_counts(self, start=None, end=None):
+        return self.history.daily_counts(start, end)
+
+    def completions(self, start, end):
+        return self.history.completions(start, end)
+
+    def rename_habit(self, old, new):
+        for name in ("streaks.txt", BEST_STREAKS_NAME):
+            path = self._path(name)
+            counts = parse_streaks(_read_text(path) or "")
+            if old in counts:
+                counts = {(new if habit == old else habit): count for habit, count in counts.items()}
+                atomic_write(path, "".join(f"{habit}: {count}\n" for habit, count in counts.items()))
+
+        date, completed = self.load_today()
+        if date is not None and old in completed:
+            self.save_today(date, [new if habit == old else habit for habit in completed])
+
+        # the history keeps names, so its "done" lines are rewritten in one pass
+        if self.history.exists():
+            self._history_stamp = False
+            self.history.rename_habit(old, new)
+
+    def write_history(self, records):
+        """Replace the whole history with records (used by migrate and CSV import)."""
+        self._history_stamp = False
+        tmp_path = self._path(HISTORY_NAME) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            for date, kind, value in records:
+                f.write(format_record(date, kind, value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(HISTORY_NAME))
+        # everything is in history.txt now; the next rollover archives it again
+        for year in segment_years(self.base_dir):
+            os.remove(self._path(segment_name(year)))
+
+    def archive_history(self, today):
+        """Move the years before today's into compressed segments. Returns the years moved."""
+        years = self.history.archive(int(today[:4]))
+        if years:
+            self._history_stamp = False
+        return years
+
+
+# === SQLITE ===
+class SqliteStorage:
+    """
+    habits.db: WAL journal, one transaction per rollover or migration.
+
+    The app shares one storage between the Tk thread (charts, heatmap) and
+    the IOWorker thread (saving clicks), so every use of the connection
+    holds _lock; a transaction holds it until it commits.
+    """
+
+    kind = "sqlite"
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        import sqlite3
+
+        self.path = os.path.join(base_dir, DB_NAME)
+        # autocommit; transaction() issues BEGIN/COMMIT itself
+        self.db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._depth = 0
+        self._lock = threading.RLock()
+
+    def close(self):
+        with self._lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def _all(self, sql, args=()):
+        with self._lock:
+            return self.db.execute(sql, args).fetchall()
+
+    def _one(self, sql, args=()):
+        with self._lock:
+            return self.db.execute(sql, args).fetchone()
+
+    def prepare(self):
+        pass
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._depth == 0:
+                self.db.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.db.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.db.execute("COMMIT")
+
+    def data_version(self):
+        """Changes whenever another connection commits (PRAGMA data_version)."""
+        return self._one("PRAGMA data_version")[0]
+
+    # --- habits / streaks / today ---
+    def load_habits(self):
+        return _load_habits(self.base_dir)
+
+    def load_streaks(self):
+        counts = {"current": {}, "best": {}}
+        for kind, habit, count in self._all(
+                "SELECT kind, habit, count FROM streaks ORDER BY kind, position"):
+            counts.setdefault(kind, {})[habit] = count
+        return counts["current"], counts["best"]
+
+    def save_streaks(self, current, best):
+        engine = StreakEngine(current, best)
+        rows = [("current", i, habit, count) for i, (habit, count) in enumerate(engine.current.items())]
+        rows += [("best", i, habit, count) for i, (habit, count) in enumerate(engine.best.items())]
+        with self.transaction():
+            self.db.execute("DELETE FROM streaks")
+            self.db.executemany("INSERT INTO streaks VALUES (?, ?, ?, ?)", rows)
+
+    def load_today(self):
+        with self._lock:
+            row = self._one("SELECT value FROM meta WHERE key = 'today'")
+            if row is None:
+                return None, []
+            completed = [habit for habit, in self._all("SELECT habit FROM today ORDER BY position")]
+        return row[0], completed
+
+    def save_today(self, date, completed):
+        with self.transaction():
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('today', ?)", (date,))
+            self.db.execute("DELETE FROM today")
+            self.db.executemany("INSERT INTO today (habit) VALUES (?)", [(h,) for h in completed])
+
+    # --- history ---
+    def iter_range(self, start=None, end=None):
+        sql = "SELECT date, kind, value FROM history"
+        clauses, args = [], []
+        if start is not None:
+            clauses.append("date >= ?")
+            args.append(start)
+        if end is not None:
+            clauses.append("date <= ?")
+            args.append(end)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            cursor = self.db.execute(sql + " ORDER BY date, id", args)
+        # streamed in batches, each fetched under the lock
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                return
+            yield from rows
+
+    def first_date(self):
+        return self._one("SELECT MIN(date) FROM history")[0]
+
+    def last_date(self):
+        row = self._one("SELECT date, kind, value FROM history ORDER BY date DESC, id DESC LIMIT 1")
+        if row is None:
+            return None
+        return row[2] if row[1] == "gap" else row[0]
+
+    def _replace_day(self, date, rows):
+        """Same as HistoryStore._splice: replace date, splitting a gap that covers it."""
+        gap = self.db.execute(
+            "SELECT id, date, value FROM history WHERE kind = 'gap' AND date <= ? AND value >= ?",
+            (date, date)).fetchone()
+        if gap is not None:
+            gap_id, gap_start, gap_end = gap
+            self.db.execute("DELETE FROM history WHERE id = ?", (gap_id,))
+            if gap_start < date:
+                rows = [(gap_start, "gap", shift_date(date, -1))] + rows
+            if gap_end > date:
+                rows = rows + [(shift_date(date, 1), "gap", gap_end)]
+        self.db.execute("DELETE FROM history WHERE date = ?", (date,))
+        self.db.executemany("INSERT INTO history (date, kind, value) VALUES (?, ?, ?)", rows)
+
+    def record_day(self, date, completed):
+        if completed:
+            rows = [(date, "done", habit) for habit in sorted(completed)]
+        else:
+            rows = [(date, "count", "0")]
+        with self.transaction():
+            last = self.last_date()
+            if last is None or date > last:
+                self.db.executemany("INSERT INTO history (date, kind, value) VALUES (?, ?, ?)", rows)
+            else:
+                self._replace_day(date, rows)
+        _update_bitmap(self.base_dir, date, completed)
+
+    def record_gap(self, start, end):
+        if end < start:
+            return
+        with self.transaction():
+            last = self.last_date()
+            if last is not None and start <= last:
+                for day in date_range(start, end):
+                    self._replace_day(day, [])
+            else:
+                self.db.execute("INSERT INTO history (date, kind, value) VALUES (?, 'gap', ?)",
+                                (start, end))
+
+    def daily_counts(self, start=None, end=None):
+        return count_days(self.iter_range(start, end), start, end)
+
+    def completions(self, start, end):
+        days = {}
+        for date, habit in self._all(
+                "SELECT date, value FROM history WHERE kind = 'done' AND date BETWEEN ? AND ?",
+                (start, end)):
+            days.setdefault(date, set()).add(habit)
+        return days
+
+    def habit_days(self, habit, start, end):
+        """Dates in start..end on which habit was done (uses the (habit, date) index)."""
+        return [date for date, in self._all(
+            "SELECT date FROM history WHERE kind = 'done' AND value = ? AND date BETWEEN ? AND ? "
+            "ORDER BY date", (habit, start, end))]
+
+    def rename_habit(self, old, new):
+        with self.transaction():
+            self.db.execute("UPDATE history SET value = ? WHERE kind = 'done' AND value = ?", (new, old))
+            self.db.execute("UPDATE streaks SET habit = ? WHERE habit = ?", (new, old))
+            self.db.execute("UPDATE today SET habit = ? WHERE habit = ?", (new, old))
+
+    def write_history(self, records):
+        with self.transaction():
+            self.db.execute("DELETE FROM history")
+            self.db.executemany("INSERT INTO history (date, kind, value) VALUES (?, ?, ?)", records)
+
+    def archive_history(self, today):
+        # the date index already keeps range queries independent of history size
+        return []
+
+
+def open_storage(base_dir):
+    """SqliteStorage if the folder has habits.db, else TextStorage."""
+    if os.path.exists(os.path.join(base_dir, DB_NAME)):
+        return SqliteStorage(base_dir)
+    return TextStorage(base_dir)
+
+
+# === MIGRATION ===
+def migrate(base_dir, to):
+    """
+    Move a folder's data to the "sqlite" or "txt" backend, streaming the
+    history across. The old copy is kept with a .migrated suffix. Returns
+    the number of history records copied.
+    """
+    if to not in ("sqlite", "txt"):
+        raise ValueError(f"unknown backend: {to}")
+    if to == "sqlite":
+        old_files = TEXT_FILES + tuple(segment_name(year) for year in segment_years(base_dir))
+    else:
+        old_files = (DB_NAME,)
+    for name in old_files:
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path) and os.path.exists(path + ".migrated"):
+            raise ValueError(f"{path}.migrated is in the way (left by an earlier migration); move it first")
+    source = open_storage(base_dir)
+    if source.kind == to:
+        source.close()
+        raise ValueError(f"{base_dir} already uses {to}")
+    copied = 0
+
+    def records():
+        nonlocal copied
+        for record in source.iter_range():
+            copied += 1
+            yield tuple(record)
+
+    try:
+        source.prepare()
+        target = SqliteStorage(base_dir) if to == "sqlite" else TextStorage(base_dir)
+        try:
+            current_streaks, best_streaks = source.load_streaks()
+            today_date, completed = source.load_today()
+            with target.transaction():
+                target.write_history(records())
+                target.save_streaks(current_streaks, best_streaks)
+                if today_date is not None:
+                    target.save_today(today_date, completed)
+            from habit_bitmap import BITMAP_NAME, build_bitmap
+            if os.path.exists(os.path.join(base_dir, BITMAP_NAME)):
+                # rebuilt from what was copied, in case the source let it fall behind
+                build_bitmap(base_dir, target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+    # keep the old copy, out of the way of open_storage()
+    for name in old_files:
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path):
+            os.replace(path, path + ".migrated")
+    return copied
+
+
+# === APP STORE ON SQLITE ===
+class SqliteHabitStore(HabitStore):
+    """
+    HabitStore for folders that use habits.db. A click is one small
+    committed transaction (cheap in WAL mode), so there is no journal file;
+    other writers are noticed through PRAGMA data_version.
+    """
+
+    def __init__(self, base_dir, journal=False):
+        self.storage = SqliteStorage(base_dir)
+        self._data_version = None
+        super().__init__(base_dir, journal=False)
+
+    def refresh(self):
+        changed = False
+        with self._lock:
+            if file_stamp(self.habits_file) != self._stamps.get(self.habits_file):
+                self._load_habits()
+                changed = True
+            if self._today_changed():
+                self._load_streaks()
+                self._load_today()
+                changed = True
+        return changed
+
+    def _today_changed(self):
+        return self.storage.data_version() != self._data_version
+
+    def _load_streaks(self):
+        current, best = self.storage.load_streaks()
+        self.set_streaks(current, best, stamp=False)
+        self._data_version = self.storage.data_version()
+
+    def _load_today(self):
+        self.today_date, completed = self.storage.load_today()
+        self.completed = set(completed)
+        self._data_version = self.storage.data_version()
+
+    def set_streaks(self, streaks, best=None, stamp=True):
+        super().set_streaks(streaks, best, stamp=False)
+
+    @habit_perf.timed("HabitStore.save_today")
+    def _save_today(self, date, completed):
+        with self._lock:
+            self.storage.save_today(date, sorted(completed))
+            self._data_version = self.storage.data_version()
+
+    def sync(self):
+        with self._lock:
+            self.needs_sync = False
+
+    def compact(self):
+        with self._lock:
+            self.needs_sync = False
+
+    def close(self):
+        self.storage.close()
+
+
+def open_store(base_dir, journal=False):
+    """The app-side store for base_dir, whichever backend it uses."""
+    if os.path.exists(os.path.join(base_dir, DB_NAME)):
+        return SqliteHabitStore(base_dir, journal)
+    return HabitStore(base_dir, journal)
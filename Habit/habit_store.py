@@ -0,0 +1,331 @@
+import os
+import threading
+
+import habit_clock
+import habit_perf
+
+JOURNAL_NAME = "today.journal"
+
+
+# === FILE STAMPS ===
+def file_stamp(path):
+    """Return (mtime_ns, size) for path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+# === PARSERS ===
+def parse_habits(text):
+    """Return the non-empty, stripped lines of habits.txt."""
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def parse_streaks(text):
+    """Return dict: {habit: streak_count} from the contents of streaks.txt."""
+    streaks = {}
+    for line in text.splitlines():
+        if ":" not in line:
+            continue
+        habit, count = line.strip().split(":", 1)
+        try:
+            streaks[habit.strip()] = int(count.strip())
+        except ValueError:
+            pass
+    return streaks
+
+
+def parse_today(text):
+    """Return (date_str or None, [completed habits]) from today.txt."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return None, []
+    return lines[0], lines[1:]
+
+
+def replay_journal(date, completed, text):
+    """
+    Apply today.journal records on top of a today.txt snapshot.
+
+    Each record is "YYYY-MM-DD<TAB>+habit" or "YYYY-MM-DD<TAB>-habit".
+    A record for a later date starts that day from an empty set, the same
+    way mark() starts a fresh day. A record for an earlier date is dropped:
+    it comes from a store that had not seen the rollover, and that day is
+    already in the history. Only newline-terminated records count, so a
+    line torn by a crash mid-write is ignored.
+    """
+    completed = set(completed)
+    for line in text.split("\n")[:-1]:
+        day, sep, record = line.partition("\t")
+        if not sep or len(record) < 2 or record[0] not in "+-":
+            continue
+        if date is not None and day < date:
+            continue
+        if day != date:
+            date = day
+            completed = set()
+        if record[0] == "+":
+            completed.add(record[1:])
+        else:
+            completed.discard(record[1:])
+    return date, completed
+
+
+def format_today(date, completed):
+    body = date + "\n"
+    if completed:
+        body += "\n".join(sorted(completed)) + "\n"
+    return body
+
+
+def _read_text(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def atomic_write(path, text):
+    """Write text to a temp file, fsync it and rename it over path."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# === JOURNAL COMPACTION ===
+def compact_today(base_dir):
+    """
+    Fold today.journal into today.txt (atomically) and delete the journal.
+    Safe to call when there is no journal. Used before rollover reads today.txt.
+    """
+    today_file = os.path.join(base_dir, "today.txt")
+    journal_file = os.path.join(base_dir, JOURNAL_NAME)
+    journal = _read_text(journal_file)
+    if journal is None:
+        return
+    date, completed = parse_today(_read_text(today_file) or "")
+    date, completed = replay_journal(date, completed, journal)
+    if date is not None:
+        atomic_write(today_file, format_today(date, completed))
+    os.remove(journal_file)
+
+
+# === STORE ===
+class HabitStore:
+    """
+    Keeps habits.txt, streaks.txt (+ best_streaks.txt) and today.txt in memory.
+
+    Each file is read once and remembered together with its (mtime, size)
+    stamp. refresh() only re-reads files whose stamp changed, so the UI can
+    do plain dict/set lookups instead of reopening files per widget or click.
+
+    With journal=True a click appends one record to today.journal instead
+    of rewriting today.txt. Records are flushed to the OS immediately, so an
+    app crash loses nothing; fsyncs are left to sync(), which the caller
+    debounces. compact() folds the journal back into today.txt.
+
+    The app runs the writes persist() returns on its I/O thread, so the file
+    stamps, the journal handle and needs_sync are only touched under _lock.
+    """
+
+    def __init__(self, base_dir, journal=False):
+        self.base_dir = base_dir
+        self.habits_file = os.path.join(base_dir, "habits.txt")
+        self.streaks_file = os.path.join(base_dir, "streaks.txt")
+        self.best_streaks_file = os.path.join(base_dir, "best_streaks.txt")
+        self.today_file = os.path.join(base_dir, "today.txt")
+        self.journal_file = os.path.join(base_dir, JOURNAL_NAME)
+        self.journal = journal
+        self._journal_handle = None
+        self.needs_sync = False
+        self._lock = threading.RLock()
+
+        self.habits = []
+        self.streaks = {}
+        self._streaks_lower = {}
+        self.best_streaks = {}
+        self.today_date = None
+        self.completed = set()
+        self._stamps = {}
+
+        self.reload()
+
+    # --- loading ---
+    def reload(self):
+        """Read all three files unconditionally."""
+        with self._lock:
+            self._load_habits()
+            self._load_streaks()
+            self._load_today()
+
+    def refresh(self):
+        """Re-read only the files whose mtime/size changed. Returns True if any did."""
+        changed = False
+        with self._lock:
+            if file_stamp(self.habits_file) != self._stamps.get(self.habits_file):
+                self._load_habits()
+                changed = True
+            if (file_stamp(self.streaks_file) != self._stamps.get(self.streaks_file)
+                    or file_stamp(self.best_streaks_file) != self._stamps.get(self.best_streaks_file)):
+                self._load_streaks()
+                changed = True
+            if self._today_changed():
+                self._load_today()
+                changed = True
+        return changed
+
+    def _today_changed(self):
+        return (file_stamp(self.today_file) != self._stamps.get(self.today_file)
+                or file_stamp(self.journal_file) != self._stamps.get(self.journal_file))
+
+    def _load_habits(self):
+        text = _read_text(self.habits_file)
+        if text is None:
+            # create empty habits file so user can edit
+            with open(self.habits_file, "w", encoding="utf-8") as f:
+                f.write("")
+            text = ""
+        self.habits = parse_habits(text)
+        self._stamps[self.habits_file] = file_stamp(self.habits_file)
+
+    def _load_streaks(self):
+        text = _read_text(self.streaks_file)
+        best = parse_streaks(_read_text(self.best_streaks_file) or "")
+        self.set_streaks(parse_streaks(text or ""), best, stamp=False)
+        self._stamps[self.streaks_file] = file_stamp(self.streaks_file)
+        self._stamps[self.best_streaks_file] = file_stamp(self.best_streaks_file)
+
+    def _load_today(self):
+        text = _read_text(self.today_file)
+        date, completed = parse_today(text or "")
+        journal = _read_text(self.journal_file)
+        if journal:
+            date, completed = replay_journal(date, completed, journal)
+        self.today_date = date
+        self.completed = set(completed)
+        self._stamps[self.today_file] = file_stamp(self.today_file)
+        self._stamps[self.journal_file] = file_stamp(self.journal_file)
+
+    # --- lookups ---
+    def streak(self, habit):
+        """Case-insensitive streak lookup."""
+        return self._streaks_lower.get(habit.lower(), 0)
+
+    def is_done(self, habit):
+        return habit in self.completed
+
+    def best(self, habit):
+        """Longest streak ever recorded for habit (at least the current one)."""
+        return max(self.best_streaks.get(habit, 0), self.streaks.get(habit, 0))
+
+    def set_streaks(self, streaks, best=None, stamp=True):
+        """Replace the cached streaks, e.g. after a rollover wrote the files."""
+        self.streaks = dict(streaks)
+        if best is not None:
+            self.best_streaks = dict(best)
+        lower = {}
+        for habit, count in self.streaks.items():
+            lower.setdefault(habit.lower(), count)
+        self._streaks_lower = lower
+        if stamp:
+            with self._lock:
+                self._stamps[self.streaks_file] = file_stamp(self.streaks_file)
+                self._stamps[self.best_streaks_file] = file_stamp(self.best_streaks_file)
+
+    # --- writes ---
+    def set_completed(self, habit, done):
+        """
+        Mark habit done/undone for today and persist it from memory.
+        The files are only re-read if someone else changed them since our last look.
+        """
+        with self._lock:
+            if self._today_changed():
+                self._load_today()
+        if self.mark(habit, done):
+            self.persist(habit)()
+
+    @habit_perf.timed("HabitStore.mark")
+    def mark(self, habit, done):
+        """
+        Change habit in memory only (starting a new day if the date moved on).
+        Returns True if anything changed; persist(habit) writes it.
+        """
+        today_date = habit_clock.today_str()
+        if self.today_date != today_date:
+            self.today_date = today_date
+            self.completed = set()
+
+        if done == (habit in self.completed):
+            return False
+        if done:
+            self.completed.add(habit)
+        else:
+            self.completed.discard(habit)
+        return True
+
+    @habit_perf.timed("HabitStore.persist")
+    def persist(self, habit):
+        """
+        Return a function that writes habit's current state to disk. The
+        state is captured now, so the function may run later on an I/O thread.
+        """
+        if self.journal:
+            line = f"{self.today_date}\t{'+' if habit in self.completed else '-'}{habit}\n"
+            return lambda: self._append_journal(line)
+        date, completed = self.today_date, sorted(self.completed)
+        return lambda: self._save_today(date, completed)
+
+    @habit_perf.timed("HabitStore.save_today")
+    def _save_today(self, date, completed):
+        with self._lock:
+            atomic_write(self.today_file, format_today(date, completed))
+            self._stamps[self.today_file] = file_stamp(self.today_file)
+
+    @habit_perf.timed("HabitStore.append_journal")
+    def _append_journal(self, line):
+        with self._lock:
+            if self._journal_handle is not None and not os.path.exists(self.journal_file):
+                # another process (a rollover) folded the journal away
+                self._journal_handle.close()
+                self._journal_handle = None
+            if self._journal_handle is None:
+                self._journal_handle = open(self.journal_file, "a", encoding="utf-8")
+            self._journal_handle.write(line)
+            self._journal_handle.flush()
+            self.needs_sync = True
+            self._stamps[self.journal_file] = file_stamp(self.journal_file)
+
+    @habit_perf.timed("HabitStore.sync")
+    def sync(self):
+        """fsync pending journal records. Cheap no-op when nothing is pending."""
+        with self._lock:
+            if self.needs_sync and self._journal_handle is not None:
+                os.fsync(self._journal_handle.fileno())
+            self.needs_sync = False
+
+    def compact(self):
+        """
+        Fold the journal into today.txt as it is on disk now, drop the
+        journal and re-read the day. The in-memory day is never written
+        back: another process may have rolled the folder over since it was
+        loaded, and that day would then be recorded (and streaks advanced)
+        twice.
+        """
+        with self._lock:
+            if self._journal_handle is not None:
+                self._journal_handle.close()
+                self._journal_handle = None
+            compact_today(self.base_dir)
+            self.needs_sync = False
+            self._load_today()
+
+    def close(self):
+        """Flush everything to disk; call on exit."""
+        if self.journal:
+            self.compact()
@@ -0,0 +1,162 @@
+"""
+Streak engine: current, best and historical streaks per habit.
+
+The full computation loads the per-day completion data from history.txt
+into one byte column per habit (1 = done that day) and finds every run of
+done days in a single run-length pass (bytes.split in C, or NumPy when it
+is installed). The daily rollover only advances the stored current/best
+values by one day, so it never rescans the history.
+
+Current streaks live in streaks.txt (unchanged format); best streaks in
+best_streaks.txt with the same "habit: count" lines.
+"""
+import os
+
+from habit_history import HistoryStore, date_range, parse_date
+from habit_store import atomic_write, parse_streaks
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BEST_STREAKS_NAME = "best_streaks.txt"
+
+
+# === RUN-LENGTH PASS ===
+def run_lengths(column):
+    """Return [(start_index, length)] of the runs of 1s in a 0/1 byte column."""
+    runs = []
+    pos = 0
+    for piece in bytes(column).split(b"\x00"):
+        if piece:
+            runs.append((pos, len(piece)))
+        pos += len(piece) + 1
+    return runs
+
+
+def _runs_numpy(columns, days):
+    """Same as run_lengths for every column at once: {habit: [(start, length)]}."""
+    habits = list(columns)
+    matrix = numpy.zeros((len(habits), days + 2), dtype=numpy.int8)
+    for row, habit in enumerate(habits):
+        matrix[row, 1:days + 1] = numpy.frombuffer(bytes(columns[habit]), dtype=numpy.int8)
+    edges = numpy.diff(matrix, axis=1)
+    start_rows, starts = numpy.nonzero(edges == 1)
+    _, ends = numpy.nonzero(edges == -1)
+    lengths = ends - starts
+    runs = {habit: [] for habit in habits}
+    for row, start, length in zip(start_rows.tolist(), starts.tolist(), lengths.tolist()):
+        runs[habits[row]].append((start, length))
+    return runs
+
+
+def _write_counts(path, counts):
+    atomic_write(path, "".join(f"{habit}: {count}\n" for habit, count in counts.items()))
+
+
+def _read_counts(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return parse_streaks(f.read())
+    except OSError:
+        return {}
+
+
+# === ENGINE ===
+class StreakEngine:
+    """
+    current[habit]: run of done days ending on the last processed day
+    best[habit]:    longest run ever seen
+    runs[habit]:    [(first_date, last_date, length)], only after a full pass
+    """
+
+    def __init__(self, current=None, best=None):
+        self.current = dict(current or {})
+        self.best = dict(best or {})
+        self.runs = {}
+        for habit, count in self.current.items():
+            if count > self.best.get(habit, 0):
+                self.best[habit] = count
+
+    # --- persistence ---
+    @classmethod
+    def load(cls, base_dir):
+        return cls(_read_counts(os.path.join(base_dir, "streaks.txt")),
+                   _read_counts(os.path.join(base_dir, BEST_STREAKS_NAME)))
+
+    def save(self, base_dir):
+        _write_counts(os.path.join(base_dir, "streaks.txt"), self.current)
+        _write_counts(os.path.join(base_dir, BEST_STREAKS_NAME), self.best)
+
+    # --- full pass ---
+    @classmethod
+    def from_history(cls, base_dir, habits, start=None, end=None, history=None):
+        """
+        Compute every streak from history.txt (or another history source
+        such as a habit_storage backend) between start and end (the last day
+        that counts, normally yesterday). Days with no habit names (gaps,
+        migrated totals) count as not done.
+        """
+        history = history or HistoryStore(base_dir)
+        start = start or history.first_date()
+        end = end or history.last_date()
+        engine = cls()
+        if start is None or end is None or end < start:
+            return engine
+
+        first = parse_date(start).toordinal()
+        days = parse_date(end).toordinal() - first + 1
+        columns = {habit: bytearray(days) for habit in habits}
+        day_index = {}
+        for date, kind, habit in history.iter_range(start, end):
+            if kind != "done" or habit not in columns:
+                continue
+            index = day_index.get(date)
+            if index is None:
+                index = day_index[date] = parse_date(date).toordinal() - first
+            columns[habit][index] = 1
+
+        if numpy is not None and columns:
+            all_runs = _runs_numpy(columns, days)
+        else:
+            all_runs = {habit: run_lengths(column) for habit, column in columns.items()}
+
+        dates = list(date_range(start, end))
+        for habit in habits:
+            runs = all_runs.get(habit, [])
+            engine.runs[habit] = [(dates[s], dates[s + n - 1], n) for s, n in runs]
+            if runs:
+                engine.best[habit] = max(n for _, n in runs)
+                last_start, last_length = runs[-1]
+                if last_start + last_length == days:
+                    engine.current[habit] = last_length
+        return engine
+
+    # --- incremental ---
+    def advance(self, completed, habits):
+        """
+        Add one finished day: habits done that day extend their streak, all
+        others drop to zero. Returns the new current streaks.
+        """
+        completed = set(completed)
+        self.current = {
+            habit: self.current.get(habit, 0) + 1
+            for habit in habits
+            if habit in completed
+        }
+        for habit, count in self.current.items():
+            if count > self.best.get(habit, 0):
+                self.best[habit] = count
+        return self.current
+
+    def break_all(self):
+        """A day with nothing done (e.g. missed days): every current streak ends."""
+        self.current = {}
+
+    # --- lookups ---
+    def current_streak(self, habit):
+        return self.current.get(habit, 0)
+
+    def best_streak(self, habit):
+        return self.best.get(habit, 0)
@@ -0,0 +1,135 @@
+"""
+Notice edits to a few files in the Habit folder while the app is running.
+
+On Linux the folder is watched with inotify (through ctypes, no extra
+package) and the inotify descriptor is handed to Tk's file handler, so
+nothing runs until the kernel reports a write or rename. Everywhere else,
+or if inotify is unavailable, the (mtime, size) stamps are polled on the
+Tk after() loop. Either way bursts of events (editors often write a temp
+file and rename it) are collapsed into one callback per change, and only
+files whose stamp really changed are reported.
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+import tkinter as tk
+
+from habit_store import file_stamp
+
+POLL_MS = 1000
+DEBOUNCE_MS = 150
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (name follows)
+
+
+class _Inotify:
+    """Non-blocking inotify watch on one directory."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def read_names(self):
+        """Names of the files touched since the last call."""
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            if not data:
+                return names
+            pos = 0
+            while pos + EVENT.size <= len(data):
+                _, _, _, length = EVENT.unpack_from(data, pos)
+                pos += EVENT.size
+                name = data[pos:pos + length].rstrip(b"\0")
+                pos += length
+                if name:
+                    names.add(os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+# === WATCHER ===
+class FileWatcher:
+    """
+    Call callback(changed_paths) on the Tk thread whenever one of paths
+    (all in the same folder) is written, replaced, created or deleted.
+    """
+
+    def __init__(self, master, paths, callback, poll_ms=POLL_MS, use_inotify=True):
+        self.master = master
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.callback = callback
+        self.poll_ms = poll_ms
+        self._names = {os.path.basename(p) for p in self.paths}
+        self._stamps = {p: file_stamp(p) for p in self.paths}
+        self._job = None
+        self._inotify = None
+
+        if use_inotify and hasattr(master.tk, "createfilehandler") and os.name == "posix":
+            try:
+                self._inotify = _Inotify(os.path.dirname(self.paths[0]))
+            except (OSError, AttributeError):
+                self._inotify = None
+        if self._inotify is not None:
+            master.tk.createfilehandler(self._inotify.fd, tk.READABLE, self._on_readable)
+        else:
+            self._job = master.after(poll_ms, self._poll)
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify is not None else "poll"
+
+    def _on_readable(self, fd, mask):
+        if self._inotify.read_names() & self._names:
+            self._debounce()
+
+    def _debounce(self):
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+        self._job = self.master.after(DEBOUNCE_MS, self._check)
+
+    def _poll(self):
+        self._job = None
+        self._check()
+        self._job = self.master.after(self.poll_ms, self._poll)
+
+    def _check(self):
+        if self._inotify is not None:
+            self._job = None
+        changed = []
+        for path in self.paths:
+            stamp = file_stamp(path)
+            if stamp != self._stamps[path]:
+                self._stamps[path] = stamp
+                changed.append(path)
+        if changed:
+            self.callback(changed)
+
+    def close(self):
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+            self._job = None
+        if self._inotify is not None:
+            self.master.tk.deletefilehandler(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
@@ -0,0 +1,314 @@
+"""
+Benchmarks for the Habit tracker's load, click, rollover and chart paths.
+
+    python benchmarks/bench_habit.py [--profile small,medium] [--repeat 7]
+                                     [--output results.json]
+                                     [--baseline old.json --threshold 1.25]
+                                     [--tk]
+
+Synthetic Habit folders are generated in a temp directory (or --data-dir,
+reused between runs). Each benchmark reports min/median milliseconds; with
+--baseline the run fails (exit 1) when any median is slower than the
+baseline median times --threshold. Chart redraws use a recording fake
+canvas unless --tk is given (needs a display, e.g. under xvfb-run).
+
+Clicks run on a fixed clock set to the folder's stored day, and every file
+a click or rollover writes is put back afterwards, so a reused folder
+keeps its stored day and each timed rollover really advances one day.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "Habit"))
+
+import habit_clock  # noqa: E402
+from habit_chart import ProgressChart  # noqa: E402
+from habit_history import HistoryStore, format_date, segment_name, segment_years  # noqa: E402
+from habit_quotes import QuoteIndex, random_quote  # noqa: E402
+from habit_rollover import load_streaks, load_tasks, rollover  # noqa: E402
+from habit_search import HabitIndex  # noqa: E402
+from habit_store import HabitStore  # noqa: E402
+
+PROFILES = {
+    "small": {"habits": 10, "days": 365, "quotes": 1_000},
+    "medium": {"habits": 1_000, "days": 3_650, "quotes": 100_000},
+    "large": {"habits": 100_000, "days": 1_000_000, "quotes": 2_000_000},
+}
+START = date(2000, 3, 1)  # stored days fall mid-year: the timed rollover is an ordinary day
+MAX_DONE_PER_DAY = 8
+# what a click or a rollover can change; put back before every timed rollover
+STATE_FILES = ("history.txt", "streaks.txt", "best_streaks.txt", "today.txt", "today.journal",
+               "analytics.idx", "history.bits", "habit_ids.txt")
+
+
+# === DATASETS ===
+def make_folder(path, habits, days, quotes, seed=0):
+    """Write a synthetic Habit folder. The stored day is the last history day + 1."""
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    names = [f"Habit {i:06d}" for i in range(habits)]
+
+    with open(os.path.join(path, "habits.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(names) + "\n")
+
+    with open(os.path.join(path, "streaks.txt"), "w", encoding="utf-8") as f:
+        f.writelines(f"{name}: {rng.randint(1, 40)}\n" for name in names if rng.random() < 0.3)
+
+    with open(os.path.join(path, "history.txt"), "w", encoding="utf-8", buffering=1 << 20) as f:
+        for d in range(days):
+            day = format_date(START + timedelta(days=d))
+            done = rng.sample(names, rng.randint(0, min(habits, MAX_DONE_PER_DAY)))
+            if done:
+                f.writelines(f"{day}\tdone\t{name}\n" for name in sorted(done))
+            else:
+                f.write(f"{day}\tcount\t0\n")
+
+    with open(os.path.join(path, "quotes.txt"), "w", encoding="utf-8", buffering=1 << 20) as f:
+        for i in range(quotes):
+            f.write(f"Quote number {i}: keep going, one small step every day.\n")
+
+    stored = START + timedelta(days=days)
+    with open(os.path.join(path, "today.txt"), "w", encoding="utf-8") as f:
+        f.write(format_date(stored) + "\n" + "\n".join(names[:3]) + "\n")
+    return stored
+
+
+class _FakeCanvas:
+    """Stands in for tk.Canvas: counts created items, fixed 1600x900 size."""
+
+    def __init__(self):
+        self.items = 0
+
+    def bind(self, *args):
+        pass
+
+    def delete(self, *args):
+        self.items = 0
+
+    def winfo_width(self):
+        return 1600
+
+    def winfo_height(self):
+        return 900
+
+    def create_line(self, *args, **kwargs):
+        self.items += 1
+
+    create_oval = create_text = create_line
+
+
+# === FOLDER STATE ===
+def snapshot_state(folder):
+    """{name: bytes or None} of the files a click or a rollover writes."""
+    names = list(STATE_FILES) + [segment_name(year) for year in segment_years(folder)]
+    state = {}
+    for name in names:
+        try:
+            with open(os.path.join(folder, name), "rb") as f:
+                state[name] = f.read()
+        except FileNotFoundError:
+            state[name] = None
+    return state
+
+
+def restore_state(folder, state):
+    for year in segment_years(folder):
+        if segment_name(year) not in state:
+            os.remove(os.path.join(folder, segment_name(year)))
+    for name, data in state.items():
+        path = os.path.join(folder, name)
+        if data is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            with open(path, "wb") as f:
+                f.write(data)
+
+
+# === TIMING ===
+def measure(func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3),
+            "runs": repeat}
+
+
+def run_profile(folder, stored, repeat, use_tk):
+    results = {}
+    habits = load_tasks(folder)
+
+    results["load_tasks"] = measure(lambda: load_tasks(folder), repeat)
+    results["load_streaks"] = measure(lambda: load_streaks(folder), repeat)
+    results["store_load"] = measure(lambda: HabitStore(folder, journal=True), repeat)
+
+    # the app keeps closed years archived; time the steady state, not the first archive
+    HistoryStore(folder).archive(stored.year)
+    pristine = snapshot_state(folder)
+
+    # clicks happen on the stored day: on the real clock they would start a
+    # new day and re-date today.txt
+    clock = habit_clock.FixedClock(datetime.combine(stored, datetime.min.time()))
+    target = habits[len(habits) // 2]
+    state = {"done": False}
+
+    def click(s):
+        state["done"] = not state["done"]
+        s.set_completed(target, state["done"])
+
+    def toggle(s):
+        state["done"] = not state["done"]
+        s.mark(target, state["done"])
+
+    with habit_clock.using(clock):
+        store = HabitStore(folder, journal=True)
+        results["get_streak_all"] = measure(lambda: [store.streak(h) for h in habits], repeat)
+        results["save_remove_completion_journal"] = measure(lambda: click(store), repeat * 5)
+        # the app's click path piece by piece: memory, queued write, debounced fsync
+        results["click_mark"] = measure(lambda: toggle(store), repeat * 5)
+        results["click_persist_journal"] = measure(lambda: store.persist(target)(), repeat * 5)
+        results["click_sync"] = measure(store.sync, repeat * 5, lambda: store.persist(target)())
+        store.close()
+        plain = HabitStore(folder)
+        results["save_remove_completion_rewrite"] = measure(lambda: click(plain), repeat * 5)
+        results["click_persist_rewrite"] = measure(lambda: plain.persist(target)(), repeat * 5)
+    restore_state(folder, pristine)
+
+    # rollover: every run starts again from the stored day
+    next_day = stored + timedelta(days=1)
+    results["ensure_today_file"] = measure(lambda: rollover(folder, next_day), repeat,
+                                           lambda: restore_state(folder, pristine))
+    rolled = HabitStore(folder).today_date
+    restore_state(folder, pristine)
+    if rolled != format_date(next_day):
+        raise RuntimeError(f"rollover benchmark left today.txt on {rolled}, not {next_day}")
+
+    history = HistoryStore(folder)
+    results["progress_load"] = measure(history.daily_counts, repeat)
+    data = [count for _, count in history.daily_counts()]
+
+    if use_tk:
+        import tkinter as tk
+        root = tk.Tk()
+        root.geometry("1600x900")
+        canvas = tk.Canvas(root)
+        canvas.pack(fill="both", expand=True)
+        root.update()
+
+        def redraw():
+            ProgressChart(canvas, data).redraw()
+            root.update_idletasks()
+    else:
+        canvas = _FakeCanvas()
+
+        def redraw():
+            ProgressChart(canvas, data).redraw()
+
+    results["chart_redraw"] = measure(redraw, repeat)
+    if use_tk:
+        root.destroy()
+
+    quotes_path = os.path.join(folder, "quotes.txt")
+    random_quote(quotes_path)  # first call builds quotes.txt.idx
+    results["quote_pick"] = measure(lambda: random_quote(quotes_path), repeat)
+    quotes = QuoteIndex(quotes_path)
+    results["quote_rotate"] = measure(quotes.random, repeat * 5)
+
+    # search box: index build, then one lookup per keystroke of a habit name
+    results["search_index"] = measure(lambda: HabitIndex(habits), repeat)
+    index = HabitIndex(habits)
+    word = target[:8]
+
+    def type_query():
+        for i in range(1, len(word) + 1):
+            index.find(word[:i])
+        index.find("")
+
+    results["search_keystrokes"] = measure(type_query, repeat)
+    return results
+
+
+# === REGRESSIONS ===
+def compare(results, baseline, threshold):
+    """Return [(profile, bench, old_ms, new_ms)] for medians over threshold x baseline."""
+    slower = []
+    for profile, benches in results["profiles"].items():
+        old_benches = baseline.get("profiles", {}).get(profile, {})
+        for name, stats in benches.items():
+            old = old_benches.get(name)
+            if old and stats["median_ms"] > old["median_ms"] * threshold:
+                slower.append((profile, name, old["median_ms"], stats["median_ms"]))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="small,medium",
+                        help="comma list of: " + ", ".join(PROFILES))
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--data-dir", default=None, help="keep generated folders here and reuse them")
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    parser.add_argument("--baseline", default=None, help="JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="fail when median > baseline median x this")
+    parser.add_argument("--tk", action="store_true", help="redraw into a real Tk canvas")
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="habit-bench-")
+    results = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "repeat": args.repeat, "tk": args.tk},
+        "profiles": {},
+    }
+    try:
+        for name in args.profile.split(","):
+            spec = PROFILES[name.strip()]
+            folder = os.path.join(data_dir, name.strip(), "Habit")
+            marker = os.path.join(folder, ".bench-stored-day")
+            if os.path.exists(marker):
+                with open(marker) as f:
+                    stored = date.fromisoformat(f.read().strip())
+            else:
+                start = time.perf_counter()
+                stored = make_folder(folder, **spec)
+                with open(marker, "w") as f:
+                    f.write(stored.isoformat())
+                print(f"generated {name} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            results["profiles"][name] = run_profile(folder, stored, args.repeat, args.tk)
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.threshold)
+        for profile, name, old, new in slower:
+            print(f"REGRESSION {profile}/{name}: {old:.3f} ms -> {new:.3f} ms", file=sys.stderr)
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())